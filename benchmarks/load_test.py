@@ -0,0 +1,274 @@
+"""
+Offline load test of the /start and /register flows.
+
+Synthetic Telegram messages are fed straight into the handlers registered
+by events/start.py and events/register.py, through the real EventHandler
+wrappers, filters and send scheduler. Supabase is replaced by an in-memory
+user table with a configurable latency, and outgoing messages by a stub
+with its own latency, so no Telegram or Supabase account is needed.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --users 2000 --concurrency 1,10,100 --db-latency 0.02
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Keep the benchmark output readable
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Start every run with an empty user replica
+os.environ.setdefault("REPLICA_PATH", ":memory:")
+
+from pyrogram import enums
+from pyrogram.handlers import MessageHandler
+from pyrogram.types import Chat, Message, User as TelegramUser
+from models.users import User, UserStatus
+from plugins.supabase import user_cache
+from plugins.sender import sender
+from settings.event_handler import EventHandler, EventHandlerType
+
+
+class FakeUserDatabase:
+    """
+    In-memory stand-in for plugins.supabase.UserDatabase.
+
+    Calls block their (thread-pool) thread for `latency` seconds, like a
+    round-trip to Supabase would, and keep the user cache in sync the way
+    the real implementation does.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.rows: dict[int, User] = {}
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_user(self, telegram_id: int):
+        cached = user_cache.get(telegram_id)
+        if cached is not None:
+            return cached
+        self._round_trip()
+        user = self.rows.get(telegram_id)
+        if user is not None:
+            user_cache.set(telegram_id, user)
+        return user
+
+    def upsert_user(self, telegram_user: TelegramUser):
+        cached = user_cache.get(telegram_user.id)
+        if cached is not None:
+            return cached
+        self._round_trip()
+        user = self.rows.setdefault(
+            telegram_user.id,
+            User(
+                telegram_id=telegram_user.id,
+                username=telegram_user.username,
+                firstname=telegram_user.first_name,
+            ),
+        )
+        user_cache.set(telegram_user.id, user)
+        return user
+
+    insert_new_user = upsert_user
+
+    def register_and_return(self, telegram_id: int, email: str, phone_number: str = None):
+        user_cache.invalidate(telegram_id)
+        self._round_trip()
+        user = self.rows.get(telegram_id)
+        if user is None:
+            return None
+        user = user.model_copy(
+            update={"email": email, "phone_number": phone_number, "status": UserStatus.REGISTERED}
+        )
+        self.rows[telegram_id] = user
+        user_cache.set(telegram_id, user)
+        return user
+
+    register_user = register_and_return
+
+
+class HarnessClient:
+    """
+    Minimal stand-in for pyrogram.Client: collects handlers, dispatches
+    updates the way Pyrogram's dispatcher does, and answers send_message
+    after `send_latency` seconds.
+    """
+
+    def __init__(self, send_latency: float = 0.0):
+        self.me = TelegramUser(id=1, is_bot=True, first_name="Bot", username="simulasicpns_bot")
+        self.loop = None
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="filters")
+        self.groups: dict[int, list] = {}
+        self.send_latency = send_latency
+        self.sent = 0
+
+    def add_handler(self, handler, group: int = 0):
+        self.groups.setdefault(group, []).append(handler)
+        return handler, group
+
+    def on_message(self, filters=None, group: int = 0):
+        def decorator(func):
+            self.add_handler(MessageHandler(func, filters), group)
+            return func
+
+        return decorator
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        self.sent += 1
+
+    async def dispatch(self, message: Message):
+        for group in sorted(self.groups):
+            for handler in self.groups[group]:
+                if await handler.check(self, message):
+                    await handler.callback(self, message)
+                    break
+
+
+def make_message(client: HarnessClient, telegram_id: int, text: str, message_id: int) -> Message:
+    user = TelegramUser(
+        id=telegram_id,
+        is_bot=False,
+        first_name=f"User {telegram_id}",
+        username=f"user{telegram_id}",
+        language_code="id",
+    )
+    return Message(
+        client=client,
+        id=message_id,
+        from_user=user,
+        chat=Chat(id=telegram_id, type=enums.ChatType.PRIVATE),
+        date=datetime.now(),
+        text=text,
+    )
+
+
+# Messages one user sends to complete the registration flow
+SCRIPT = ["/start", "/register", "Ya", "{email}", "Tidak"]
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+async def run_level(client: HarnessClient, users: int, concurrency: int, first_id: int) -> dict:
+    """
+    Let `users` users walk through SCRIPT with at most `concurrency` of them
+    active at the same time.
+    """
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def user_session(telegram_id: int):
+        async with semaphore:
+            for step, text in enumerate(SCRIPT):
+                message = make_message(
+                    client, telegram_id, text.format(email=f"user{telegram_id}@example.com"), step
+                )
+                start = time.perf_counter()
+                await client.dispatch(message)
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user_session(first_id + i) for i in range(users)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "messages": len(latencies),
+        "msg_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def session_memory(client: HarnessClient, sessions: int, first_id: int) -> float:
+    """
+    Return the bytes allocated per user parked in the middle of registration.
+    """
+    for i in range(sessions):
+        await client.dispatch(make_message(client, first_id + i, "/start", 0))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(sessions):
+        await client.dispatch(make_message(client, first_id + i, "/register", 1))
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return grown / sessions
+
+
+async def main(args):
+    database = FakeUserDatabase(latency=args.db_latency)
+    import events.start
+    import events.register
+
+    events.start.db.database = database
+    events.register.db.database = database
+
+    client = HarnessClient(send_latency=args.send_latency)
+    client.loop = asyncio.get_running_loop()
+    if not args.rate_limit:
+        sender.global_rate = sender.chat_rate = sender.chat_burst = 1e9
+
+    handler = EventHandler(client)
+    handler.register(EventHandlerType(filename="register"))
+    handler.register(EventHandlerType(filename="start"))
+    handler.load()
+
+    print(
+        f"users={args.users} db_latency={args.db_latency * 1000:.1f}ms "
+        f"send_latency={args.send_latency * 1000:.1f}ms rate_limit={args.rate_limit}"
+    )
+    print(f"{'concurrency':>11} {'messages':>9} {'msg/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    first_id = 1_000_000
+    for concurrency in args.concurrency:
+        user_cache.clear()
+        result = await run_level(client, args.users, concurrency, first_id)
+        first_id += args.users
+        print(
+            f"{result['concurrency']:>11} {result['messages']:>9} {result['msg_per_sec']:>9.0f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+        )
+
+    per_session = await session_memory(client, args.sessions, first_id)
+    print(f"memory per active registration session: {per_session:.0f} bytes ({args.sessions} sessions)")
+    print(f"database round-trips: {database.calls}, messages sent: {client.sent}")
+    await sender.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="users per concurrency level")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 10, 100],
+        help="comma-separated numbers of simultaneously active users",
+    )
+    parser.add_argument("--db-latency", type=float, default=0.01, help="seconds per database round-trip")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="seconds per sent message")
+    parser.add_argument("--sessions", type=int, default=5000, help="sessions used to measure memory")
+    parser.add_argument(
+        "--rate-limit", action="store_true", help="keep the real Telegram send rate limits"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,105 @@
+import os
+import asyncio
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from models.users import UserStatus
+from plugins.broadcast import broadcaster
+from plugins.sender import sender
+from plugins.templates import templates
+from settings.logger import BotLogger
+
+logger = BotLogger("broadcast.py")
+
+# Telegram ID admin yang boleh menjalankan /broadcast, dipisahkan koma
+ADMIN_IDS = [int(value) for value in os.environ.get("ADMIN_IDS", "").split(",") if value.strip()]
+
+templates.add(
+    "broadcast.usage",
+    "Penggunaan:\n/broadcast <pesan> - kirim pesan ke semua pengguna terdaftar\n"
+    "/broadcast status - lihat progres broadcast\n"
+    "/broadcast cancel - hentikan broadcast\n"
+    "/broadcast resume - lanjutkan broadcast yang terhenti",
+).add(
+    "broadcast.started",
+    "Broadcast {id} dimulai.",
+).add(
+    "broadcast.resumed",
+    "Broadcast {id} dilanjutkan setelah {processed} penerima.",
+).add(
+    "broadcast.running",
+    "Masih ada broadcast yang berjalan. Gunakan /broadcast status atau /broadcast cancel.",
+).add(
+    "broadcast.nothing_to_resume",
+    "Tidak ada broadcast yang terhenti.",
+).add(
+    "broadcast.cancelled",
+    "Broadcast dihentikan. Gunakan /broadcast resume untuk melanjutkan.",
+).add(
+    "broadcast.idle",
+    "Tidak ada broadcast yang sedang berjalan.",
+).add(
+    "broadcast.status",
+    "Broadcast {id} ({state})\nTerkirim: {sent}\nDiblokir: {blocked}\nGagal: {failed}\n"
+    "Waktu: {elapsed:.0f} detik ({rate:.1f} pesan/detik)",
+)
+
+
+def status_message() -> str:
+    stats = broadcaster.stats()
+    if not stats:
+        return templates.text("broadcast.idle")
+    state = "berjalan" if stats["running"] else "selesai" if stats["finished"] else "terhenti"
+    return templates.text("broadcast.status", state=state, **stats)
+
+
+async def report_when_done(client: Client, chat_id: int, task: asyncio.Task):
+    """
+    Send the delivery stats to the admin once the broadcast has reached
+    every recipient; a cancelled broadcast is reported by /broadcast cancel.
+    """
+    await asyncio.gather(task, return_exceptions=True)
+    if broadcaster.stats().get("finished"):
+        await sender.send(client.send_message, chat_id, status_message(), chat_id=chat_id)
+
+
+def handler(app: Client):
+    """
+    Register the broadcast command handler with the Telegram bot client.
+    """
+    if not ADMIN_IDS:
+        logger.info("ADMIN_IDS is empty, /broadcast is disabled")
+
+    @app.on_message(filters.command("broadcast") & filters.user(ADMIN_IDS))
+    async def _(client: Client, message: Message):
+        parts = message.text.split(maxsplit=1)
+        argument = parts[1].strip() if len(parts) > 1 else ""
+
+        if not argument:
+            await sender.reply(message, templates.text("broadcast.usage"))
+            return
+        if argument == "status":
+            await sender.reply(message, status_message())
+            return
+        if argument == "cancel":
+            if not broadcaster.running:
+                await sender.reply(message, templates.text("broadcast.idle"))
+                return
+            await broadcaster.cancel()
+            await sender.reply(message, templates.text("broadcast.cancelled"))
+            return
+
+        if broadcaster.running:
+            await sender.reply(message, templates.text("broadcast.running"))
+            return
+        if argument == "resume":
+            task = broadcaster.resume(client)
+            if task is None:
+                await sender.reply(message, templates.text("broadcast.nothing_to_resume"))
+                return
+            reply = templates.text("broadcast.resumed", **broadcaster.stats())
+        else:
+            task = broadcaster.start(client, argument, UserStatus.REGISTERED)
+            reply = templates.text("broadcast.started", id=broadcaster.current.id)
+        logger.info("Broadcast %s requested by %s", broadcaster.current.id, message.from_user.id)
+        await sender.reply(message, reply)
+        asyncio.get_running_loop().create_task(report_when_done(client, message.chat.id, task))
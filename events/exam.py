@@ -0,0 +1,297 @@
+import os
+from dataclasses import asdict, dataclass
+from pyrogram import Client, filters
+from pyrogram.types import Message, ReplyKeyboardRemove
+from models.questions import Category, SKD_COMPOSITION, get_question_bank
+from models.scoring import UNANSWERED, AnswerKey, score_session
+from models.users import UserStatus
+from plugins.ranking import record_result
+from plugins.sender import sender
+from plugins.supabase import AsyncUserDatabase, answer_events, progress_events
+from plugins.templates import templates, language_of, DEFAULT_LANGUAGE
+from plugins.timer_wheel import exam_timers, session_table, EXAM_DURATION
+from settings.logger import BotLogger
+
+logger = BotLogger("exam.py")
+
+db = AsyncUserDatabase()
+
+# Detik sebelum pengguna diingatkan tentang soal yang belum dijawab
+QUESTION_REMINDER = int(os.environ.get("QUESTION_REMINDER", "300"))
+
+# Jenis tes dan jumlah soal per kategori; waktu tes sebanding dengan jumlah soal
+TEST_TYPES = {
+    "SKD": SKD_COMPOSITION,
+    **{category.value: {category: count} for category, count in SKD_COMPOSITION.items()},
+}
+SKD_QUESTIONS = sum(SKD_COMPOSITION.values())
+
+OPTION_LABELS = "ABCDE"
+
+templates.add(
+    "exam.choose_test",
+    "Pilih jenis tes: SKD (lengkap), TWK, TIU atau TKP, misalnya /select_test SKD.",
+    "Choose a test: SKD (full), TWK, TIU or TKP, for example /select_test SKD.",
+).add(
+    "exam.not_registered",
+    "Anda harus mendaftar sebelum memulai tes. Gunakan perintah /register.",
+    "You need to register before starting a test. Use the /register command.",
+).add(
+    "exam.in_progress",
+    "Anda masih mengerjakan tes. Jawab soal terakhir atau gunakan /submit untuk mengumpulkan.",
+    "You are still taking a test. Answer the last question or use /submit to hand it in.",
+).add(
+    "exam.unavailable",
+    "Bank soal sedang tidak tersedia. Silakan coba lagi nanti.",
+    "The question bank is currently unavailable. Please try again later.",
+).add(
+    "exam.started",
+    "Tes {test_type} dimulai: {count} soal dalam {minutes} menit. Pilih jawaban A-E untuk setiap soal.",
+    "The {test_type} test has started: {count} questions in {minutes} minutes. Choose an answer A-E for each question.",
+).add(
+    "exam.question",
+    "Soal {number}/{total}\n\n{text}\n\n{options}",
+    "Question {number}/{total}\n\n{text}\n\n{options}",
+).add(
+    "exam.choose_option",
+    "Pilih salah satu jawaban: {labels}.",
+    "Choose one of the answers: {labels}.",
+).add(
+    "exam.no_exam",
+    "Anda tidak sedang mengerjakan tes. Gunakan /select_test untuk memulai.",
+    "You are not taking a test. Use /select_test to start one.",
+).add(
+    "exam.time_up",
+    "Waktu habis! Jawaban Anda dikumpulkan secara otomatis.",
+    "Time is up! Your answers have been handed in automatically.",
+).add(
+    "exam.result",
+    "Tes {test_type} selesai.\nTWK: {TWK}\nTIU: {TIU}\nTKP: {TKP}\nTotal: {total}\n{verdict}\n"
+    "Gunakan /rank {test_type} untuk melihat peringkat Anda.",
+    "The {test_type} test is finished.\nTWK: {TWK}\nTIU: {TIU}\nTKP: {TKP}\nTotal: {total}\n{verdict}\n"
+    "Use /rank {test_type} to see your rank.",
+).add(
+    "exam.passed",
+    "Selamat, Anda memenuhi nilai ambang batas!",
+    "Congratulations, you reached the passing grade!",
+).add(
+    "exam.failed",
+    "Anda belum memenuhi nilai ambang batas. Tetap semangat!",
+    "You didn't reach the passing grade yet. Keep practicing!",
+)
+templates.add_keyboard(
+    "keyboard.exam_options", [list(OPTION_LABELS)], resize_keyboard=True
+).add_keyboard(
+    "keyboard.test_types",
+    [[f"/select_test {test_type}" for test_type in TEST_TYPES]],
+    one_time_keyboard=True,
+    resize_keyboard=True,
+).add_markup("markup.remove_keyboard", ReplyKeyboardRemove())
+
+
+@dataclass(slots=True)
+class ExamSession:
+    """
+    A simulation in progress: the drawn questions and the answers so far.
+    """
+
+    test_type: str
+    question_ids: list[int]
+    answers: list[int]
+    lang: str = DEFAULT_LANGUAGE
+    current: int = 0
+
+
+# Sessions in progress per telegram_id, restored with their timers after a restart;
+# updates of a user are always handled by the same worker
+sessions: dict[int, ExamSession] = {
+    telegram_id: ExamSession(**state) for telegram_id, state in session_table.load()
+}
+
+
+def save(telegram_id: int, session: ExamSession):
+    """
+    Persist a session after it changed, next to its timers.
+    """
+    session_table.save(telegram_id, asdict(session))
+
+
+@exam_timers.is_active
+def has_session(telegram_id: int) -> bool:
+    return telegram_id in sessions
+
+
+async def send_question(client: Client, telegram_id: int, session: ExamSession):
+    """
+    Send the current question and restart its unanswered-question reminder.
+    """
+    question = get_question_bank().get(session.question_ids[session.current])
+    options = "\n".join(f"{label}. {option}" for label, option in zip(OPTION_LABELS, question.options))
+    text = templates.text(
+        "exam.question",
+        session.lang,
+        number=session.current + 1,
+        total=len(session.question_ids),
+        text=question.text,
+        options=options,
+    )
+    exam_timers.remind_question(telegram_id, session.current + 1, QUESTION_REMINDER, session.lang)
+    await sender.send(
+        client.send_message,
+        telegram_id,
+        text,
+        chat_id=telegram_id,
+        reply_markup=templates.markup("keyboard.exam_options"),
+    )
+
+
+async def track(telegram_id: int, session: ExamSession, status: str):
+    """
+    Record that a session started or ended, with the number of questions answered.
+    """
+    await progress_events.add(
+        {
+            "telegram_id": telegram_id,
+            "test_type": session.test_type,
+            "status": status,
+            "answered": sum(answer != UNANSWERED for answer in session.answers),
+            "total": len(session.question_ids),
+        }
+    )
+
+
+async def submit(client: Client, telegram_id: int, status: str = "SUBMITTED"):
+    """
+    Score a session, store the result and send it to the user.
+    """
+    session = sessions.pop(telegram_id, None)
+    if session is None:
+        return
+    exam_timers.finish_exam(telegram_id)
+    session_table.delete(telegram_id)
+    await track(telegram_id, session, status)
+
+    bank = get_question_bank()
+    key = AnswerKey.from_questions([bank.get(question_id) for question_id in session.question_ids])
+    score = score_session(session.answers, key)
+    if session.test_type == "SKD":
+        total, passed = score.total, score.passed_all
+    else:
+        category = Category(session.test_type)
+        total, passed = score.totals[category], score.passed[category]
+    await record_result(session.test_type, telegram_id, total)
+    logger.info("Exam %s of %s finished with %d points", session.test_type, telegram_id, total)
+
+    text = templates.text(
+        "exam.result",
+        session.lang,
+        test_type=session.test_type,
+        total=total,
+        verdict=templates.text("exam.passed" if passed else "exam.failed", session.lang),
+        **{category.value: points for category, points in score.totals.items()},
+    )
+    await sender.send(
+        client.send_message,
+        telegram_id,
+        text,
+        chat_id=telegram_id,
+        reply_markup=templates.markup("markup.remove_keyboard"),
+    )
+
+
+@exam_timers.on_expire
+async def expire(client: Client, telegram_id: int):
+    session = sessions.get(telegram_id)
+    if session is None:
+        logger.warning("Deadline of exam %s fired without a session", telegram_id)
+        return
+    await sender.send(
+        client.send_message, telegram_id, templates.text("exam.time_up", session.lang), chat_id=telegram_id
+    )
+    await submit(client, telegram_id, "EXPIRED")
+
+
+async def in_exam(_, __, message: Message):
+    return message.from_user is not None and message.from_user.id in sessions
+
+
+def handler(app: Client):
+    """
+    Register the simulation commands and the answer handler with the Telegram bot client.
+    """
+
+    # Ketika pengguna memilih jenis tes
+    @app.on_message(filters.command("select_test"))
+    async def _(client: Client, message: Message):
+        lang = language_of(message)
+        telegram_id = message.from_user.id
+        test_type = message.command[1].upper() if len(message.command) > 1 else None
+        if test_type not in TEST_TYPES:
+            await sender.reply(
+                message, templates.text("exam.choose_test", lang), reply_markup=templates.markup("keyboard.test_types")
+            )
+            return
+        if telegram_id in sessions:
+            await sender.reply(message, templates.text("exam.in_progress", lang))
+            return
+        user = await db.get_user(telegram_id)
+        if user is None or user.status != UserStatus.REGISTERED:
+            await sender.reply(message, templates.text("exam.not_registered", lang))
+            return
+        try:
+            questions = get_question_bank().sample_test(TEST_TYPES[test_type])
+        except (OSError, ValueError) as e:
+            logger.error("Question bank unavailable: %s", e)
+            await sender.reply(message, templates.text("exam.unavailable", lang))
+            return
+
+        session = sessions[telegram_id] = ExamSession(
+            test_type=test_type,
+            question_ids=[question.id for question in questions],
+            answers=[UNANSWERED] * len(questions),
+            lang=lang,
+        )
+        save(telegram_id, session)
+        duration = EXAM_DURATION * len(questions) // SKD_QUESTIONS
+        exam_timers.start_exam(telegram_id, duration, lang=lang)
+        await track(telegram_id, session, "STARTED")
+        await sender.reply(
+            message,
+            templates.text("exam.started", lang, test_type=test_type, count=len(questions), minutes=duration // 60),
+        )
+        await send_question(client, telegram_id, session)
+
+    # Ketika pengguna mengumpulkan tes sebelum waktunya habis
+    @app.on_message(filters.command("submit"))
+    async def _(client: Client, message: Message):
+        if message.from_user.id not in sessions:
+            await sender.reply(message, templates.text("exam.no_exam", language_of(message)))
+            return
+        await submit(client, message.from_user.id)
+
+    # Menangani jawaban A-E selama tes berlangsung
+    @app.on_message(filters.text & ~filters.regex(r"^/") & filters.create(in_exam))
+    async def _(client: Client, message: Message):
+        telegram_id = message.from_user.id
+        session = sessions[telegram_id]
+        question_id = session.question_ids[session.current]
+        labels = OPTION_LABELS[: len(get_question_bank().get(question_id).options)]
+        label = message.text.strip().upper()
+        if len(label) != 1 or label not in labels:
+            await sender.reply(message, templates.text("exam.choose_option", session.lang, labels=", ".join(labels)))
+            return
+
+        answer = labels.index(label)
+        session.answers[session.current] = answer
+        await answer_events.add(
+            {"telegram_id": telegram_id, "test_type": session.test_type, "question_id": question_id, "answer": answer}
+        )
+        session.current += 1
+        if sessions.get(telegram_id) is not session:
+            # Handed in by the deadline meanwhile
+            return
+        save(telegram_id, session)
+        if session.current == len(session.question_ids):
+            await submit(client, telegram_id)
+        else:
+            await send_question(client, telegram_id, session)
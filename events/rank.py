@@ -0,0 +1,51 @@
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from plugins.ranking import ranking
+from plugins.sender import sender
+from plugins.templates import templates, language_of
+from settings.logger import BotLogger
+
+logger = BotLogger("rank.py")
+
+templates.add(
+    "rank.no_score",
+    "Anda belum memiliki nilai untuk tes {test_type}. Gunakan perintah /select_test untuk memulai tes simulasi.",
+    "You don't have a score for the {test_type} test yet. Use the /select_test command to start a simulation.",
+).add(
+    "rank.result",
+    "Peringkat Anda untuk tes {test_type}: {rank} dari {participants} peserta. "
+    "Nilai Anda lebih baik atau sama dengan {percentile:.1f}% peserta.",
+    "Your rank for the {test_type} test: {rank} of {participants} participants. "
+    "Your score is better than or equal to {percentile:.1f}% of participants.",
+).add(
+    "rank.unknown_test",
+    "Jenis tes tidak dikenal. Pilih salah satu: {test_types}.",
+    "Unknown test type. Choose one of: {test_types}.",
+)
+
+
+def response_message(test_type: str, result, lang: str) -> str:
+    if result is None:
+        return templates.text("rank.no_score", lang, test_type=test_type)
+    rank, participants, percentile = result
+    return templates.text(
+        "rank.result", lang, test_type=test_type, rank=rank, participants=participants, percentile=percentile
+    )
+
+
+def handler(app: Client):
+    """
+    Register the rank command handler with the Telegram bot client.
+    """
+
+    @app.on_message(filters.command("rank"))
+    async def _(_, message: Message):
+        lang = language_of(message)
+        test_type = message.command[1].upper() if len(message.command) > 1 else "SKD"
+        if test_type not in ranking.max_scores:
+            await sender.reply(
+                message, templates.text("rank.unknown_test", lang, test_types=", ".join(ranking.max_scores))
+            )
+            return
+        result = ranking.rank(test_type, message.from_user.id)
+        await sender.reply(message, response_message(test_type, result, lang))
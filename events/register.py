@@ -1,20 +1,77 @@
 from pydantic import BaseModel
 from pyrogram import Client, filters
-from pyrogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, ForceReply
-from plugins.supabase import UserDatabase
+from pyrogram.types import Message
+from plugins.supabase import AsyncUserDatabase
 from models.users import UserStatus
 from typing import Literal
 import re
+import json
+from functools import lru_cache
 from settings.logger import BotLogger
+from settings.bot import on_shutdown
+from settings.metrics import metrics
+from plugins.state_store import StateStore, create_state_store
+from settings.fsm import StateMachine, fsm_router
+from plugins.sender import sender
+from plugins.templates import templates, language_of
 
 logger = BotLogger("register.py")
 
+db = AsyncUserDatabase()
 
-class Model(BaseModel):
-    step: Literal["step1", "step2", "step3", "step4"] = "step1"
-    email: str = None
-    phone: str = None
 
+templates.add(
+    "register.not_started",
+    "Anda belum memulai bot. Gunakan perintah /start terlebih dahulu.",
+    "You haven't started the bot yet. Please use the /start command first.",
+).add(
+    "register.already_registered",
+    "Anda sudah terdaftar. Gunakan perintah /select_test untuk memilih jenis tes yang ingin Anda ambil.",
+    "You are already registered. Use the /select_test command to choose the test you want to take.",
+).add(
+    "register.in_progress",
+    "Anda sudah dalam proses registrasi. Silakan selesaikan terlebih dahulu.",
+    "Your registration is already in progress. Please complete it first.",
+).add(
+    "register.ask_email",
+    "Pendaftaran ini memerlukan email Anda. Apakah Anda bersedia memberikan email Anda?",
+    "Registration requires your email address. Are you willing to provide it? (Ya = yes, Tidak = no)",
+).add(
+    "register.choose_yes_no",
+    "Mohon pilih 'Ya' atau 'Tidak'.",
+    "Please choose 'Ya' (yes) or 'Tidak' (no).",
+).add(
+    "register.cancelled",
+    "Pendaftaran dibatalkan.",
+    "Registration cancelled.",
+).add(
+    "register.email_given",
+    "Anda sudah memberikan email. Lanjutkan ke langkah berikutnya.",
+    "You have already provided your email. Continue to the next step.",
+).add(
+    "register.enter_email",
+    "Silakan masukkan email Anda:",
+    "Please enter your email address:",
+).add(
+    "register.invalid_email",
+    "Email yang dimasukkan tidak valid. Silakan masukkan email yang benar.",
+    "The email address is not valid. Please enter a valid email address.",
+).add(
+    "register.ask_phone",
+    "Apakah Anda bersedia nomor telepon Anda disimpan? Anda tetap bisa menggunakan bot tanpa memberikan nomor telepon.",
+    "May we store your phone number? You can still use the bot without it. (Ya = yes, Tidak = no)",
+).add(
+    "register.completed",
+    "Terima kasih telah mendaftar. Anda bisa memulai tes simulasi dengan menggunakan perintah /select_test.",
+    "Thank you for registering. You can start a simulation test with the /select_test command.",
+).add(
+    "register.no_session",
+    "Anda belum memulai proses pendaftaran. Gunakan perintah /register terlebih dahulu.",
+    "You haven't started the registration yet. Please use the /register command first.",
+)
+
+
+class Model:
     """A class to handle the registration process of a user.
     step: str = The current state of the registration process.
     it can be either "step1", "step2", "step3", or "step4".
@@ -27,152 +84,189 @@ class Model(BaseModel):
     phone: str = The phone number of the user. (default: None)
     """
 
+    __slots__ = ("step", "email", "phone")
+
+    def __init__(
+        self,
+        step: Literal["step1", "step2", "step3", "step4"] = "step1",
+        email: str = None,
+        phone: str = None,
+    ):
+        self.step = step
+        self.email = email
+        self.phone = phone
+
+    def pack(self) -> bytes:
+        """Serialize the state as a compact positional JSON array."""
+        return json.dumps(
+            [self.step, self.email, self.phone], separators=(",", ":")
+        ).encode()
+
+    @classmethod
+    def unpack(cls, raw: bytes) -> "Model":
+        """Rebuild the state produced by pack()."""
+        step, email, phone = json.loads(raw)
+        return cls(step, email, phone)
+
 
 class Validation(BaseModel):
     status: bool
     message: str | None = None
 
 
+# Validation results never change once built, so every step reuses them
+VALID = Validation(status=True)
+
+
+@lru_cache(maxsize=None)
+def invalid(key: str, lang: str) -> Validation:
+    """Return the shared failed Validation replying with template key in lang."""
+    return Validation(status=False, message=templates.text(key, lang))
+
+
+@lru_cache(maxsize=None)
+def valid(message: str) -> Validation:
+    """Return the shared successful Validation carrying message."""
+    return Validation(status=True, message=message)
+
+
 class StepHandler:
-    def __init__(self):
-        self.data: dict[int, Model] = {}
+    def __init__(self, store: StateStore = None):
+        # Registration state per telegram_id, serialized with Model.pack()
+        self.store = store or create_state_store()
 
     def user_exists(self, telegram_id: int):
-        return telegram_id in self.data
+        return telegram_id in self.store
 
     def assign(self, telegram_id: int):
-        self.data[telegram_id] = Model(step="step1")
+        self.store.set(telegram_id, Model(step="step1").pack())
 
     def update(self, telegram_id: int, **kwargs):
+        state = Model.unpack(self.store.get(telegram_id))
         for key, value in kwargs.items():
-            setattr(self.data[telegram_id], key, value)
+            setattr(state, key, value)
+        self.store.set(telegram_id, state.pack())
 
     def get(self, telegram_id: int, key: str):
-        return getattr(self.data[telegram_id], key)
-
-    def register_user(self, telegram_id: int, email: str, phone: str = None):
-        db = UserDatabase()
-        user = db.get_user(telegram_id)
-        if user:
-            user.email = email
-            user.status = UserStatus.REGISTERED
-            if phone:
-                user.phone_number = phone
-            db.register_user(telegram_id, email, phone)
-
-    def start(self, msg: Message):
+        return getattr(Model.unpack(self.store.get(telegram_id)), key)
+
+    def current_step(self, telegram_id: int):
+        """Return the current step, or None if the session has expired."""
+        raw = self.store.get(telegram_id)
+        return Model.unpack(raw).step if raw is not None else None
+
+    def remove(self, telegram_id: int):
+        self.store.delete(telegram_id)
+
+    def stats(self) -> dict:
+        """Return the size and eviction counters of the session store."""
+        return self.store.stats()
+
+    async def register_user(self, telegram_id: int, email: str, phone: str = None):
+        return await db.register_and_return(telegram_id, email, phone)
+
+    async def start(self, msg: Message):
         """Mengecek apakah pengguna dapat memulai proses pendaftaran."""
-        user = UserDatabase().get_user(msg.from_user.id)
+        lang = language_of(msg)
+        user = await db.get_user(msg.from_user.id)
         if not user:
-            return Validation(
-                status=False,
-                message="Anda belum memulai bot. Gunakan perintah /start terlebih dahulu.",
-            )
+            return invalid("register.not_started", lang)
         if user.status == UserStatus.REGISTERED:
-            return Validation(
-                status=False,
-                message="Anda sudah terdaftar. Gunakan perintah /select_test untuk memilih jenis tes yang ingin Anda ambil.",
-            )
-        if msg.from_user.id in self.data:
-            return Validation(
-                status=False,
-                message="Anda sudah dalam proses registrasi. Silakan selesaikan terlebih dahulu.",
-            )
+            return invalid("register.already_registered", lang)
+        if self.user_exists(msg.from_user.id):
+            return invalid("register.in_progress", lang)
         self.assign(msg.from_user.id)
-        return Validation(status=True)
+        return VALID
 
     def step1_action(self, msg: Message):
         """Menanyakan kesediaan pengguna untuk memberikan email sebagai bagian dari proses pendaftaran."""
-        markup = ReplyKeyboardMarkup(
-            [[KeyboardButton("Tidak")], [KeyboardButton("Ya")]],
-            one_time_keyboard=True,
-            resize_keyboard=True,
-        )
-        return msg.reply_text(
-            "Pendaftaran ini memerlukan email Anda. Apakah Anda bersedia memberikan email Anda?",
-            reply_markup=markup,
+        return sender.reply(
+            msg,
+            templates.text("register.ask_email", language_of(msg)),
+            reply_markup=templates.markup("keyboard.yes_no"),
         )
 
     def step1_validation(self, msg: Message):
         """Mengecek apakah pengguna memilih 'Ya' atau 'Tidak' saat diminta memberikan email."""
+        lang = language_of(msg)
         if msg.text.lower() not in ["ya", "tidak"]:
-            return Validation(status=False, message="Mohon pilih 'Ya' atau 'Tidak'.")
+            return invalid("register.choose_yes_no", lang)
         if msg.text.lower() == "tidak":
-            del self.data[msg.from_user.id]
-            return Validation(status=False, message="Pendaftaran dibatalkan.")
-        if msg.text.lower() == "ya" and self.data[msg.from_user.id].email:
-            return Validation(
-                status=False,
-                message="Anda sudah memberikan email. Lanjutkan ke langkah berikutnya.",
-            )
-        self.update(msg.from_user.id, step="step2")
-        return Validation(status=True)
-
-    def step2_action(self, msg: Message):
+            self.remove(msg.from_user.id)
+            return invalid("register.cancelled", lang)
+        if msg.text.lower() == "ya" and self.get(msg.from_user.id, "email"):
+            return invalid("register.email_given", lang)
+        return VALID
+
+    def step2_action(self, msg: Message, validation: Validation = None):
         """Meminta pengguna untuk memberikan email mereka."""
-        return msg.reply_text(
-            "Silakan masukkan email Anda:",
-            reply_markup=ForceReply(selective=True),
+        return sender.reply(
+            msg,
+            templates.text("register.enter_email", language_of(msg)),
+            reply_markup=templates.markup("markup.force_reply"),
         )
 
     def step2_validation(self, msg: Message):
         """Memvalidasi email yang dimasukkan oleh pengguna."""
         email = msg.text.strip()  # Remove leading and trailing whitespaces
         if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            return Validation(
-                status=False,
-                message="Email yang dimasukkan tidak valid. Silakan masukkan email yang benar.",
-            )
-        self.update(msg.from_user.id, email=email, step="step3")
-        return Validation(status=True)
-
-    def step3_action(self, msg: Message):
+            return invalid("register.invalid_email", language_of(msg))
+        self.update(msg.from_user.id, email=email)
+        return VALID
+
+    def step3_action(self, msg: Message, validation: Validation = None):
         """Menanyakan kesediaan pengguna untuk memberikan nomor telepon mereka."""
-        markup = ReplyKeyboardMarkup(
-            [[KeyboardButton("Tidak")], [KeyboardButton("Ya")]],
-            one_time_keyboard=True,
-            resize_keyboard=True,
-        )
-        return msg.reply_text(
-            "Apakah Anda bersedia nomor telepon Anda disimpan? Anda tetap bisa menggunakan bot tanpa memberikan nomor telepon.",
-            reply_markup=markup,
+        return sender.reply(
+            msg,
+            templates.text("register.ask_phone", language_of(msg)),
+            reply_markup=templates.markup("keyboard.yes_no"),
         )
 
     def step3_validation(self, msg: Message):
         """Memvalidasi respon pengguna saat diminta memberikan nomor telepon."""
         if msg.text.lower() not in ["ya", "tidak"]:
-            return Validation(status=False, message="Mohon pilih 'Ya' atau 'Tidak'.")
+            return invalid("register.choose_yes_no", language_of(msg))
         if msg.text.lower() == "tidak":
-            self.update(msg.from_user.id, step="step4")
-            return Validation(status=True, message="tidak")
+            return valid("tidak")
         if msg.text.lower() == "ya" and (
             not msg.from_user.phone_number
             or msg.from_user.phone_number == "0"
             or msg.from_user.phone_number == ""
             or msg.from_user.phone_number is None
         ):
-            self.update(msg.from_user.id, step="step4")
-            return Validation(status=True, message="kosong")
-        self.update(msg.from_user.id, step="step4", phone=msg.from_user.phone_number)
-        return Validation(status=True, message=msg.text.lower())
+            return valid("kosong")
+        self.update(msg.from_user.id, phone=msg.from_user.phone_number)
+        return valid(msg.text.lower())
 
-    def step4_action(self, msg: Message, status: str):
+    async def step4_action(self, msg: Message, validation: Validation):
         """Menyelesaikan proses pendaftaran pengguna."""
-        email = self.get(msg.from_user.id, "email")
-        phone_number = self.get(msg.from_user.id, "phone")
-        self.register_user(msg.from_user.id, email, phone_number)
-        del self.data[msg.from_user.id]
-
-        if status in ["tidak", "kosong"]:
-            return msg.reply_text(
-                "Terima kasih telah mendaftar. Anda bisa memulai tes simulasi dengan menggunakan perintah /select_test."
-            )
-        return msg.reply_text(
-            "Terima kasih telah mendaftar. Anda bisa memulai tes simulasi dengan menggunakan perintah /select_test."
+        state = Model.unpack(self.store.get(msg.from_user.id))
+        await self.register_user(msg.from_user.id, state.email, state.phone)
+        self.remove(msg.from_user.id)
+
+        return await sender.reply(
+            msg, templates.text("register.completed", language_of(msg))
         )
 
 
 on_register = StepHandler()
+metrics.register("register_sessions", on_register.stats)
+on_shutdown(on_register.store.close)
+
+# Tabel langkah registrasi: step -> (validasi, aksi, step berikutnya)
+register_flow = fsm_router.add(
+    StateMachine(
+        "register",
+        has_session=on_register.user_exists,
+        get_step=on_register.current_step,
+        set_step=lambda telegram_id, step: on_register.update(telegram_id, step=step),
+        reply=sender.reply,
+        fallback=templates.text("register.no_session"),
+    )
+    .add("step1", on_register.step1_validation, on_register.step2_action, "step2")
+    .add("step2", on_register.step2_validation, on_register.step3_action, "step3")
+    .add("step3", on_register.step3_validation, on_register.step4_action, "step4")
+)
 
 
 def handler(app: Client):
@@ -183,38 +277,11 @@ def handler(app: Client):
     # Ketika pengguna memulai proses pendaftaran
     @app.on_message(filters.command("register"))
     async def _(_, message: Message):
-        validation = on_register.start(message)
+        validation = await on_register.start(message)
         if not validation.status:
-            await message.reply_text(validation.message)
+            await sender.reply(message, validation.message)
         else:
             await on_register.step1_action(message)
 
     # Menangani respon pengguna selama proses pendaftaran
-    @app.on_message(
-        filters.text
-        & filters.create(lambda _, __, m: on_register.user_exists(m.from_user.id))
-    )
-    async def __(_, message: Message):
-        current_step = on_register.get(message.from_user.id, "step")
-        if current_step == "step1":
-            is_valid = on_register.step1_validation(message)
-            if not is_valid.status:
-                await message.reply_text(is_valid.message)
-            else:
-                await on_register.step2_action(message)
-        elif current_step == "step2":
-            is_valid = on_register.step2_validation(message)
-            if not is_valid.status:
-                await message.reply_text(is_valid.message)
-            else:
-                await on_register.step3_action(message)
-        elif current_step == "step3":
-            is_valid = on_register.step3_validation(message)
-            if not is_valid.status:
-                await message.reply_text(is_valid.message)
-            else:
-                await on_register.step4_action(message, is_valid.message)
-        else:
-            await message.reply_text(
-                "Anda belum memulai proses pendaftaran. Gunakan perintah /register terlebih dahulu."
-            )
+    fsm_router.install(app)
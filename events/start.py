@@ -1,10 +1,15 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message
-from plugins.supabase import UserDatabase
+from plugins.supabase import AsyncUserDatabase
+from plugins.sender import sender
+from plugins.templates import templates, language_of, DEFAULT_LANGUAGE
+from models.users import UserStatus
 from logging import Logger
 
 logger = Logger("start.py")
 
+db = AsyncUserDatabase()
+
 
 def handler(app: Client):
     """
@@ -13,27 +18,37 @@ def handler(app: Client):
 
     @app.on_message(filters.command("start"))
     async def _(client: Client, message: Message):
-        db = UserDatabase()
-        telegram_id = message.from_user.id
-        user = db.get_user(telegram_id)
+        user = await db.upsert_user(message.from_user)
 
         status = user.status if user else "NEW"
 
-        if not user:
-            db.insert_new_user(message.from_user)
-
-        respond = response_message(status)
-        await message.reply_text(respond)
-
-
-def response_message(status):
-    if status == "NEW":
-        return "Selamat datang di CPNS Simulator Bot! Kami senang Anda bergabung dengan kami. Untuk memulai, silakan daftar dengan menggunakan perintah /register."
-    elif status == "RETURNED":
-        return "Selamat datang kembali di CPNS Simulator Bot! Kami senang Anda kembali. Untuk memulai lagi, silakan daftar ulang dengan menggunakan perintah /register."
-    elif status == "REGISTERED":
-        return "Anda sudah terdaftar di CPNS Simulator Bot. Mari kita mulai tes simulasi! Gunakan perintah /select_test untuk memilih jenis tes yang ingin Anda ambil."
-    elif status == "CANCELLED":
-        return "Anda telah membatalkan pendaftaran sebelumnya. Jika Anda ingin bergabung kembali, silakan daftar ulang dengan menggunakan perintah /register."
-    elif status == "DELETED":
-        return "Kami perhatikan Anda telah menghapus CPNS Simulator Bot sebelumnya. Jika Anda ingin kembali menggunakan layanan kami, silakan daftar ulang dengan menggunakan perintah /register. Kami senang bisa membantu Anda lagi!"
+        respond = response_message(status, language_of(message))
+        await sender.reply(message, respond)
+
+
+templates.add(
+    "start.NEW",
+    "Selamat datang di CPNS Simulator Bot! Kami senang Anda bergabung dengan kami. Untuk memulai, silakan daftar dengan menggunakan perintah /register.",
+    "Welcome to CPNS Simulator Bot! We're glad to have you. To get started, please register with the /register command.",
+).add(
+    "start.RETURNED",
+    "Selamat datang kembali di CPNS Simulator Bot! Kami senang Anda kembali. Untuk memulai lagi, silakan daftar ulang dengan menggunakan perintah /register.",
+    "Welcome back to CPNS Simulator Bot! We're glad you're back. To start again, please register with the /register command.",
+).add(
+    "start.REGISTERED",
+    "Anda sudah terdaftar di CPNS Simulator Bot. Mari kita mulai tes simulasi! Gunakan perintah /select_test untuk memilih jenis tes yang ingin Anda ambil.",
+    "You are already registered with CPNS Simulator Bot. Let's start a simulation! Use the /select_test command to choose the test you want to take.",
+).add(
+    "start.CANCELLED",
+    "Anda telah membatalkan pendaftaran sebelumnya. Jika Anda ingin bergabung kembali, silakan daftar ulang dengan menggunakan perintah /register.",
+    "You cancelled your previous registration. If you'd like to join again, please register with the /register command.",
+).add(
+    "start.DELETED",
+    "Kami perhatikan Anda telah menghapus CPNS Simulator Bot sebelumnya. Jika Anda ingin kembali menggunakan layanan kami, silakan daftar ulang dengan menggunakan perintah /register. Kami senang bisa membantu Anda lagi!",
+    "We noticed you deleted CPNS Simulator Bot before. If you'd like to use our service again, please register with the /register command. We're happy to help you again!",
+)
+
+
+def response_message(status, lang: str = DEFAULT_LANGUAGE):
+    status = status.value if isinstance(status, UserStatus) else status
+    return templates.text(f"start.{status}", lang)
@@ -1,6 +1,8 @@
 from settings.bot import init_bot as bot_initialization
 from settings.logger import BotLogger
-from settings.event_handler import EventHandler, EventHandlerType
+from settings.event_handler import EventHandler
+from settings.sharding import install as install_shard_filter
+from settings.metrics import start_exporters as start_metrics_exporters
 
 # Initialize the logger for the bot
 logger = BotLogger("app")
@@ -8,28 +10,19 @@ logger = BotLogger("app")
 # Initialize the bot using the configuration settings
 app = bot_initialization()
 
+# Drop updates of users owned by other workers when started by supervisor.py
+install_shard_filter(app)
+
 # Create an event handler for the bot
 handler = EventHandler(app)
 
-# Register the help command with the event handler
-handler.register(
-    EventHandlerType(
-        filename="register",
-        description="Register command",
-    )
-)
-
-# Register the start command with the event handler
-handler.register(
-    EventHandlerType(
-        filename="start",
-        description="Start command",
-    )
-)
+# Register every module in events/, ordered by events/manifest.toml
+handler.discover()
 
 if __name__ == "__main__":
     # Load and run the bot
     handler.load()
+    start_metrics_exporters()
     logger.info("Starting the bot")
     logger.info("Bot is running")
     app.run()
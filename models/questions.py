@@ -0,0 +1,346 @@
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+from enum import Enum
+from typing import Iterable, Optional
+from pydantic import BaseModel
+
+
+class Category(str, Enum):
+    TWK = "TWK"  # Tes Wawasan Kebangsaan
+    TIU = "TIU"  # Tes Intelegensia Umum
+    TKP = "TKP"  # Tes Karakteristik Pribadi
+
+
+# Jumlah soal per kategori pada satu paket SKD
+SKD_COMPOSITION = {Category.TWK: 30, Category.TIU: 35, Category.TKP: 45}
+
+# Nilai benar untuk TWK dan TIU; TKP memakai bobot 1-5 per opsi
+CORRECT_SCORE = 5
+OPTION_COUNT = 5
+
+QUESTION_BANK_PATH = os.environ.get("QUESTION_BANK_PATH", "data/questions.qbank")
+
+_CATEGORIES = list(Category)
+
+
+class Question(BaseModel):
+    id: Optional[int] = None
+    category: Category
+    difficulty: int = 1
+    tags: list[str] = []
+    text: str
+    options: list[str]
+    # Score of each option: CORRECT_SCORE for the right TWK/TIU answer, 1-5 for TKP
+    scores: list[int]
+
+    @property
+    def answer(self) -> Optional[int]:
+        """Index of the correct option for TWK and TIU questions."""
+        if self.category == Category.TKP:
+            return None
+        return self.scores.index(max(self.scores))
+
+
+# File layout (little-endian):
+#   header | records (RECORD.size each) | UTF-8 JSON blob | u32 id lists | JSON index directory
+HEADER = struct.Struct("<4sHHIIIIIII")
+RECORD = struct.Struct("<IIBBB5s")
+MAGIC = b"QBNK"
+VERSION = 1
+
+
+def _index_key(category=None, difficulty=None, tag=None) -> str:
+    parts = []
+    if category is not None:
+        parts.append(f"category:{Category(category).value}")
+    if difficulty is not None:
+        parts.append(f"difficulty:{difficulty}")
+    if tag is not None:
+        parts.append(f"tag:{tag}")
+    return "|".join(parts)
+
+
+def _check_record(question_id: int, question: Question):
+    """
+    Raise ValueError if the question can't be stored in a RECORD unchanged.
+    """
+    if len(question.options) > OPTION_COUNT:
+        raise ValueError(
+            f"Question {question_id} has {len(question.options)} options, at most {OPTION_COUNT} are supported"
+        )
+    if len(question.scores) != len(question.options):
+        raise ValueError(
+            f"Question {question_id} has {len(question.scores)} scores for {len(question.options)} options"
+        )
+    if not 0 <= question.difficulty <= 255:
+        raise ValueError(f"Question {question_id} has difficulty {question.difficulty}, expected 0-255")
+    if not all(0 <= score <= 255 for score in question.scores):
+        raise ValueError(f"Question {question_id} has a score outside 0-255")
+
+
+def build_question_bank(questions: Iterable[Question], path: str = QUESTION_BANK_PATH) -> int:
+    """
+    Write questions to a memory-mappable question bank file.
+
+    Indexes are stored for every category, difficulty and tag, and for
+    every category and difficulty pair.
+
+    Args:
+        questions: The questions to store; ids are assigned in order.
+        path (str): Location of the question bank file.
+
+    Returns:
+        int: The number of stored questions.
+
+    Raises:
+        ValueError: If a question doesn't fit in a fixed-size record.
+    """
+    records = bytearray()
+    blob = bytearray()
+    indexes: dict[str, list[int]] = {}
+    count = 0
+
+    for question_id, question in enumerate(questions):
+        _check_record(question_id, question)
+        payload = json.dumps(
+            {"q": question.text, "o": question.options, "t": question.tags},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode()
+        scores = bytes(question.scores).ljust(OPTION_COUNT, b"\0")
+        records += RECORD.pack(
+            len(blob),
+            len(payload),
+            _CATEGORIES.index(question.category),
+            question.difficulty,
+            len(question.options),
+            scores,
+        )
+        blob += payload
+
+        keys = [
+            _index_key(category=question.category),
+            _index_key(difficulty=question.difficulty),
+            _index_key(category=question.category, difficulty=question.difficulty),
+        ]
+        keys += [_index_key(tag=tag) for tag in question.tags]
+        keys.append("")  # every question
+        for key in keys:
+            indexes.setdefault(key, []).append(question_id)
+        count += 1
+
+    records_offset = HEADER.size
+    blob_offset = records_offset + len(records)
+    ids_offset = (blob_offset + len(blob) + 3) & ~3
+    ids = bytearray()
+    directory = {}
+    for key, question_ids in indexes.items():
+        directory[key] = [ids_offset + len(ids), len(question_ids)]
+        ids += struct.pack(f"<{len(question_ids)}I", *question_ids)
+    directory_bytes = json.dumps(directory, separators=(",", ":")).encode()
+    directory_offset = ids_offset + len(ids)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                0,
+                count,
+                records_offset,
+                blob_offset,
+                len(blob),
+                ids_offset,
+                directory_offset,
+                len(directory_bytes),
+            )
+        )
+        f.write(records)
+        f.write(blob)
+        f.write(b"\0" * (ids_offset - blob_offset - len(blob)))
+        f.write(ids)
+        f.write(directory_bytes)
+    os.replace(tmp_path, path)
+    return count
+
+
+class QuestionIds:
+    """
+    Read-only sequence of question ids stored in the mapped file.
+    """
+
+    __slots__ = ("_buffer", "_offset", "_count")
+
+    def __init__(self, buffer, offset: int, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("question id index out of range")
+        return struct.unpack_from("<I", self._buffer, self._offset + 4 * index)[0]
+
+    def __iter__(self):
+        return (value for (value,) in struct.iter_unpack(
+            "<I", self._buffer[self._offset : self._offset + 4 * self._count]
+        ))
+
+
+class QuestionBank:
+    """
+    Memory-mapped, read-only question bank.
+
+    Opening a bank only reads the header and the index directory; question
+    records are paged in by the OS on access and shared by every worker
+    process mapping the same file, so startup time and resident memory do
+    not grow with the size of the bank.
+
+    Args:
+        path (str): Location of a file written by build_question_bank().
+    """
+
+    def __init__(self, path: str = QUESTION_BANK_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            _,
+            self.count,
+            self._records_offset,
+            self._blob_offset,
+            _,
+            _,
+            directory_offset,
+            directory_length,
+        ) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} question bank")
+        self._directory: dict[str, list[int]] = json.loads(
+            self._map[directory_offset : directory_offset + directory_length]
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, question_id: int) -> Question:
+        """
+        Return a question by id.
+        """
+        if not 0 <= question_id < self.count:
+            raise IndexError(f"Unknown question id: {question_id}")
+        offset, length, category, difficulty, option_count, scores = RECORD.unpack_from(
+            self._map, self._records_offset + RECORD.size * question_id
+        )
+        start = self._blob_offset + offset
+        payload = json.loads(self._map[start : start + length])
+        return Question.model_construct(
+            id=question_id,
+            category=_CATEGORIES[category],
+            difficulty=difficulty,
+            tags=payload["t"],
+            text=payload["q"],
+            options=payload["o"],
+            scores=list(scores[:option_count]),
+        )
+
+    def ids(self, category=None, difficulty=None, tag=None) -> QuestionIds:
+        """
+        Return the ids matching the given filters.
+
+        Any combination of one filter, or category with difficulty, is
+        answered from a stored index.
+        """
+        key = _index_key(category, difficulty, tag)
+        entry = self._directory.get(key)
+        if entry is None:
+            if tag is not None and (category is not None or difficulty is not None):
+                raise ValueError("Tags can't be combined with other filters")
+            return QuestionIds(self._map, 0, 0)
+        return QuestionIds(self._map, entry[0], entry[1])
+
+    def tags(self) -> list[str]:
+        """
+        Return every tag present in the bank.
+        """
+        return sorted(key[4:] for key in self._directory if key.startswith("tag:"))
+
+    def sample(
+        self,
+        k: int,
+        category=None,
+        difficulty=None,
+        tag=None,
+        rng: random.Random = None,
+    ) -> list[Question]:
+        """
+        Draw k distinct random questions matching the filters.
+
+        Only the drawn records are read, so the cost depends on k and not
+        on the size of the bank.
+        """
+        ids = self.ids(category, difficulty, tag)
+        rng = rng or random
+        positions = rng.sample(range(len(ids)), min(k, len(ids)))
+        return [self.get(ids[position]) for position in positions]
+
+    def sample_test(
+        self, composition: dict = SKD_COMPOSITION, rng: random.Random = None
+    ) -> list[Question]:
+        """
+        Draw a full simulation, e.g. 30 TWK, 35 TIU and 45 TKP questions.
+        """
+        questions = []
+        for category, k in composition.items():
+            questions += self.sample(k, category=category, rng=rng)
+        return questions
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_bank: QuestionBank = None
+
+
+def get_question_bank() -> QuestionBank:
+    """
+    Return the process-wide question bank, mapping QUESTION_BANK_PATH on first use.
+    """
+    global _bank
+    if _bank is None:
+        _bank = QuestionBank(QUESTION_BANK_PATH)
+    return _bank
+
+
+if __name__ == "__main__":
+    # python -m models.questions questions.jsonl data/questions.qbank
+    from settings.logger import BotLogger
+
+    logger = BotLogger("QUESTIONS")
+    if len(sys.argv) != 3:
+        logger.error("Usage: python -m models.questions <questions.jsonl> <output.qbank>")
+        sys.exit(1)
+    try:
+        with open(sys.argv[1], encoding="utf-8") as source:
+            total = build_question_bank(
+                (Question.model_validate_json(line) for line in source if line.strip()),
+                sys.argv[2],
+            )
+    except ValueError as e:
+        logger.error("Failed to build the question bank: %s", e)
+        sys.exit(1)
+    logger.info("Stored %d questions in %s", total, sys.argv[2])
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from pydantic import BaseModel
+from models.questions import Category, Question, OPTION_COUNT
+
+if TYPE_CHECKING:
+    # numpy is slow to import; it's loaded when the first test is scored
+    import numpy as np
+
+# Indeks kolom skor per kategori pada seluruh array hasil
+SECTIONS = list(Category)
+
+# Value of an unanswered question in an answers array
+UNANSWERED = -1
+
+
+class PassingGrade(BaseModel):
+    """Minimum score per section (nilai ambang batas SKD)."""
+
+    TWK: int = 65
+    TIU: int = 80
+    TKP: int = 166
+
+    def as_array(self) -> "np.ndarray":
+        import numpy as np
+
+        return np.array([getattr(self, section.value) for section in SECTIONS])
+
+
+class SessionScore(BaseModel):
+    totals: dict[Category, int]
+    passed: dict[Category, bool]
+    total: int
+    passed_all: bool
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """
+    Answer key of one test as NumPy arrays.
+
+    scores: uint8 array (questions, OPTION_COUNT) with the score of each option.
+    sections: uint8 array (questions,) with the index of each question's
+        category in SECTIONS.
+    """
+
+    scores: "np.ndarray"
+    sections: "np.ndarray"
+
+    @classmethod
+    def from_questions(cls, questions: list[Question]) -> "AnswerKey":
+        import numpy as np
+
+        scores = np.zeros((len(questions), OPTION_COUNT), dtype=np.uint8)
+        for row, question in enumerate(questions):
+            scores[row, : len(question.scores)] = question.scores
+        sections = np.fromiter(
+            (SECTIONS.index(question.category) for question in questions),
+            dtype=np.uint8,
+            count=len(questions),
+        )
+        return cls(scores, sections)
+
+
+@dataclass(frozen=True)
+class BatchScore:
+    """
+    Scores of many sessions.
+
+    totals: int array (sessions, len(SECTIONS)) of points per section.
+    passed: bool array (sessions, len(SECTIONS)) of passed sections.
+    passed_all: bool array (sessions,), True when every section passed.
+    """
+
+    totals: "np.ndarray"
+    passed: "np.ndarray"
+    passed_all: "np.ndarray"
+
+    def session(self, index: int) -> SessionScore:
+        """Return the score of one session of the batch."""
+        totals = self.totals[index]
+        passed = self.passed[index]
+        return SessionScore(
+            totals={section: int(totals[i]) for i, section in enumerate(SECTIONS)},
+            passed={section: bool(passed[i]) for i, section in enumerate(SECTIONS)},
+            total=int(totals.sum()),
+            passed_all=bool(self.passed_all[index]),
+        )
+
+
+def score_batch(
+    answers: "np.ndarray",
+    scores: "np.ndarray",
+    sections: "np.ndarray",
+    passing_grade: PassingGrade = PassingGrade(),
+) -> BatchScore:
+    """
+    Score a batch of sessions in one vectorized pass.
+
+    Args:
+        answers: int array (sessions, questions) with the chosen option of
+            each question, or UNANSWERED.
+        scores: Option scores, (questions, OPTION_COUNT) when every session
+            took the same test or (sessions, questions, OPTION_COUNT).
+        sections: Section index per question, (questions,) or
+            (sessions, questions).
+        passing_grade (PassingGrade): Thresholds per section.
+
+    Returns:
+        BatchScore: Section totals and pass/fail of every session.
+
+    Raises:
+        ValueError: If an answer is neither UNANSWERED nor an option index.
+    """
+    import numpy as np
+
+    answers = np.asarray(answers)
+    if answers.ndim == 1:
+        answers = answers[np.newaxis, :]
+    option_count = scores.shape[-1]
+    invalid = (answers < UNANSWERED) | (answers >= option_count)
+    if invalid.any():
+        session, question = np.argwhere(invalid)[0]
+        raise ValueError(
+            f"Invalid answer {answers[session, question]} to question {question} of session "
+            f"{session}, expected {UNANSWERED} or 0-{option_count - 1}"
+        )
+    unanswered = answers == UNANSWERED
+    choices = np.where(unanswered, 0, answers).astype(np.intp)
+
+    scores = np.broadcast_to(scores, answers.shape + (scores.shape[-1],))
+    points = np.take_along_axis(scores, choices[..., np.newaxis], axis=-1)[..., 0]
+    points = np.where(unanswered, 0, points).astype(np.int32)
+
+    sections = np.broadcast_to(sections, answers.shape)
+    totals = np.stack(
+        [(points * (sections == index)).sum(axis=1) for index in range(len(SECTIONS))],
+        axis=1,
+    )
+    passed = totals >= passing_grade.as_array()
+    return BatchScore(totals=totals, passed=passed, passed_all=passed.all(axis=1))
+
+
+def score_session(
+    answers: list[int],
+    key: AnswerKey,
+    passing_grade: PassingGrade = PassingGrade(),
+) -> SessionScore:
+    """
+    Score a single finished session.
+
+    Args:
+        answers: The chosen option per question, or UNANSWERED.
+        key (AnswerKey): The answer key of the test.
+        passing_grade (PassingGrade): Thresholds per section.
+
+    Raises:
+        ValueError: If an answer is neither UNANSWERED nor an option index.
+    """
+    return score_batch(answers, key.scores, key.sections, passing_grade).session(0)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, get_args
 from enum import Enum
+from functools import cache
 from uuid import UUID
 
 
@@ -22,3 +23,56 @@ class User(BaseModel):
     firstname: Optional[str] = None
     lastname: Optional[str] = None
     status: UserStatus = UserStatus.NEW
+
+    @classmethod
+    def from_row(cls, row: dict) -> "User":
+        """
+        Build a User from a row of our own users table without validating it.
+
+        Rows were validated before they were written, so only the values
+        whose Python type differs from their JSON form (UUID, enums) are
+        converted. A NULL in a column whose field isn't Optional, such as
+        the status of a row inserted without one, gets the field default.
+        Use model_validate for data from any other source.
+
+        Args:
+            row (dict): A row returned by Supabase.
+
+        Returns:
+            User: The user, with unknown columns ignored.
+        """
+        values = {name: row[name] for name in cls.model_fields if name in row}
+        for name in _defaulted_fields(cls):
+            if values.get(name) is None:
+                values.pop(name, None)
+        for name, convert in _row_converters(cls).items():
+            value = values.get(name)
+            if value is not None and not isinstance(value, convert):
+                values[name] = convert(value)
+        return cls.model_construct(**values)
+
+
+@cache
+def _defaulted_fields(model: type[BaseModel]) -> tuple[str, ...]:
+    """
+    Return the fields of model that have a default but don't accept None.
+    """
+    return tuple(
+        name
+        for name, field in model.model_fields.items()
+        if not field.is_required() and type(None) not in get_args(field.annotation)
+    )
+
+
+@cache
+def _row_converters(model: type[BaseModel]) -> dict[str, type]:
+    """
+    Return the fields of model holding a UUID or an enum, with their type.
+    """
+    converters = {}
+    for name, field in model.model_fields.items():
+        for annotation in (field.annotation, *get_args(field.annotation)):
+            if annotation is UUID or (isinstance(annotation, type) and issubclass(annotation, Enum)):
+                converters[name] = annotation
+                break
+    return converters
@@ -0,0 +1,265 @@
+import os
+import asyncio
+import time
+import uuid
+from typing import Optional
+from pydantic import BaseModel
+from pyrogram import Client
+from pyrogram.errors import InputUserDeactivated, PeerIdInvalid, UserIsBlocked
+from models.users import UserStatus
+from plugins.sender import sender, BULK
+from plugins.supabase import AsyncUserDatabase, USERS_PAGE_SIZE
+from settings.bot import on_before_stop
+from settings.logger import BotLogger
+from settings.sharding import shard_path
+
+logger = BotLogger("BROADCAST")
+
+# Jumlah pesan broadcast yang boleh menunggu pengiriman sekaligus
+BROADCAST_CONCURRENCY = int(os.environ.get("BROADCAST_CONCURRENCY", "50"))
+
+# Folder checkpoint broadcast milik worker yang menjalankan broadcast
+BROADCAST_DIR = shard_path(os.environ.get("BROADCAST_DIR", "data/broadcasts"))
+
+# Errors meaning the recipient can't be reached anymore, counted apart from failures
+UNREACHABLE = (UserIsBlocked, InputUserDeactivated, PeerIdInvalid)
+
+
+class BroadcastCheckpoint(BaseModel):
+    """
+    Progress of one broadcast. Every recipient up to and including
+    last_id has been handled, so a resumed broadcast starts after it.
+    """
+
+    id: str
+    text: str
+    status: UserStatus = UserStatus.REGISTERED
+    last_id: Optional[int] = None
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    started: float = 0.0
+    elapsed: float = 0.0
+    finished: bool = False
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+
+class Broadcaster:
+    """
+    Sends one message to every user with a given status.
+
+    Users are read page by page with keyset pagination and handed to the
+    send scheduler as bulk messages, at most `concurrency` at a time, so
+    memory stays constant however many recipients there are. After every
+    page the checkpoint is written to disk. cancel() lets the messages in
+    flight finish, so a cancelled broadcast resumes exactly where it
+    stopped. A send failing with ConnectionError stops the broadcast the
+    same way, without counting that recipient as handled. After a crash at
+    most one page is sent twice.
+
+    Args:
+        database (AsyncUserDatabase): Source of the recipients.
+        concurrency (int): Maximum number of messages in flight.
+        page_size (int): Users read per request.
+        checkpoint_dir (str): Folder of the checkpoint files.
+    """
+
+    def __init__(
+        self,
+        database: AsyncUserDatabase = None,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        page_size: int = USERS_PAGE_SIZE,
+        checkpoint_dir: str = BROADCAST_DIR,
+    ):
+        self.database = database or AsyncUserDatabase()
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.checkpoint_dir = checkpoint_dir
+        self.current: BroadcastCheckpoint = None
+        self._task: asyncio.Task = None
+        self._stopping = asyncio.Event()
+        self._resumed_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _path(self, broadcast_id: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{broadcast_id}.json")
+
+    def save(self, checkpoint: BroadcastCheckpoint):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = self._path(checkpoint.id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(checkpoint.model_dump_json())
+        os.replace(tmp_path, path)
+
+    def unfinished(self) -> BroadcastCheckpoint | None:
+        """
+        Return the most recently started broadcast that did not finish.
+        """
+        try:
+            names = os.listdir(self.checkpoint_dir)
+        except FileNotFoundError:
+            return None
+        latest = None
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self.checkpoint_dir, name)) as f:
+                checkpoint = BroadcastCheckpoint.model_validate_json(f.read())
+            if not checkpoint.finished and (latest is None or checkpoint.started > latest.started):
+                latest = checkpoint
+        return latest
+
+    def start(self, client: Client, text: str, status: UserStatus = UserStatus.REGISTERED) -> asyncio.Task:
+        """
+        Start a new broadcast in the background.
+
+        Raises:
+            RuntimeError: If a broadcast is already running.
+        """
+        checkpoint = BroadcastCheckpoint(
+            id=time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6],
+            text=text,
+            status=status,
+            started=time.time(),
+        )
+        return self._launch(client, checkpoint)
+
+    def resume(self, client: Client) -> asyncio.Task | None:
+        """
+        Continue the last unfinished broadcast, if there is one.
+
+        Raises:
+            RuntimeError: If a broadcast is already running.
+        """
+        checkpoint = self.unfinished()
+        if checkpoint is None:
+            return None
+        return self._launch(client, checkpoint)
+
+    def _launch(self, client: Client, checkpoint: BroadcastCheckpoint) -> asyncio.Task:
+        if self.running:
+            raise RuntimeError("A broadcast is already running")
+        self.current = checkpoint
+        self._stopping.clear()
+        self.save(checkpoint)
+        self._resumed_at = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run(client, checkpoint))
+        return self._task
+
+    async def _deliver(
+        self,
+        client: Client,
+        checkpoint: BroadcastCheckpoint,
+        telegram_id: int,
+        slots: asyncio.Semaphore,
+        done: list[bool],
+        index: int,
+    ):
+        async with slots:
+            if self._stopping.is_set():
+                return
+            try:
+                await sender.send(
+                    client.send_message, telegram_id, checkpoint.text, chat_id=telegram_id, priority=BULK
+                )
+                checkpoint.sent += 1
+            except UNREACHABLE:
+                checkpoint.blocked += 1
+            except ConnectionError as e:
+                # Not sent because the scheduler stopped or the connection dropped;
+                # stop here so the checkpoint stays before this recipient
+                self._stopping.set()
+                logger.warning("Broadcast %s stopping, send to %s failed: %s", checkpoint.id, telegram_id, e)
+                return
+            except Exception as e:
+                checkpoint.failed += 1
+                logger.debug("Broadcast to %s failed: %s", telegram_id, e)
+            done[index] = True
+
+    async def _run(self, client: Client, checkpoint: BroadcastCheckpoint):
+        logger.info("Broadcast %s started after telegram_id %s", checkpoint.id, checkpoint.last_id)
+        slots = asyncio.Semaphore(self.concurrency)
+        try:
+            async for page in self.database.iter_user_pages(
+                status=checkpoint.status, page_size=self.page_size, after=checkpoint.last_id
+            ):
+                recipients = [user.telegram_id for user in page]
+                done = [False] * len(recipients)
+                await asyncio.gather(
+                    *(
+                        self._deliver(client, checkpoint, telegram_id, slots, done, index)
+                        for index, telegram_id in enumerate(recipients)
+                    )
+                )
+                if self._stopping.is_set():
+                    # Messages still in flight were delivered; resume after the
+                    # recipients of this page that were handled in order
+                    handled = done.index(False) if False in done else len(done)
+                    if handled:
+                        checkpoint.last_id = recipients[handled - 1]
+                    logger.info("Broadcast %s stopped after telegram_id %s", checkpoint.id, checkpoint.last_id)
+                    return
+                checkpoint.last_id = recipients[-1]
+                self._checkpoint(checkpoint)
+            checkpoint.finished = True
+            logger.info(
+                "Broadcast %s finished: %d sent, %d blocked, %d failed",
+                checkpoint.id,
+                checkpoint.sent,
+                checkpoint.blocked,
+                checkpoint.failed,
+            )
+        except Exception as e:
+            logger.error("Broadcast %s interrupted: %s", checkpoint.id, e)
+        finally:
+            self._checkpoint(checkpoint)
+
+    def _checkpoint(self, checkpoint: BroadcastCheckpoint):
+        now = time.monotonic()
+        checkpoint.elapsed += now - self._resumed_at
+        self._resumed_at = now
+        self.save(checkpoint)
+
+    def stats(self) -> dict:
+        """
+        Return the delivery counts and send rate of the current broadcast.
+        """
+        checkpoint = self.current
+        if checkpoint is None:
+            return {}
+        elapsed = checkpoint.elapsed
+        if self.running:
+            elapsed += time.monotonic() - self._resumed_at
+        return {
+            "id": checkpoint.id,
+            "running": self.running,
+            "finished": checkpoint.finished,
+            "sent": checkpoint.sent,
+            "blocked": checkpoint.blocked,
+            "failed": checkpoint.failed,
+            "processed": checkpoint.processed,
+            "elapsed": elapsed,
+            "rate": checkpoint.processed / elapsed if elapsed else 0.0,
+        }
+
+    async def cancel(self):
+        """
+        Stop the running broadcast after the messages already in flight;
+        it can be resumed later.
+        """
+        if self.running:
+            self._stopping.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+# Broadcaster shared by the broadcast command; stopped broadcasts are resumable.
+# Cancelled before the client disconnects, so the messages in flight can still be sent
+broadcaster = Broadcaster()
+on_before_stop(broadcaster.cancel)
@@ -0,0 +1,306 @@
+import json
+import os
+import asyncio
+import threading
+from plugins.supabase import ResultDatabase, result_events
+from settings.bot import on_startup, on_shutdown
+from settings.logger import BotLogger
+from settings.sharding import SHARD_COUNT, shard_path
+
+logger = BotLogger("RANKING")
+
+# Lokasi snapshot peringkat dan interval penyimpanannya dalam detik
+RANKING_SNAPSHOT_PATH = shard_path(os.environ.get("RANKING_SNAPSHOT_PATH", "data/ranking.json"))
+RANKING_SNAPSHOT_INTERVAL = float(os.environ.get("RANKING_SNAPSHOT_INTERVAL", "300"))
+
+# Interval (detik) membaca hasil tes baru dari database saat berjalan dengan beberapa worker
+RANKING_REFRESH_INTERVAL = float(os.environ.get("RANKING_REFRESH_INTERVAL", "60"))
+
+# Highest possible score per test type; SKD is 30 TWK + 35 TIU + 45 TKP questions at 5 points
+MAX_SCORES = {"SKD": 550, "TWK": 150, "TIU": 175, "TKP": 225}
+
+
+class FenwickTree:
+    """
+    Binary indexed tree counting scores per integer bucket 0..size-1.
+    """
+
+    __slots__ = ("size", "tree")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index: int, delta: int = 1):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """Return the number of scores in buckets 0..index."""
+        index = min(index, self.size - 1) + 1
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+
+class Leaderboard:
+    """
+    Best score per user of one test type, with O(log n) rank queries.
+
+    Args:
+        max_score (int): Highest possible score; scores are clamped to 0..max_score.
+    """
+
+    def __init__(self, max_score: int):
+        self.max_score = max_score
+        self.scores: dict[int, int] = {}
+        self.tree = FenwickTree(max_score + 1)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def record(self, telegram_id: int, score: int) -> bool:
+        """
+        Record a score, keeping only the best score of each user.
+
+        Returns:
+            bool: True if the user's best score changed.
+        """
+        score = max(0, min(int(score), self.max_score))
+        previous = self.scores.get(telegram_id)
+        if previous is not None:
+            if score <= previous:
+                return False
+            self.tree.add(previous, -1)
+        self.scores[telegram_id] = score
+        self.tree.add(score)
+        return True
+
+    def rank(self, telegram_id: int) -> int | None:
+        """
+        Return the 1-based rank of a user; equal scores share a rank.
+        """
+        score = self.scores.get(telegram_id)
+        if score is None:
+            return None
+        return len(self.scores) - self.tree.prefix(score) + 1
+
+    def percentile(self, telegram_id: int) -> float | None:
+        """
+        Return the percentage of users scoring at or below the user.
+        """
+        score = self.scores.get(telegram_id)
+        if score is None:
+            return None
+        return 100 * self.tree.prefix(score) / len(self.scores)
+
+
+class RankingIndex:
+    """
+    Leaderboards of every test type, snapshotted to disk.
+
+    With several workers each one records only the results of its own
+    users, so the leaderboards are instead rebuilt from the test_results
+    table and refreshed with the results stored since, see load_ranking().
+
+    Args:
+        path (str): Location of the JSON snapshot.
+        max_scores (dict): Highest possible score per test type.
+    """
+
+    def __init__(self, path: str = RANKING_SNAPSHOT_PATH, max_scores: dict = MAX_SCORES):
+        self.path = path
+        self.max_scores = max_scores
+        self.boards: dict[str, Leaderboard] = {}
+        self.last_result_id = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshots: threading.Thread = None
+        self._refresher: threading.Thread = None
+
+    def board(self, test_type: str) -> Leaderboard:
+        board = self.boards.get(test_type)
+        if board is None:
+            if test_type not in self.max_scores:
+                raise ValueError(f"Unknown test type: {test_type}")
+            board = self.boards[test_type] = Leaderboard(self.max_scores[test_type])
+        return board
+
+    def record(self, test_type: str, telegram_id: int, score: int) -> bool:
+        with self._lock:
+            return self.board(test_type).record(telegram_id, score)
+
+    def rank(self, test_type: str, telegram_id: int) -> tuple[int, int, float] | None:
+        """
+        Return (rank, participants, percentile) of a user, or None without a score.
+        """
+        board = self.boards.get(test_type)
+        if board is None:
+            return None
+        with self._lock:
+            rank = board.rank(telegram_id)
+            if rank is None:
+                return None
+            return rank, len(board), board.percentile(telegram_id)
+
+    def snapshot(self):
+        """
+        Write every leaderboard to disk atomically.
+        """
+        with self._lock:
+            data = {
+                test_type: {str(k): v for k, v in board.scores.items()}
+                for test_type, board in self.boards.items()
+            }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def load_snapshot(self) -> bool:
+        """
+        Load the leaderboards written by snapshot().
+
+        Returns:
+            bool: False if there is no snapshot.
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        for test_type, scores in data.items():
+            for telegram_id, score in scores.items():
+                self.record(test_type, int(telegram_id), score)
+        return True
+
+    def rebuild(self, results):
+        """
+        Rebuild the leaderboards from (id, test_type, telegram_id, score) rows.
+        """
+        with self._lock:
+            self.boards = {}
+            self.last_result_id = 0
+        self.refresh(results)
+
+    def refresh(self, results) -> int:
+        """
+        Add (id, test_type, telegram_id, score) rows to the leaderboards.
+        Only best scores are kept, so rows recorded before are harmless.
+
+        Returns:
+            int: The number of rows read.
+        """
+        count = 0
+        for result_id, test_type, telegram_id, score in results:
+            with self._lock:
+                self.board(test_type).record(telegram_id, score)
+                self.last_result_id = max(self.last_result_id, result_id)
+            count += 1
+        return count
+
+    def start_refresh(self, database, interval: float = RANKING_REFRESH_INTERVAL):
+        """
+        Add the results stored by every worker every interval seconds from
+        a daemon thread.
+
+        Args:
+            database (ResultDatabase): Source of the results.
+        """
+        if self._refresher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh(database.iter_results(after_id=self.last_result_id))
+                except Exception as e:
+                    logger.error("Failed to refresh ranking: %s", e)
+
+        self._refresher = threading.Thread(target=run, name="ranking-refresh", daemon=True)
+        self._refresher.start()
+
+    def start_snapshots(self, interval: float = RANKING_SNAPSHOT_INTERVAL):
+        """
+        Snapshot the leaderboards every interval seconds from a daemon thread.
+        """
+
+        if self._snapshots is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.snapshot()
+                except OSError as e:
+                    logger.error("Failed to snapshot ranking: %s", e)
+
+        self._snapshots = threading.Thread(target=run, name="ranking-snapshot", daemon=True)
+        self._snapshots.start()
+
+    def close(self):
+        """
+        Stop the snapshot thread and write a final snapshot. Nothing is
+        written if snapshots never started, so leaderboards that were still
+        loading never replace a complete snapshot.
+        """
+        self._stop.set()
+        if self._snapshots is not None:
+            self.snapshot()
+
+
+def load_ranking(index: RankingIndex, sharded: bool = SHARD_COUNT > 1):
+    """
+    Load the ranking snapshot, or rebuild it from the test_results table,
+    then start snapshotting. Runs in a worker thread at startup.
+
+    With several workers a snapshot would only hold the results recorded
+    by one of them, so the ranking is always rebuilt and then refreshed
+    with the results every worker stores.
+    """
+    database = ResultDatabase()
+    if not sharded and index.load_snapshot():
+        logger.info("Ranking loaded from snapshot")
+    else:
+        try:
+            index.rebuild(database.iter_results())
+            logger.info("Ranking rebuilt from database")
+        except Exception as e:
+            logger.error("Failed to rebuild ranking: %s", e)
+            return
+    if sharded:
+        index.start_refresh(database)
+    else:
+        index.start_snapshots()
+
+
+# Leaderboards of every test type, filled in the background once the client has started
+ranking = RankingIndex()
+on_shutdown(ranking.close)
+
+
+@on_startup
+def start_loading(client):
+    # Not awaited, so /rank answers from partial leaderboards while the scan runs
+    asyncio.get_running_loop().run_in_executor(None, load_ranking, ranking)
+
+
+async def record_result(test_type: str, telegram_id: int, score: int) -> bool:
+    """
+    Store the score of a finished test and add it to the leaderboard.
+
+    Args:
+        test_type (str): One of MAX_SCORES, e.g. "SKD".
+        telegram_id (int): The Telegram ID of the user.
+        score (int): The total score of the test.
+
+    Returns:
+        bool: True if it is the user's best score of that test type.
+    """
+    await result_events.add({"telegram_id": telegram_id, "test_type": test_type, "score": int(score)})
+    return ranking.record(test_type, telegram_id, score)
@@ -0,0 +1,281 @@
+import os
+import sqlite3
+import threading
+import time
+from models.users import User
+from settings.logger import BotLogger
+
+logger = BotLogger("REPLICA")
+
+# Lokasi salinan lokal tabel users, dipakai bersama oleh semua worker
+REPLICA_PATH = os.environ.get("REPLICA_PATH", "data/users.sqlite3")
+
+# Interval tarikan inkremental dan rekonsiliasi penuh dalam detik (0 = nonaktif)
+REPLICA_SYNC_INTERVAL = float(os.environ.get("REPLICA_SYNC_INTERVAL", "30"))
+REPLICA_FULL_SYNC_INTERVAL = float(os.environ.get("REPLICA_FULL_SYNC_INTERVAL", "21600"))
+
+# Kolom timestamp yang menandai baris baru atau berubah, misalnya updated_at.
+# Dengan created_at, perubahan dari luar bot baru terlihat saat rekonsiliasi penuh
+REPLICA_CURSOR_COLUMN = os.environ.get("REPLICA_CURSOR_COLUMN", "created_at")
+
+COLUMNS = tuple(User.model_fields)
+
+# Pulled rows written to SQLite per transaction
+WRITE_BATCH = 500
+
+
+class UserReplica:
+    """
+    SQLite mirror of the users table, read instead of Supabase.
+
+    The mirror is filled by a full pull, kept current by incremental pulls
+    of rows whose cursor column is newer than the last one seen, and
+    written through by the bot's own inserts and updates. Once a full pull
+    has completed, a user missing from the mirror doesn't exist remotely
+    either, so reads never wait for Supabase and keep working while it is
+    slow or down.
+
+    Every row remembers when its content was known to be current: the
+    start of the pull that copied it, or the time it was written through.
+    A pull never overwrites a row written through after it started, and a
+    full pull deletes the rows it didn't see, i.e. users deleted remotely.
+    Incremental pulls only see rows whose cursor column changed, so with
+    created_at other changes arrive through full pulls.
+
+    Reads use a connection per thread, so with a file on disk they never
+    wait for the sync thread's writes. The file is shared by every worker
+    process and each one writes its users' changes through, so a user
+    moved to another worker is read with the status the previous one left;
+    only one worker needs to pull.
+
+    Args:
+        path (str): Location of the SQLite file.
+        cursor_column (str): Remote timestamp column used for incremental pulls.
+    """
+
+    def __init__(self, path: str = REPLICA_PATH, cursor_column: str = REPLICA_CURSOR_COLUMN):
+        self.path = path
+        self.cursor_column = cursor_column
+        self.hits = 0
+        self.misses = 0
+        self._conn: sqlite3.Connection = None
+        self._readers: list[sqlite3.Connection] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened on first use, so importing the module touches no file
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = ", ".join(f"{name} INTEGER PRIMARY KEY" if name == "telegram_id" else name for name in COLUMNS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS users ({columns}, written_at REAL)")
+            if "written_at" not in {row[1] for row in conn.execute("PRAGMA table_info(users)")}:
+                # Replica files created before rows were timestamped
+                conn.execute("ALTER TABLE users ADD COLUMN written_at REAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+            self._conn = conn
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection | None:
+        """
+        Return this thread's read connection, or None for an in-memory
+        database, which only exists on the writing connection.
+        """
+        if self.path == ":memory:":
+            return None
+        reader = getattr(self._local, "conn", None)
+        if reader is None:
+            if self._conn is None:
+                # The writing connection creates the file and tables
+                with self._lock:
+                    self.conn
+            reader = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            self._readers.append(reader)
+            self._local.conn = reader
+        return reader
+
+    def _read(self, sql: str, parameters: tuple = ()):
+        reader = self._reader()
+        if reader is not None:
+            return reader.execute(sql, parameters).fetchone()
+        with self._lock:
+            return self.conn.execute(sql, parameters).fetchone()
+
+    def _meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else default
+
+    def _set_meta(self, **values):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items()
+        )
+
+    @property
+    def ready(self) -> bool:
+        """
+        True once a full pull has completed, in this or an earlier run.
+        """
+        return self._read("SELECT 1 FROM meta WHERE key = 'full_sync_at'") is not None
+
+    def get(self, telegram_id: int) -> User | None:
+        row = self._read(f"SELECT {', '.join(COLUMNS)} FROM users WHERE telegram_id = ?", (telegram_id,))
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return User.from_row(dict(zip(COLUMNS, row)))
+
+    def put(self, user: User):
+        """
+        Write through a user just stored in Supabase.
+        """
+        self.put_rows([user.model_dump(mode="json")])
+
+    def put_rows(self, rows: list[dict], pulled_at: float = None, **meta):
+        """
+        Store rows in one transaction.
+
+        Args:
+            rows (list[dict]): Rows of the users table.
+            pulled_at (float): Start time of the pull the rows come from;
+                rows written through after it are kept. None for rows
+                written through, which always replace the stored ones.
+            **meta: Meta values to store in the same transaction.
+        """
+        names = (*COLUMNS, "written_at")
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names if name != "telegram_id")
+        sql = (
+            f"INSERT INTO users ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+            f"ON CONFLICT (telegram_id) DO UPDATE SET {updates}"
+        )
+        if pulled_at is not None:
+            sql += " WHERE users.written_at IS NULL OR users.written_at <= excluded.written_at"
+        written_at = time.time() if pulled_at is None else pulled_at
+        values = [(*(row.get(name) for name in COLUMNS), written_at) for row in rows]
+        with self._lock:
+            conn = self.conn
+            # Takes the write lock up front, waiting for other workers' transactions
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(sql, values)
+                if meta:
+                    self._set_meta(**meta)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def pull(self, database, full: bool = False) -> int:
+        """
+        Copy the rows changed since the last pull, or every row.
+
+        Args:
+            database (UserDatabase): Source of the rows.
+            full (bool): Reconcile every row instead of only the newer ones,
+                and delete the rows that no longer exist remotely.
+
+        Returns:
+            int: The number of rows copied.
+        """
+        started = time.time()
+        with self._lock:
+            since = None if full else self._meta("cursor")
+            after_id = None if full else self._meta("cursor_id")
+        copied = 0
+        page = []
+        for row in database.iter_changed_users(self.cursor_column, since, after_id):
+            page.append(row)
+            if len(page) >= WRITE_BATCH:
+                copied += self._apply(page, started)
+                page = []
+        copied += self._apply(page, started)
+        if full:
+            with self._lock:
+                conn = self.conn
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Rows neither pulled nor written through since the pull started
+                    deleted = conn.execute(
+                        "DELETE FROM users WHERE written_at IS NULL OR written_at < ?", (started,)
+                    ).rowcount
+                    self._set_meta(full_sync_at=time.time())
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            if deleted:
+                logger.info("Removed %d users deleted remotely", deleted)
+        return copied
+
+    def _apply(self, rows: list[dict], pulled_at: float) -> int:
+        if not rows:
+            return 0
+        meta = {}
+        # Rows without a timestamp sort last and can't advance the cursor
+        stamped = [row for row in rows if row.get(self.cursor_column) is not None]
+        if stamped:
+            cursor = (stamped[-1][self.cursor_column], stamped[-1]["telegram_id"])
+            with self._lock:
+                current = (self._meta("cursor"), self._meta("cursor_id"))
+            # A full pull never moves the cursor back
+            if current[0] is None or cursor > current:
+                meta = {"cursor": cursor[0], "cursor_id": cursor[1]}
+        self.put_rows(rows, pulled_at, **meta)
+        return len(rows)
+
+    def start_sync(
+        self,
+        database,
+        interval: float = REPLICA_SYNC_INTERVAL,
+        full_interval: float = REPLICA_FULL_SYNC_INTERVAL,
+    ):
+        """
+        Pull changes every interval seconds from a daemon thread, and every
+        row every full_interval seconds or when no full pull was done yet.
+        """
+        if self._thread is not None or not interval:
+            return
+
+        def run():
+            while True:
+                try:
+                    with self._lock:
+                        full_sync_at = self._meta("full_sync_at")
+                    full = full_sync_at is None or (
+                        full_interval and time.time() - full_sync_at >= full_interval
+                    )
+                    copied = self.pull(database, full=bool(full))
+                    if copied or full:
+                        logger.info("Pulled %d users (%s)", copied, "full" if full else "incremental")
+                except Exception as e:
+                    logger.error("Failed to pull users: %s", e)
+                if self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name="user-replica", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        return {"size": size, "hits": self.hits, "misses": self.misses, "ready": self.ready}
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            for reader in self._readers:
+                reader.close()
+            self._readers = []
+            self._local = threading.local()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
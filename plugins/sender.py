@@ -0,0 +1,267 @@
+import os
+import asyncio
+import itertools
+import time
+from pyrogram.errors import FloodWait
+from pyrogram.types import Message
+from settings.bot import on_shutdown
+from settings.logger import BotLogger
+from settings.metrics import metrics
+from settings.sharding import SHARD_COUNT
+
+logger = BotLogger("SENDER")
+
+# Batas kirim global (dibagi rata ke semua worker) dan per chat (pesan per detik), serta jumlah worker pengirim
+SEND_GLOBAL_RATE = float(os.environ.get("SEND_GLOBAL_RATE", "30")) / SHARD_COUNT
+SEND_CHAT_RATE = float(os.environ.get("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = float(os.environ.get("SEND_CHAT_BURST", "3"))
+SEND_WORKERS = int(os.environ.get("SEND_WORKERS", "8"))
+SEND_BULK_QUEUE_SIZE = int(os.environ.get("SEND_BULK_QUEUE_SIZE", "1000"))
+SEND_MAX_RETRIES = 3
+
+# Priority lanes, lower is served first
+INTERACTIVE = 0
+BULK = 1
+
+
+class TokenBucket:
+    """
+    Async token bucket allowing `rate` operations per second with bursts
+    of up to `capacity`. Waiters are served in arrival order, and so are
+    reservations, which may take the balance below zero.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "lock")
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def is_idle(self) -> bool:
+        """Return whether the bucket is full and nobody is waiting on it."""
+        self._refill()
+        return self.tokens >= self.capacity and not self.lock.locked()
+
+    def reserve(self) -> float:
+        """
+        Take a token now and return the seconds until it is actually
+        available, 0 if it is available right away.
+        """
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Job:
+    __slots__ = ("func", "args", "kwargs", "chat_id", "priority", "future", "attempts", "reserved")
+
+    def __init__(self, func, args, kwargs, chat_id, priority, future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.chat_id = chat_id
+        self.priority = priority
+        self.future = future
+        self.attempts = 0
+        self.reserved = False
+
+
+class SendScheduler:
+    """
+    Central queue for outgoing Telegram messages.
+
+    Every send waits for a token from the global bucket and from the
+    bucket of its chat, so the bot stays under Telegram's flood limits.
+    A job whose chat has no token left reserves the next one and is set
+    aside until then, so it never holds a worker that could serve other
+    chats. Interactive replies are always served before bulk messages,
+    and a FloodWait pauses all sending for the requested time before the
+    job is retried.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = SEND_GLOBAL_RATE,
+        chat_rate: float = SEND_CHAT_RATE,
+        chat_burst: float = SEND_CHAT_BURST,
+        workers: int = SEND_WORKERS,
+        bulk_queue_size: int = SEND_BULK_QUEUE_SIZE,
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.bulk_queue_size = bulk_queue_size
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+        self._global: TokenBucket = None
+        self._chats: dict[int, TokenBucket] = {}
+        self._queue: asyncio.PriorityQueue = None
+        self._bulk_slots: asyncio.Semaphore = None
+        self._paused_until = 0.0
+        self._sequence = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        self._deferred: dict[_Job, asyncio.TimerHandle] = {}
+
+    def _ensure_started(self):
+        if self._tasks:
+            return
+        self._global = TokenBucket(self.global_rate)
+        self._queue = asyncio.PriorityQueue()
+        self._bulk_slots = asyncio.Semaphore(self.bulk_queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= 10_000:
+                # Full buckets carry no state, drop them to bound memory
+                for key in [k for k, b in self._chats.items() if b.is_idle()]:
+                    del self._chats[key]
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def send(self, func, *args, chat_id: int, priority: int = INTERACTIVE, **kwargs):
+        """
+        Queue a send call and wait for its result.
+
+        Bulk jobs wait for a free slot when SEND_BULK_QUEUE_SIZE jobs are
+        already pending, which applies backpressure to their producer.
+
+        Args:
+            func: Coroutine function performing the send, e.g. message.reply_text.
+            chat_id (int): The chat the message goes to.
+            priority (int): INTERACTIVE or BULK.
+
+        Returns:
+            The result of func.
+        """
+        self._ensure_started()
+        if priority == BULK:
+            await self._bulk_slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(func, args, kwargs, chat_id, priority, future)
+        self._queue.put_nowait((priority, next(self._sequence), job))
+        return await future
+
+    def reply(self, message: Message, text: str, priority: int = INTERACTIVE, **kwargs):
+        """
+        Queue message.reply_text(text, **kwargs).
+        """
+        return self.send(
+            message.reply_text, text, chat_id=message.chat.id, priority=priority, **kwargs
+        )
+
+    def _enqueue(self, job: _Job):
+        self._deferred.pop(job, None)
+        self._queue.put_nowait((job.priority, next(self._sequence), job))
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                self._finish(job, error=ConnectionError("The send scheduler has stopped"))
+                raise
+            except Exception as e:
+                logger.error("Unexpected send scheduler error: %s", e)
+
+    async def _process(self, job: _Job):
+        if not job.reserved:
+            job.reserved = True
+            delay = self._chat_bucket(job.chat_id).reserve()
+            if delay > 0:
+                # Come back when the chat's token is due, leaving the worker free
+                self._deferred[job] = asyncio.get_running_loop().call_later(delay, self._enqueue, job)
+                return
+        await self._global.acquire()
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+        job.attempts += 1
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+        except FloodWait as e:
+            self.flood_waits += 1
+            wait = float(e.value)
+            self._paused_until = max(self._paused_until, time.monotonic() + wait)
+            logger.warning("FloodWait of %ss, pausing outgoing messages", wait)
+            if job.attempts < SEND_MAX_RETRIES:
+                job.reserved = False
+                self._enqueue(job)
+                return
+            self._finish(job, error=e)
+        except Exception as e:
+            self._finish(job, error=e)
+        else:
+            self._finish(job, result=result)
+
+    def _finish(self, job: _Job, result=None, error: Exception = None):
+        if error is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+        if job.priority == BULK:
+            self._bulk_slots.release()
+        if job.future.done():
+            return
+        if error is None:
+            job.future.set_result(result)
+        else:
+            job.future.set_exception(error)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "flood_waits": self.flood_waits,
+            "chats": len(self._chats),
+        }
+
+    async def stop(self):
+        """
+        Cancel the workers and fail every job not sent yet with
+        ConnectionError, so no caller waits forever.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        pending = list(self._deferred)
+        for handle in self._deferred.values():
+            handle.cancel()
+        self._deferred.clear()
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait()[2])
+        for job in pending:
+            self._finish(job, error=ConnectionError("The send scheduler has stopped"))
+
+
+# Scheduler shared by every event module
+sender = SendScheduler()
+metrics.register("sender", sender.stats)
+on_shutdown(sender.stop)
@@ -0,0 +1,298 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from abc import ABC, abstractmethod
+from settings.logger import BotLogger
+
+logger = BotLogger("STATE_STORE")
+
+# Backend dan masa berlaku (detik) sesi registrasi yang ditinggalkan
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "memory")
+STATE_TTL = float(os.environ.get("STATE_TTL", "3600"))
+STATE_CAPACITY = int(os.environ.get("STATE_CAPACITY", "100000"))
+STATE_SWEEP_INTERVAL = float(os.environ.get("STATE_SWEEP_INTERVAL", "60"))
+STATE_SQLITE_PATH = os.environ.get("STATE_SQLITE_PATH", "state.sqlite3")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+
+class StateStore(ABC):
+    """
+    Key-value store for per-user conversation state.
+
+    Values are opaque bytes so every backend stores the same compact
+    serialization. Every write refreshes the entry's time-to-live, so a
+    session expires after `ttl` seconds without activity.
+
+    Args:
+        ttl (float): Seconds an idle entry is kept before it expires.
+    """
+
+    def __init__(self, ttl: float = STATE_TTL):
+        self.ttl = ttl
+        self._stop = threading.Event()
+        self._sweeper: threading.Thread = None
+
+    @abstractmethod
+    def get(self, key: int) -> bytes | None:
+        """Return the stored value, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: int, value: bytes):
+        """Store value and reset its expiry."""
+
+    @abstractmethod
+    def delete(self, key: int):
+        """Remove the value if present."""
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) is not None
+
+    def purge_expired(self) -> int:
+        """
+        Remove expired entries eagerly.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        return 0
+
+    def start_sweeper(self, interval: float = STATE_SWEEP_INTERVAL):
+        """
+        Start a daemon thread that purges expired entries every interval seconds.
+        """
+        if self._sweeper is not None:
+            return
+
+        def sweep():
+            while not self._stop.wait(interval):
+                try:
+                    self.purge_expired()
+                except Exception as e:
+                    logger.error("Failed to purge expired sessions: %s", e)
+
+        self._sweeper = threading.Thread(target=sweep, name="state-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stats(self) -> dict:
+        """Return backend statistics such as size and eviction counters."""
+        return {}
+
+    def close(self):
+        """Stop the sweeper and release the resources held by the backend."""
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+
+class _Entry:
+    __slots__ = ("expires_at", "value")
+
+    def __init__(self, expires_at: float, value: bytes):
+        self.expires_at = expires_at
+        self.value = value
+
+
+class MemoryStateStore(StateStore):
+    """
+    Per-process, capacity-bounded state store.
+
+    Entries are kept in least-recently-active order, so both idle expiry
+    and capacity eviction only ever touch the oldest entries. An optional
+    background sweeper removes idle sessions even if they are never read
+    again.
+
+    Args:
+        ttl (float): Seconds an idle entry is kept before it expires.
+        capacity (int): Maximum number of entries; the least recently
+            active entry is evicted when full.
+    """
+
+    def __init__(self, ttl: float = STATE_TTL, capacity: int = STATE_CAPACITY):
+        super().__init__(ttl)
+        self.capacity = capacity
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+        self._data: OrderedDict[int, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: int) -> bytes | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._data[key]
+                self.evicted_idle += 1
+                return None
+            return entry.value
+
+    def set(self, key: int, value: bytes):
+        with self._lock:
+            entry = self._data.get(key)
+            expires_at = time.monotonic() + self.ttl
+            if entry is None:
+                self._data[key] = _Entry(expires_at, value)
+                while len(self._data) > self.capacity:
+                    self._data.popitem(last=False)
+                    self.evicted_capacity += 1
+            else:
+                entry.expires_at = expires_at
+                entry.value = value
+                self._data.move_to_end(key)
+
+    def delete(self, key: int):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            # Oldest entries come first, so stop at the first live one
+            for key, entry in self._data.items():
+                if entry.expires_at > now:
+                    break
+                removed += 1
+            for _ in range(removed):
+                self._data.popitem(last=False)
+            self.evicted_idle += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "capacity": self.capacity,
+            "evicted_idle": self.evicted_idle,
+            "evicted_capacity": self.evicted_capacity,
+        }
+
+
+class SQLiteStateStore(StateStore):
+    """
+    File-backed state store that survives restarts and can be shared by
+    several workers on the same host. Expired rows are never returned and
+    are deleted by the sweeper, so abandoned sessions don't grow the file.
+
+    Args:
+        path (str): Location of the SQLite database file.
+        ttl (float): Seconds an idle entry is kept before it expires.
+    """
+
+    def __init__(self, path: str = STATE_SQLITE_PATH, ttl: float = STATE_TTL):
+        super().__init__(ttl)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "key INTEGER PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: int) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: int, value: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl),
+            )
+
+    def delete(self, key: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM state WHERE expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM state").fetchone()[0]
+        return {"size": size}
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStateStore(StateStore):
+    """
+    State store for any Redis-compatible server, shared by all workers.
+
+    Expiry is delegated to the server through SET ... EX.
+
+    Args:
+        client: A redis.Redis compatible client (e.g. fakeredis for local
+            runs). When omitted, one is created from REDIS_URL.
+        ttl (float): Seconds an idle entry is kept before it expires.
+        prefix (str): Prefix added to every key.
+    """
+
+    def __init__(self, client=None, ttl: float = STATE_TTL, prefix: str = "state:"):
+        super().__init__(ttl)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError(
+                    "The 'redis' package is required for the redis state backend"
+                ) from e
+            client = redis.Redis.from_url(REDIS_URL)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: int) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key: int) -> bytes | None:
+        return self.client.get(self._key(key))
+
+    def set(self, key: int, value: bytes):
+        self.client.set(self._key(key), value, ex=max(1, int(self.ttl)))
+
+    def delete(self, key: int):
+        self.client.delete(self._key(key))
+
+    def __contains__(self, key: int) -> bool:
+        return bool(self.client.exists(self._key(key)))
+
+    def close(self):
+        super().close()
+        self.client.close()
+
+
+def create_state_store(backend: str = STATE_BACKEND) -> StateStore:
+    """
+    Create the state store selected by the STATE_BACKEND environment variable.
+
+    Args:
+        backend (str): One of "memory", "sqlite" or "redis".
+
+    Returns:
+        StateStore: The configured state store.
+    """
+    if backend == "memory":
+        store = MemoryStateStore()
+        store.start_sweeper()
+        return store
+    if backend == "sqlite":
+        store = SQLiteStateStore()
+        store.start_sweeper()
+        return store
+    if backend == "redis":
+        return RedisStateStore()
+    raise ValueError(f"Unknown state backend: {backend}")
@@ -1,10 +1,26 @@
 import os
-from supabase import create_client, Client as SupabaseClient
-from models.users import User
-from pydantic import ValidationError
+import json
+import time
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Hashable
+from models.users import User, UserStatus
 from pyrogram.types import User as TelegramUser
 from dotenv import load_dotenv
 from settings.logger import BotLogger
+from settings.bot import on_startup, on_shutdown
+from plugins.cache import TTLCache
+from plugins.replica import UserReplica, REPLICA_CURSOR_COLUMN
+from settings.metrics import metrics
+from settings.sharding import SHARD_INDEX, shard_path
+
+if TYPE_CHECKING:
+    # supabase and httpx are slow to import; they're loaded on the first query
+    import httpx
+    from supabase import Client as SupabaseClient
 
 load_dotenv()
 
@@ -12,10 +28,114 @@ load_dotenv()
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 
+# Jumlah maksimum thread untuk menjalankan query Supabase di luar event loop
+SUPABASE_MAX_WORKERS = int(os.environ.get("SUPABASE_MAX_WORKERS", "8"))
+
+# Jumlah koneksi HTTP keep-alive yang dibagi oleh seluruh query Supabase
+SUPABASE_POOL_SIZE = int(
+    os.environ.get("SUPABASE_POOL_SIZE", str(SUPABASE_MAX_WORKERS))
+)
+
+# Ukuran dan masa berlaku (detik) cache user berdasarkan telegram_id
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "300"))
+
+# Jumlah baris per permintaan saat membaca banyak pengguna sekaligus
+USERS_PAGE_SIZE = int(os.environ.get("USERS_PAGE_SIZE", "500"))
+
+# Ambang batas write-behind: jumlah baris per insert, interval flush (detik),
+# jumlah baris maksimum yang boleh mengantre, dan folder file spill
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "500"))
+WRITE_FLUSH_INTERVAL = float(os.environ.get("WRITE_FLUSH_INTERVAL", "2"))
+WRITE_QUEUE_LIMIT = int(os.environ.get("WRITE_QUEUE_LIMIT", "20000"))
+WRITE_SPILL_DIR = shard_path(os.environ.get("WRITE_SPILL_DIR", "data/spill"))
+
+# Jumlah percobaan gagal berturut-turut sebelum batch dipindah ke file dead-letter
+WRITE_MAX_RETRIES = int(os.environ.get("WRITE_MAX_RETRIES", "30"))
+
+# PostgreSQL error classes and PostgREST codes of failures worth retrying:
+# connection problems, rolled back transactions, exhausted resources, shutdowns
+TRANSIENT_ERROR_PREFIXES = ("08", "40", "53", "57", "PGRST0")
+
+# Read-through cache of validated User objects keyed by telegram_id
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# Local SQLite mirror of the users table, read before Supabase
+user_replica = UserReplica()
+metrics.register("user_cache", user_cache.stats)
+metrics.register("user_replica", user_replica.stats)
+
+# Detik maksimum menunggu hasil query yang digabung sebelum menyerah
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_TIMEOUT", "10"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=SUPABASE_MAX_WORKERS, thread_name_prefix="supabase"
+)
+
+_client: "SupabaseClient" = None
+_http_client: "httpx.Client" = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> "SupabaseClient":
+    """
+    Return the process-wide Supabase client, creating it on first use.
+
+    The client's PostgREST session is replaced by one whose keep-alive
+    connection pool holds SUPABASE_POOL_SIZE connections, so a query reuses
+    an open connection instead of running create_client and a new TLS
+    handshake per message.
+
+    Returns:
+        SupabaseClient: The shared Supabase client.
+    """
+    global _client, _http_client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+                from supabase import create_client
+
+                client = create_client(SUPABASE_URL, SUPABASE_KEY)
+                postgrest = client.postgrest
+                default_session = postgrest.session
+                _http_client = httpx.Client(
+                    base_url=default_session.base_url,
+                    headers=default_session.headers,
+                    timeout=default_session.timeout,
+                    follow_redirects=True,
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=SUPABASE_POOL_SIZE,
+                        max_keepalive_connections=SUPABASE_POOL_SIZE,
+                    ),
+                )
+                postgrest.session = _http_client
+                default_session.close()
+                _client = client
+    return _client
+
+
+def close_client():
+    """
+    Close the shared Supabase client and its connection pool.
+    """
+    global _client, _http_client
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _client = None
+        _http_client = None
+    _executor.shutdown(wait=True)
+
+
+on_shutdown(close_client)
+
 
 class Supabase:
-    def __init__(self):
-        self.client: SupabaseClient = create_client(SUPABASE_URL, SUPABASE_KEY)
+    @property
+    def client(self) -> "SupabaseClient":
+        return get_client()
 
     def get(self, table: str, fields: str):
         return self.client.table(table).select(fields)
@@ -23,24 +143,55 @@ class Supabase:
 
 class UserDatabase(Supabase):
     def __init__(self):
-        super().__init__()
         self.logger = BotLogger("UserDatabase")
 
     def get_user(self, telegram_id: int):
-        self.logger.info(f"Getting user with telegram_id: {telegram_id}")
-        result = (
-            self.get("users", "*")
-            .eq("telegram_id", telegram_id)
-            .limit(1)
-            .maybe_single()
-            .execute()
-        )
+        """
+        Return a user from the cache, the local replica or Supabase.
+
+        Once the replica holds a full copy of the table it answers every
+        read, including users that don't exist, so Supabase is only asked
+        while the first pull is still running.
+
+        Args:
+            telegram_id (int): The Telegram ID of the user.
+
+        Returns:
+            User: The user, or None if not found or the database is unavailable.
+        """
+        cached = user_cache.get(telegram_id)
+        if cached is not None:
+            return cached
+
+        user = user_replica.get(telegram_id)
+        if user is not None:
+            user_cache.set(telegram_id, user)
+            return user
+        if user_replica.ready:
+            return None
+        return self._fetch_user(telegram_id)
+
+    def _fetch_user(self, telegram_id: int):
+        """
+        Read a user from Supabase, bypassing the cache and the replica.
+        """
+        self.logger.debug("Getting user with telegram_id: %s", telegram_id)
         try:
+            result = (
+                self.get("users", "*")
+                .eq("telegram_id", telegram_id)
+                .limit(1)
+                .maybe_single()
+                .execute()
+            )
             if not result:
                 raise IndexError
-            return User.model_validate(result.data)
-        except ValidationError as e:
-            self.logger.error(f"Error while validating user: {e}")
+            user = User.from_row(result.data)
+            user_cache.set(telegram_id, user)
+            user_replica.put(user)
+            return user
+        except ValueError as e:
+            self.logger.error("Error while validating user: %s", e)
             return None
         except IndexError:
             self.logger.info("User not found")
@@ -62,23 +213,96 @@ class UserDatabase(Supabase):
                 firstname=firstname,
                 lastname=lastname,
             ).model_dump(exclude={"id", "created_at", "email", "phone_number"})
-            self.logger.info(f"New user: {new_user}")
+            self.logger.debug("New user: %s", new_user)
 
             response = self.client.table("users").insert(new_user).execute()
             if len(response.data) == 0:
                 raise Exception("No data returned")
 
-            self.logger.info(f"New user inserted: {response}")
+            self.logger.debug("New user inserted: %s", response)
 
-            return User.model_validate(response.data[0])
-        except ValidationError as e:
-            self.logger.error(f"Error while validating new user: {e}")
+            user = User.from_row(response.data[0])
+            user_cache.set(telegram_id, user)
+            user_replica.put(user)
+            return user
+        except ValueError as e:
+            self.logger.error("Error while validating new user: %s", e)
             return None
         except Exception as e:
-            self.logger.error(f"Error while inserting new user: {e}")
+            self.logger.error("Error while inserting new user: %s", e)
             return None
 
-    def register_user(self, telegram_id: int, email: str, phone_number: str = None):
+    def upsert_user(self, telegram_user: TelegramUser) -> User:
+        """
+        Return the user for a Telegram account, creating the row if needed.
+
+        The row is written with INSERT ... ON CONFLICT (telegram_id) DO
+        UPDATE of the Telegram profile columns only, returning the stored
+        row, so a new and an existing user both cost a single request and
+        two concurrent /start messages can never create a duplicate row.
+        status, email and phone_number are not part of the payload: a new
+        row gets the column defaults and an existing row keeps its values.
+        Without a default on status the new row holds NULL, which
+        User.from_row reads as UserStatus.NEW.
+
+        Args:
+            telegram_user (TelegramUser): The Telegram user sending the message.
+
+        Returns:
+            User: The stored user, or None if the database is unavailable.
+        """
+        telegram_id = telegram_user.id
+        cached = user_cache.get(telegram_id)
+        if cached is not None:
+            return cached
+        user = user_replica.get(telegram_id)
+        if user is not None:
+            user_cache.set(telegram_id, user)
+            return user
+
+        try:
+            profile = User(
+                telegram_id=telegram_id,
+                username=telegram_user.username,
+                firstname=telegram_user.first_name,
+                lastname=telegram_user.last_name,
+            ).model_dump(mode="json", include={"telegram_id", "username", "firstname", "lastname"})
+            response = (
+                self.client.table("users")
+                .upsert(profile, on_conflict="telegram_id")
+                .execute()
+            )
+            if not response.data:
+                raise Exception("No data returned")
+
+            self.logger.debug("Upserted user: %s", telegram_id)
+            user = User.from_row(response.data[0])
+            user_cache.set(telegram_id, user)
+            user_replica.put(user)
+            return user
+        except ValueError as e:
+            self.logger.error("Error while validating upserted user: %s", e)
+            return None
+        except Exception as e:
+            self.logger.error("Error while upserting user: %s", e)
+            return None
+
+    def register_and_return(
+        self, telegram_id: int, email: str, phone_number: str = None
+    ) -> User:
+        """
+        Mark a user as registered and return the updated row in one request.
+
+        Args:
+            telegram_id (int): The Telegram ID of the user.
+            email (str): The email given during registration.
+            phone_number (str): The phone number, if the user shared it.
+
+        Returns:
+            User: The updated user, or None if no such user exists.
+        """
+        # The row is about to change; never serve the stale version meanwhile
+        user_cache.invalidate(telegram_id)
         try:
             response = (
                 self.client.table("users")
@@ -92,9 +316,550 @@ class UserDatabase(Supabase):
                 .eq("telegram_id", telegram_id)
                 .execute()
             )
-            print(response)
+            if not response.data:
+                self.logger.debug("User not found")
+                return None
+
+            self.logger.debug("Registered user: %s", response)
+            user = User.from_row(response.data[0])
+            user_cache.set(telegram_id, user)
+            user_replica.put(user)
+            return user
+        except ValueError as e:
+            self.logger.error("Error while validating user registration: %s", e)
+            return None
+        except Exception as e:
+            self.logger.error("Error while registering user: %s", e)
+            return None
+
+    def register_user(self, telegram_id: int, email: str, phone_number: str = None):
+        return self.register_and_return(telegram_id, email, phone_number)
+
+    def get_users(self, telegram_ids: list[int]) -> dict[int, User]:
+        """
+        Look up many users at once: users are served from the cache or the
+        local replica, and the others are read with one request per
+        USERS_PAGE_SIZE ids until the replica holds a full copy.
+
+        Args:
+            telegram_ids (list[int]): The Telegram IDs to look up.
+
+        Returns:
+            dict[int, User]: The users found, keyed by Telegram ID.
+        """
+        users = {}
+        missing = []
+        for telegram_id in dict.fromkeys(telegram_ids):
+            cached = user_cache.get(telegram_id) or user_replica.get(telegram_id)
+            if cached is not None:
+                users[telegram_id] = cached
+            else:
+                missing.append(telegram_id)
+        if user_replica.ready:
+            return users
+
+        for start in range(0, len(missing), USERS_PAGE_SIZE):
+            response = (
+                self.get("users", "*")
+                .in_("telegram_id", missing[start : start + USERS_PAGE_SIZE])
+                .execute()
+            )
+            for row in response.data:
+                try:
+                    user = User.from_row(row)
+                except ValueError as e:
+                    self.logger.error("Error while validating user: %s", e)
+                    continue
+                user_cache.set(user.telegram_id, user)
+                users[user.telegram_id] = user
+        return users
+
+    def iter_users(
+        self,
+        status: UserStatus = None,
+        page_size: int = USERS_PAGE_SIZE,
+        after: int = None,
+    ):
+        """
+        Yield every user, optionally only those with the given status.
+
+        Rows are read in pages ordered by telegram_id, each page starting
+        after the last id of the previous one, so memory use does not
+        depend on the size of the table and a stopped scan can continue
+        where it left off.
+
+        Args:
+            status (UserStatus): Only yield users with this status.
+            page_size (int): Number of rows per request.
+            after (int): Only yield users with a larger telegram_id.
+        """
+        while True:
+            query = self.get("users", "*")
+            if status is not None:
+                query = query.eq("status", UserStatus(status).value)
+            if after is not None:
+                query = query.gt("telegram_id", after)
+            response = query.order("telegram_id").limit(page_size).execute()
+            for row in response.data:
+                try:
+                    yield User.from_row(row)
+                except ValueError as e:
+                    self.logger.error("Skipping invalid user %s: %s", row.get("telegram_id"), e)
+            if len(response.data) < page_size:
+                return
+            after = response.data[-1]["telegram_id"]
+
+    def iter_changed_users(
+        self,
+        column: str = REPLICA_CURSOR_COLUMN,
+        since: str = None,
+        after_id: int = None,
+        page_size: int = USERS_PAGE_SIZE,
+    ):
+        """
+        Yield the raw rows changed after (since, after_id), ordered by
+        column and telegram_id, or every row when since is None.
+
+        Args:
+            column (str): Timestamp column marking new or changed rows.
+            since (str): Value of column of the last row already seen.
+            after_id (int): telegram_id of the last row already seen.
+            page_size (int): Number of rows per request.
+        """
+        while True:
+            query = self.get("users", "*")
+            if since is not None:
+                query = query.or_(
+                    f'{column}.gt."{since}",and({column}.eq."{since}",telegram_id.gt.{after_id})'
+                )
+            response = query.order(column).order("telegram_id").limit(page_size).execute()
+            yield from response.data
+            if len(response.data) < page_size:
+                return
+            last = response.data[-1]
+            if last.get(column) is None:
+                # Rows without a timestamp come last and are all in this page
+                return
+            since, after_id = last[column], last["telegram_id"]
+
+
+class ResultDatabase(Supabase):
+    def __init__(self):
+        self.logger = BotLogger("ResultDatabase")
+
+    def iter_results(self, page_size: int = 1000, after_id: int = 0):
+        """
+        Yield (id, test_type, telegram_id, score) of every stored test
+        result, or of the results stored after the one with after_id.
+
+        Rows are read in pages ordered by id, so memory use does not depend
+        on the size of the table.
+
+        Args:
+            page_size (int): Number of rows per request.
+            after_id (int): id of the last result already read.
+        """
+        last_id = after_id
+        while True:
+            response = (
+                self.get("test_results", "id,telegram_id,test_type,score")
+                .gt("id", last_id)
+                .order("id")
+                .limit(page_size)
+                .execute()
+            )
+            for row in response.data:
+                yield row["id"], row["test_type"], row["telegram_id"], row["score"]
+            if len(response.data) < page_size:
+                return
+            last_id = response.data[-1]["id"]
+
+
+class SingleFlight:
+    """
+    Merges concurrent identical async calls into one execution.
+
+    The first caller of a key starts the call; callers arriving while it
+    is in flight wait for the same result or exception instead of issuing
+    their own request. Every caller waits at most `timeout` seconds; a
+    call that times out is forgotten, so the next caller starts a fresh
+    one instead of joining a request that may never finish.
+
+    Args:
+        timeout (float): Seconds a caller waits before TimeoutError.
+    """
+
+    def __init__(self, timeout: float = SINGLE_FLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self.merged = 0
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
 
-            return User.model_validate(response.data[0])
-        except ValidationError as e:
-            self.logger.error(f"Error while validating user registration: {e}")
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+
+    @staticmethod
+    def _consume(future: asyncio.Future):
+        # Mark the error as retrieved when every waiter gave up before it arrived
+        if not future.cancelled():
+            future.exception()
+
+    async def do(self, key: Hashable, func, *args, **kwargs):
+        """
+        Return await func(*args, **kwargs), shared with concurrent callers of key.
+
+        Raises:
+            TimeoutError: If the call takes longer than the timeout.
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+            future.add_done_callback(self._consume)
+        else:
+            self.merged += 1
+            metrics.increment("singleflight.merged")
+        try:
+            # Shielded, so a caller timing out doesn't cancel the others' call
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except TimeoutError:
+            self._forget(key, future)
+            raise
+
+
+# Shared by every AsyncUserDatabase, so reads from different modules merge too
+user_reads = SingleFlight()
+
+
+class AsyncUserDatabase:
+    """
+    Non-blocking counterpart of UserDatabase for use inside async handlers.
+
+    The supabase client is synchronous, so every call is offloaded to a
+    bounded thread pool (SUPABASE_MAX_WORKERS) instead of blocking the
+    Pyrogram event loop. Concurrent reads and upserts of the same user
+    share one request through user_reads; like UserDatabase, they return
+    None when the database doesn't answer in time.
+    """
+
+    def __init__(self, database: UserDatabase = None):
+        self.database = database or UserDatabase()
+        self.logger = BotLogger("AsyncUserDatabase")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Timed from the handler's point of view, thread-pool queueing included
+        with metrics.timer(f"db.{func.__name__}"):
+            return await loop.run_in_executor(
+                _executor, partial(func, *args, **kwargs)
+            )
+
+    async def get_user(self, telegram_id: int):
+        # Serve cache hits directly on the event loop, without a thread hop
+        cached = user_cache.get(telegram_id)
+        if cached is not None:
+            metrics.increment("db.get_user.cached")
+            return cached
+        # Replica reads are local point lookups, cheaper than the thread hop too
+        start = time.perf_counter()
+        user = user_replica.get(telegram_id)
+        if user is not None:
+            user_cache.set(telegram_id, user)
+            metrics.observe("db.get_user.replica", time.perf_counter() - start)
+            return user
+        # Concurrent lookups of the same user share one request
+        return await self._shared(("get_user", telegram_id), self.database.get_user, telegram_id)
+
+    async def _shared(self, key: tuple, func, *args):
+        """
+        Run func in the thread pool through user_reads.
+
+        Returns:
+            The result of func, or None if it timed out.
+        """
+        try:
+            return await user_reads.do(key, self._run, func, *args)
+        except TimeoutError:
+            self.logger.error("Timed out waiting for %s of %s", *key)
             return None
+
+    async def insert_new_user(self, telegram_user: TelegramUser) -> User:
+        return await self._run(self.database.insert_new_user, telegram_user)
+
+    async def register_user(
+        self, telegram_id: int, email: str, phone_number: str = None
+    ):
+        return await self._run(
+            self.database.register_user, telegram_id, email, phone_number
+        )
+
+    async def get_users(self, telegram_ids: list[int]) -> dict[int, User]:
+        return await self._run(self.database.get_users, telegram_ids)
+
+    async def iter_user_pages(
+        self,
+        status: UserStatus = None,
+        page_size: int = USERS_PAGE_SIZE,
+        after: int = None,
+    ):
+        """
+        Async counterpart of UserDatabase.iter_users yielding lists of up to
+        page_size users. The next page is fetched while the caller works on
+        the current one.
+        """
+        users = self.database.iter_users(status=status, page_size=page_size, after=after)
+        loop = asyncio.get_running_loop()
+
+        def take():
+            return list(itertools.islice(users, page_size))
+
+        next_page = loop.run_in_executor(_executor, take)
+        while True:
+            page = await next_page
+            if not page:
+                return
+            next_page = loop.run_in_executor(_executor, take)
+            yield page
+
+    async def upsert_user(self, telegram_user: TelegramUser) -> User:
+        cached = user_cache.get(telegram_user.id) or user_replica.get(telegram_user.id)
+        if cached is not None:
+            user_cache.set(telegram_user.id, cached)
+            return cached
+        # Repeated /start messages of the same user share one upsert
+        return await self._shared(("upsert_user", telegram_user.id), self.database.upsert_user, telegram_user)
+
+    async def register_and_return(
+        self, telegram_id: int, email: str, phone_number: str = None
+    ) -> User:
+        return await self._run(
+            self.database.register_and_return, telegram_id, email, phone_number
+        )
+
+
+class WriteBehindBuffer:
+    """
+    Collects rows in memory and writes them to a table in bulk inserts.
+
+    A flush happens when WRITE_BATCH_SIZE rows are pending or every
+    WRITE_FLUSH_INTERVAL seconds. Producers wait once WRITE_QUEUE_LIMIT rows
+    are pending (backpressure). Every row is also appended to a local spill
+    file, which is replayed by start() so a crash loses no acknowledged row;
+    the shared buffers are started with the client for that reason.
+
+    A batch rejected by the database, e.g. for a bad row or a missing
+    table, or failing WRITE_MAX_RETRIES flushes in a row, is moved to a
+    dead-letter file next to the spill file, so it can't block the rows
+    behind it and the producers waiting for space.
+
+    Args:
+        table (str): The table the rows are inserted into.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL,
+        queue_limit: int = WRITE_QUEUE_LIMIT,
+        spill_dir: str = WRITE_SPILL_DIR,
+        max_retries: int = WRITE_MAX_RETRIES,
+    ):
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_limit = queue_limit
+        self.max_retries = max_retries
+        self.spill_path = os.path.join(spill_dir, f"{table}.jsonl")
+        self.dead_letter_path = os.path.join(spill_dir, f"{table}.dead.jsonl")
+        self.logger = BotLogger(f"WriteBehind.{table}")
+        self.written = 0
+        self.failed_flushes = 0
+        self.dead_letters = 0
+        self._retries = 0
+        self._closing = False
+        self._pending: list[dict] = []
+        self._spill = None
+        self._task: asyncio.Task = None
+        self._wakeup: asyncio.Event = None
+        self._space: asyncio.Condition = None
+        self._flush_lock: asyncio.Lock = None
+
+    def start(self, client=None):
+        """
+        Replay the rows left in the spill file and start the flusher.
+        """
+        if self._task is not None:
+            return
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        self._pending = self._read_spill()
+        self._spill = open(self.spill_path, "a", encoding="utf-8")
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+        if self._pending:
+            self.logger.info("Recovered %d rows from spill file", len(self._pending))
+            self._wakeup.set()
+
+    def _read_spill(self) -> list[dict]:
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _rewrite_spill(self):
+        self._spill.close()
+        tmp_path = f"{self.spill_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in self._pending:
+                f.write(json.dumps(row, separators=(",", ":"), default=str) + "\n")
+        os.replace(tmp_path, self.spill_path)
+        self._spill = open(self.spill_path, "a", encoding="utf-8")
+
+    async def add(self, row: dict):
+        """
+        Queue a row, waiting while the buffer is full.
+        """
+        self.start()
+        if len(self._pending) >= self.queue_limit:
+            async with self._space:
+                await self._space.wait_for(lambda: len(self._pending) < self.queue_limit)
+        self._pending.append(row)
+        self._spill.write(json.dumps(row, separators=(",", ":"), default=str) + "\n")
+        self._spill.flush()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closing:
+                return
+            await self.flush()
+
+    def _insert(self, rows: list[dict]):
+        get_client().table(self.table).insert(rows).execute()
+
+    @staticmethod
+    def _is_permanent(error: Exception) -> bool:
+        """
+        Return whether the database rejected a request, so retrying it
+        can't succeed. Network errors and overload are transient.
+        """
+        from postgrest.exceptions import APIError
+
+        if not isinstance(error, APIError):
+            return False
+        return not str(error.code or "").startswith(TRANSIENT_ERROR_PREFIXES)
+
+    def _dead_letter(self, rows: list[dict]):
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, separators=(",", ":"), default=str) + "\n")
+        self.dead_letters += len(rows)
+
+    async def flush(self):
+        """
+        Insert every pending row, batch_size rows per request.
+        """
+        if self._task is None:
+            return
+        async with self._flush_lock:
+            loop = asyncio.get_running_loop()
+            flushed = written = 0
+            while flushed < len(self._pending):
+                batch = self._pending[flushed : flushed + self.batch_size]
+                start = time.perf_counter()
+                try:
+                    await loop.run_in_executor(_executor, self._insert, batch)
+                except Exception as e:
+                    self.failed_flushes += 1
+                    self._retries += 1
+                    if not self._is_permanent(e) and self._retries < self.max_retries:
+                        self.logger.error("Bulk insert failed, keeping rows for retry: %s", e)
+                        break
+                    self._dead_letter(batch)
+                    self.logger.error(
+                        "Bulk insert failed, moved %d rows to %s: %s", len(batch), self.dead_letter_path, e
+                    )
+                else:
+                    metrics.observe(f"db.insert.{self.table}", time.perf_counter() - start)
+                    written += len(batch)
+                self._retries = 0
+                flushed += len(batch)
+            if flushed:
+                self.written += written
+                del self._pending[:flushed]
+                self._rewrite_spill()
+                async with self._space:
+                    self._space.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "failed_flushes": self.failed_flushes,
+            "dead_letters": self.dead_letters,
+        }
+
+    async def close(self):
+        """
+        Stop the flusher and write the remaining rows, including rows
+        spilled by an earlier run if the buffer was never started.
+
+        The flusher isn't cancelled: an insert already running in the
+        thread pool would complete without its rows being marked written,
+        and the final flush would insert them again. Instead it finishes
+        its current flush and exits before the final one.
+        """
+        if self._task is None:
+            if not os.path.isfile(self.spill_path) or not os.path.getsize(self.spill_path):
+                return
+            self.start()
+        self._closing = True
+        self._wakeup.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+        self._spill.close()
+        self._task = None
+
+
+# Buffers for simulation answers, progress updates and results, flushed before the client closes
+answer_events = WriteBehindBuffer("answers")
+progress_events = WriteBehindBuffer("session_progress")
+result_events = WriteBehindBuffer("test_results")
+on_startup(answer_events.start)
+on_startup(progress_events.start)
+on_startup(result_events.start)
+on_shutdown(answer_events.close)
+on_shutdown(progress_events.close)
+on_shutdown(result_events.close)
+metrics.register("write_behind.answers", answer_events.stats)
+metrics.register("write_behind.session_progress", progress_events.stats)
+metrics.register("write_behind.test_results", result_events.stats)
+
+
+@on_startup
+def start_replica_sync(client):
+    """
+    Keep the replica in sync while the bot runs. Every worker shares the
+    replica file and writes its own changes through, so only the first
+    worker pulls from Supabase.
+    """
+    if SHARD_INDEX == 0:
+        user_replica.start_sync(UserDatabase())
+
+
+# Closed before the Supabase client
+on_shutdown(user_replica.close)
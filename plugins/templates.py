@@ -0,0 +1,74 @@
+from pyrogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, ForceReply
+
+# Bahasa default dan bahasa yang tersedia
+DEFAULT_LANGUAGE = "id"
+LANGUAGES = ("id", "en")
+
+
+def language_of(message: Message) -> str:
+    """
+    Return the template language for the sender of a message.
+    """
+    user = message.from_user
+    code = (user.language_code or "") if user else ""
+    return "en" if code.startswith("en") else DEFAULT_LANGUAGE
+
+
+class TemplateRegistry:
+    """
+    Reply texts and keyboards built once and looked up by key.
+
+    Texts may have a variant per language and str.format placeholders;
+    keyboards are created once and the same markup object is reused for
+    every reply.
+    """
+
+    def __init__(self):
+        self._texts: dict[tuple[str, str], str] = {}
+        self._markups: dict[str, object] = {}
+
+    def add(self, key: str, id: str, en: str = None):
+        """
+        Register a text with its Indonesian and optional English variant.
+        """
+        self._texts[(key, "id")] = id
+        self._texts[(key, "en")] = en or id
+        return self
+
+    def add_keyboard(self, key: str, rows: list[list[str]], **kwargs):
+        """
+        Register a reply keyboard; kwargs are passed to ReplyKeyboardMarkup.
+        """
+        self._markups[key] = ReplyKeyboardMarkup(
+            [[KeyboardButton(text) for text in row] for row in rows], **kwargs
+        )
+        return self
+
+    def add_markup(self, key: str, markup):
+        """
+        Register any prebuilt reply markup, e.g. ForceReply.
+        """
+        self._markups[key] = markup
+        return self
+
+    def text(self, key: str, lang: str = DEFAULT_LANGUAGE, **params) -> str:
+        """
+        Return the text of key in lang, formatted with params if given.
+        """
+        text = self._texts.get((key, lang)) or self._texts[(key, DEFAULT_LANGUAGE)]
+        return text.format(**params) if params else text
+
+    def markup(self, key: str):
+        """
+        Return the shared markup object registered under key.
+        """
+        return self._markups[key]
+
+
+# Registry shared by every event module
+templates = TemplateRegistry()
+
+templates.add_keyboard(
+    "keyboard.yes_no", [["Tidak"], ["Ya"]], one_time_keyboard=True, resize_keyboard=True
+)
+templates.add_markup("markup.force_reply", ForceReply(selective=True))
@@ -0,0 +1,410 @@
+import os
+import json
+import math
+import time
+import asyncio
+import sqlite3
+from pyrogram import Client
+from settings.bot import on_startup, on_shutdown
+from settings.logger import BotLogger
+from settings.sharding import shard_path
+from plugins.templates import templates, DEFAULT_LANGUAGE
+
+logger = BotLogger("TIMER_WHEEL")
+
+# Lokasi tabel deadline yang dipertahankan saat restart
+TIMER_DB_PATH = shard_path(os.environ.get("TIMER_DB_PATH", "data/timers.sqlite3"))
+
+# Durasi default satu tes SKD dalam detik
+EXAM_DURATION = int(os.environ.get("EXAM_DURATION", str(100 * 60)))
+
+# Ticks per slot of each level: seconds, minutes, hours; later deadlines wait in an overflow list
+TICK = 1.0
+LEVELS = (60, 60, 24)
+
+
+templates.add(
+    "exam.question_reminder",
+    "Soal nomor {number} belum dijawab. Jangan lupa untuk menjawabnya.",
+    "Question {number} hasn't been answered yet. Don't forget to answer it.",
+).add(
+    "exam.time_left",
+    "Waktu tes tersisa {minutes} menit.",
+    "{minutes} minutes of the test are left.",
+).add(
+    "exam.time_almost_up",
+    "Waktu tes tersisa kurang dari 1 menit.",
+    "Less than 1 minute of the test is left.",
+)
+
+
+class Timer:
+    __slots__ = ("key", "kind", "tick", "payload", "cancelled")
+
+    def __init__(self, key: str, kind: str, tick: int, payload):
+        self.key = key
+        self.kind = kind
+        self.tick = tick
+        self.payload = payload
+        self.cancelled = False
+
+
+class DeadlineTable:
+    """
+    SQLite table holding every pending timer, so they survive restarts.
+    """
+
+    def __init__(self, path: str = TIMER_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS timers ("
+            "key TEXT PRIMARY KEY, kind TEXT NOT NULL, deadline REAL NOT NULL, payload TEXT)"
+        )
+
+    def save(self, key: str, kind: str, deadline: float, payload):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO timers (key, kind, deadline, payload) VALUES (?, ?, ?, ?)",
+            (key, kind, deadline, json.dumps(payload)),
+        )
+
+    def delete(self, key: str):
+        self._conn.execute("DELETE FROM timers WHERE key = ?", (key,))
+
+    def load(self):
+        for key, kind, deadline, payload in self._conn.execute(
+            "SELECT key, kind, deadline, payload FROM timers"
+        ):
+            yield key, kind, deadline, json.loads(payload)
+
+    def close(self):
+        self._conn.close()
+
+
+class SessionTable:
+    """
+    SQLite table holding the state of running timed sessions, in the same
+    file as their timers, so a session and its timers survive a restart
+    together.
+    """
+
+    def __init__(self, path: str = TIMER_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (telegram_id INTEGER PRIMARY KEY, state TEXT NOT NULL)"
+        )
+
+    def save(self, telegram_id: int, state: dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (telegram_id, state) VALUES (?, ?)",
+            (telegram_id, json.dumps(state, separators=(",", ":"))),
+        )
+
+    def delete(self, telegram_id: int):
+        self._conn.execute("DELETE FROM sessions WHERE telegram_id = ?", (telegram_id,))
+
+    def load(self):
+        for telegram_id, state in self._conn.execute("SELECT telegram_id, state FROM sessions"):
+            yield telegram_id, json.loads(state)
+
+    def close(self):
+        self._conn.close()
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel driven by a single asyncio task.
+
+    Timers are kept in per-second, per-minute and per-hour slots and moved
+    down a level as their time approaches, so scheduling and cancelling
+    cost O(1) and each tick only touches the timers that are due, however
+    many sessions are running.
+
+    Callbacks are registered per timer kind with on() and are called with
+    the client, the timer key and its payload.
+
+    Args:
+        table (DeadlineTable): Persistent copy of the pending timers, or None.
+    """
+
+    def __init__(self, table: DeadlineTable = None):
+        self.table = table
+        self.client: Client = None
+        self.fired = 0
+        self._callbacks = {}
+        self._timers: dict[str, Timer] = {}
+        self._wheels = [[[] for _ in range(slots)] for slots in LEVELS]
+        self._overflow: list[Timer] = []
+        self._spans = [math.prod(LEVELS[:level]) for level in range(len(LEVELS) + 1)]
+        self._now = int(time.time() // TICK)
+        self._task: asyncio.Task = None
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def on(self, kind: str, callback):
+        """
+        Register the coroutine function called when a timer of kind fires.
+        """
+        self._callbacks[kind] = callback
+        return callback
+
+    def get(self, key: str) -> Timer | None:
+        """
+        Return the pending timer with the given key, if any.
+        """
+        return self._timers.get(key)
+
+    def schedule(self, key: str, kind: str, deadline: float, payload=None):
+        """
+        Schedule a timer, replacing any pending timer with the same key.
+
+        Args:
+            key (str): Unique name of the timer, e.g. "exam:<telegram_id>".
+            kind (str): Selects the callback registered with on().
+            deadline (float): Unix time at which the timer fires.
+            payload: JSON-serializable data passed to the callback.
+        """
+        if self._task is None:
+            # Nothing advances the wheel before start(), keep slots relative to now
+            self._now = int(time.time() // TICK)
+        self.cancel(key)
+        timer = Timer(key, kind, math.ceil(deadline / TICK), payload)
+        self._timers[key] = timer
+        if self.table is not None:
+            self.table.save(key, kind, deadline, payload)
+        self._insert(timer)
+        return timer
+
+    def cancel(self, key: str) -> bool:
+        """
+        Cancel a pending timer; it is dropped from its slot lazily.
+        """
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        if self.table is not None:
+            self.table.delete(key)
+        return True
+
+    def _insert(self, timer: Timer):
+        delta = timer.tick - self._now
+        if delta <= 0:
+            self._fire(timer)
+            return
+        for level, slots in enumerate(LEVELS):
+            if delta < self._spans[level + 1]:
+                slot = (timer.tick // self._spans[level]) % slots
+                self._wheels[level][slot].append(timer)
+                return
+        self._overflow.append(timer)
+
+    def _cascade(self, timers: list[Timer]):
+        for timer in timers:
+            if not timer.cancelled:
+                self._insert(timer)
+
+    def _advance(self):
+        self._now += 1
+        now = self._now
+        if now % self._spans[-1] == 0:
+            overflow, self._overflow = self._overflow, []
+            self._cascade(overflow)
+        for level in range(len(LEVELS) - 1, 0, -1):
+            if now % self._spans[level] == 0:
+                slot = (now // self._spans[level]) % LEVELS[level]
+                timers, self._wheels[level][slot] = self._wheels[level][slot], []
+                self._cascade(timers)
+        slot = now % LEVELS[0]
+        timers, self._wheels[0][slot] = self._wheels[0][slot], []
+        for timer in timers:
+            if not timer.cancelled:
+                self._fire(timer)
+
+    def _fire(self, timer: Timer):
+        if self._timers.get(timer.key) is timer:
+            del self._timers[timer.key]
+            if self.table is not None:
+                self.table.delete(timer.key)
+        callback = self._callbacks.get(timer.kind)
+        if callback is None:
+            logger.warning("No callback for timer kind %s", timer.kind)
+            return
+        self.fired += 1
+        asyncio.get_running_loop().create_task(
+            self._run_callback(callback, timer)
+        )
+
+    async def _run_callback(self, callback, timer: Timer):
+        try:
+            await callback(self.client, timer.key, timer.payload)
+        except Exception as e:
+            logger.error("Timer %s failed: %s", timer.key, e)
+
+    async def _run(self):
+        while True:
+            target = int(time.time() // TICK)
+            # Catch up on every tick missed while the loop was busy
+            while self._now < target:
+                self._advance()
+            await asyncio.sleep(TICK - (time.time() % TICK))
+
+    def start(self, client: Client = None):
+        """
+        Restore the persisted timers and start ticking.
+        """
+        self.client = client
+        if self._task is not None:
+            return
+        self._now = int(time.time() // TICK)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.table is not None:
+            restored = 0
+            for key, kind, deadline, payload in list(self.table.load()):
+                self.schedule(key, kind, deadline, payload)
+                restored += 1
+            if restored:
+                logger.info("Restored %d timers", restored)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.table is not None:
+            self.table.close()
+
+
+class ExamTimers:
+    """
+    Countdown, reminders and auto-submit of timed simulation sessions.
+
+    Args:
+        wheel (TimerWheel): The wheel the timers are scheduled on.
+    """
+
+    def __init__(self, wheel: TimerWheel):
+        self.wheel = wheel
+        self._on_expire = None
+        self._is_active = None
+        wheel.on("exam_reminder", self._remind)
+        wheel.on("exam_deadline", self._expire)
+
+    def on_expire(self, callback):
+        """
+        Register the coroutine function (client, telegram_id) that submits
+        a session whose time is up.
+        """
+        self._on_expire = callback
+        return callback
+
+    def is_active(self, callback):
+        """
+        Register the function (telegram_id) -> bool telling whether a
+        session still exists. Reminders of a session that doesn't are
+        dropped together with its other timers.
+        """
+        self._is_active = callback
+        return callback
+
+    def start_exam(
+        self,
+        telegram_id: int,
+        duration: int = EXAM_DURATION,
+        reminders: tuple[int, ...] = (30 * 60, 10 * 60, 60),
+        lang: str = DEFAULT_LANGUAGE,
+    ):
+        """
+        Schedule the deadline of a session and reminders in lang for the
+        given number of remaining seconds.
+
+        The keys of the reminders are stored with the deadline timer, so
+        finish_exam() cancels them even after a restart.
+        """
+        self.finish_exam(telegram_id)
+        deadline = time.time() + duration
+        keys = []
+        for remaining in reminders:
+            if remaining < duration:
+                key = f"exam:{telegram_id}:reminder:{remaining}"
+                self.wheel.schedule(
+                    key,
+                    "exam_reminder",
+                    deadline - remaining,
+                    {"telegram_id": telegram_id, "remaining": remaining, "lang": lang},
+                )
+                keys.append(key)
+        self.wheel.schedule(
+            f"exam:{telegram_id}",
+            "exam_deadline",
+            deadline,
+            {"telegram_id": telegram_id, "reminders": keys},
+        )
+        return deadline
+
+    def remind_question(self, telegram_id: int, question_number: int, seconds: int, lang: str = DEFAULT_LANGUAGE):
+        """
+        Remind the user about a question left unanswered for seconds.
+        Scheduling another question reminder replaces this one.
+        """
+        self.wheel.schedule(
+            f"exam:{telegram_id}:question",
+            "exam_reminder",
+            time.time() + seconds,
+            {"telegram_id": telegram_id, "question": question_number, "lang": lang},
+        )
+
+    def finish_exam(self, telegram_id: int):
+        """
+        Cancel every timer of a session submitted by the user.
+        """
+        deadline = self.wheel.get(f"exam:{telegram_id}")
+        self._cancel(telegram_id, deadline.payload["reminders"] if deadline is not None else ())
+
+    def _cancel(self, telegram_id: int, reminders):
+        self.wheel.cancel(f"exam:{telegram_id}")
+        self.wheel.cancel(f"exam:{telegram_id}:question")
+        for key in reminders:
+            self.wheel.cancel(key)
+
+    async def _remind(self, client: Client, key: str, payload: dict):
+        from plugins.sender import sender, BULK
+
+        telegram_id, lang = payload["telegram_id"], payload["lang"]
+        if self._is_active is not None and not self._is_active(telegram_id):
+            logger.warning("Dropping timers of exam %s, its session is gone", telegram_id)
+            self.finish_exam(telegram_id)
+            return
+        if "question" in payload:
+            text = templates.text("exam.question_reminder", lang, number=payload["question"])
+        elif payload["remaining"] >= 60:
+            text = templates.text("exam.time_left", lang, minutes=payload["remaining"] // 60)
+        else:
+            text = templates.text("exam.time_almost_up", lang)
+        await sender.send(
+            client.send_message, telegram_id, text, chat_id=telegram_id, priority=BULK
+        )
+
+    async def _expire(self, client: Client, key: str, payload: dict):
+        telegram_id = payload["telegram_id"]
+        # The deadline timer has fired, so its reminders come from the payload
+        self._cancel(telegram_id, payload["reminders"])
+        if self._on_expire is None:
+            logger.warning("No auto-submit callback for expired exam of %s", telegram_id)
+            return
+        await self._on_expire(client, telegram_id)
+
+
+# Wheel shared by every simulation session, started with the client
+timer_wheel = TimerWheel(DeadlineTable())
+session_table = SessionTable()
+on_shutdown(session_table.close)
+exam_timers = ExamTimers(timer_wheel)
+on_startup(timer_wheel.start)
+on_shutdown(timer_wheel.stop)
@@ -1,10 +1,100 @@
+import inspect
 from settings.logger import BotLogger
 from pyrogram import Client
+from pyrogram.sync import async_to_sync
 from settings.config import load_config
 
 # Initialize the logger for bot initialization
 logger = BotLogger("INITIALIZATION")
 
+# Callbacks executed after the client has started, in registration order
+_startup_hooks = []
+
+# Callbacks executed before the client stops, while it can still send, in reverse registration order
+_before_stop_hooks = []
+
+# Callbacks executed after the client has stopped, in reverse registration order
+_shutdown_hooks = []
+
+
+def on_startup(callback):
+    """
+    Register a callback to run once the bot client has started.
+
+    Args:
+        callback: A function or coroutine function taking the client.
+
+    Returns:
+        The callback, so this can be used as a decorator.
+    """
+    _startup_hooks.append(callback)
+    return callback
+
+
+def on_before_stop(callback):
+    """
+    Register a callback to run when the bot client is about to stop, while
+    it is still connected, e.g. to finish messages in flight.
+
+    Args:
+        callback: A function or coroutine function without arguments.
+
+    Returns:
+        The callback, so this can be used as a decorator.
+    """
+    _before_stop_hooks.append(callback)
+    return callback
+
+
+def on_shutdown(callback):
+    """
+    Register a callback to run when the bot client stops.
+
+    Args:
+        callback: A function or coroutine function without arguments.
+
+    Returns:
+        The callback, so this can be used as a decorator.
+    """
+    _shutdown_hooks.append(callback)
+    return callback
+
+
+class BotClient(Client):
+    """
+    Pyrogram client that runs the registered startup hooks on start, and
+    the before-stop and shutdown hooks around disconnecting on stop.
+    """
+
+    async def start(self):
+        result = await super().start()
+        for callback in _startup_hooks:
+            outcome = callback(self)
+            if inspect.isawaitable(outcome):
+                await outcome
+        return result
+
+    async def stop(self, block: bool = True):
+        await self._run_hooks(_before_stop_hooks)
+        result = await super().stop(block)
+        await self._run_hooks(_shutdown_hooks)
+        return result
+
+    @staticmethod
+    async def _run_hooks(hooks: list):
+        for callback in reversed(hooks):
+            try:
+                outcome = callback()
+                if inspect.isawaitable(outcome):
+                    await outcome
+            except Exception as e:
+                logger.error(f"Shutdown hook error: {e}")
+
+
+# Keep start() and stop() usable from synchronous code, like the rest of Pyrogram's methods
+async_to_sync(BotClient, "start")
+async_to_sync(BotClient, "stop")
+
 
 def init_bot() -> Client:
     """
@@ -20,10 +110,13 @@ def init_bot() -> Client:
         logger.error(f"Configuration error: {e}")
         raise Exception("Configuration error") from e
 
+    # Imported here because settings.sharding registers hooks defined in this module
+    from settings.sharding import session_name
+
     try:
         # Initialize the Telegram client with the loaded configuration
-        app = Client(
-            "simulasicpns",
+        app = BotClient(
+            session_name("simulasicpns"),
             api_id=config.api_id,
             api_hash=config.api_hash,
             bot_token=config.bot_token,
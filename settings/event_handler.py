@@ -1,22 +1,150 @@
+import asyncio
 import importlib
+import os
+import pkgutil
+import time
+import tomllib
+from functools import wraps
+from pathlib import Path
 from pyrogram import Client
 from settings.logger import BotLogger
+from settings.metrics import Metrics, metrics as default_metrics
 from pydantic import BaseModel
 from typing import Optional
 
+# Folder modul event dan manifest yang mengatur urutan serta status aktifnya
+EVENTS_PATH = Path(__file__).resolve().parent.parent / "events"
+EVENTS_MANIFEST = EVENTS_PATH / "manifest.toml"
+
 class EventHandlerType(BaseModel):
     filename: str
     description: Optional[str] = None
+    enabled: bool = True
+
+
+class EventLoadError(Exception):
+    """Raised when an event module can't be imported or set up."""
+
+# Jumlah maksimum update yang boleh mengantre per pengguna
+USER_QUEUE_LIMIT = int(os.environ.get("USER_QUEUE_LIMIT", "8"))
+
+
+class KeyedLock:
+    """
+    One asyncio lock per key, created on demand and dropped as soon as
+    nobody holds or waits for it, so memory follows the number of users
+    with an update in flight rather than the number of users ever seen.
+
+    Args:
+        limit (int): Maximum number of holders and waiters per key; further
+            acquisitions are rejected.
+    """
+
+    def __init__(self, limit: int = USER_QUEUE_LIMIT):
+        self.limit = limit
+        self.rejected = 0
+        self._locks: dict[int, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def try_enter(self, key) -> bool:
+        """
+        Reserve a place in the queue of key.
+
+        Returns:
+            bool: False if the queue of key is full.
+        """
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        if entry[1] >= self.limit:
+            self.rejected += 1
+            return False
+        entry[1] += 1
+        return True
+
+    def leave(self, key):
+        """
+        Release a place reserved by try_enter().
+        """
+        entry = self._locks[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+    def lock(self, key) -> asyncio.Lock:
+        return self._locks[key][0]
+
+    def serialize(self, callback, logger: BotLogger = None):
+        """
+        Wrap a Pyrogram callback so updates from the same user run one at a
+        time, in arrival order, while different users run in parallel.
+        """
+
+        @wraps(callback)
+        async def serialized(client, update, *args):
+            user = getattr(update, "from_user", None)
+            if user is None:
+                return await callback(client, update, *args)
+
+            key = user.id
+            if not self.try_enter(key):
+                if logger:
+                    logger.warning("Dropping update, too many pending for user %s", key)
+                return
+            try:
+                async with self.lock(key):
+                    return await callback(client, update, *args)
+            finally:
+                self.leave(key)
+
+        return serialized
+
 
 class EventHandler:
     def __init__(
         self,
         client: Client,
         logger: BotLogger = BotLogger("EVENT_HANDLER"),
+        metrics: Metrics = default_metrics,
+        user_locks: KeyedLock = None,
     ):
         self.client = client
         self.logger = logger
+        self.metrics = metrics
+        self.user_locks = user_locks or KeyedLock()
         self.events = []
+        self.profile: list[tuple[str, float, float]] = []
+        self.__loading = None
+        self.__count = 0
+        self.__instrument_client()
+
+    def __instrument_client(self):
+        """
+        Wrap every handler added to the client so its calls are timed and
+        serialized per user.
+        """
+        add_handler = self.client.add_handler
+
+        def instrumented_add_handler(handler, group: int = 0):
+            callback = getattr(handler, "callback", None)
+            if callback is not None:
+                callback = self.user_locks.serialize(callback, self.logger)
+                handler.callback = self.metrics.wrap(callback, self.__label(handler))
+            return add_handler(handler, group)
+
+        self.client.add_handler = instrumented_add_handler
+
+    def __label(self, handler) -> str:
+        """
+        Name a handler by its command, or by its module and position.
+        """
+        commands = getattr(getattr(handler, "filters", None), "commands", None)
+        if commands:
+            return "handler./" + ",/".join(sorted(commands))
+        self.__count += 1
+        return f"handler.{self.__loading or 'client'}#{self.__count}"
 
     def __execute(self, module, filename: str):
         """
@@ -27,25 +155,44 @@ class EventHandler:
             filename (str): The filename of the event handler.
         """
         if hasattr(module, "handler"):
-            self.logger.info(f"Loaded event: {filename}.py")
             handler = getattr(module, "handler")
             handler(self.client)
         else:
             raise ImportError(f"No function named 'handler' in {filename}.py")
 
-    def __event_handler(self, filename: str):
+    @staticmethod
+    def __import(filename: str):
+        """
+        Import an event module and measure how long it took.
+
+        Returns:
+            tuple: The module and the import time in seconds.
+        """
+        start = time.perf_counter()
+        module = importlib.import_module(f"events.{filename}")
+        return module, time.perf_counter() - start
+
+    def __event_handler(self, filename: str, module, import_time: float):
         """
-        Load and execute the event handler module.
+        Execute the event handler module and record its timings.
         
         Args:
             filename (str): The filename of the event handler.
+            module: The imported module.
+            import_time (float): Seconds spent importing the module.
         """
         try:
-            module_name = f"events.{filename}"
-            module = importlib.import_module(module_name)
+            self.__loading = filename
+            start = time.perf_counter()
             self.__execute(module, filename)
+            setup_time = time.perf_counter() - start
+            self.profile.append((filename, import_time, setup_time))
+            self.logger.info(f"Loaded event: {filename}.py")
         except Exception as e:
             self.logger.error(f"Failed to load event: {e}")
+            raise EventLoadError(f"Failed to set up events/{filename}.py") from e
+        finally:
+            self.__loading = None
 
     def register(self, event: EventHandlerType):
         """
@@ -56,9 +203,65 @@ class EventHandler:
         """
         self.events.append(event)
 
+    def discover(self, path: Path = EVENTS_PATH, manifest: Path = EVENTS_MANIFEST):
+        """
+        Register every module in the events folder.
+
+        Modules listed in the manifest are registered first, in manifest
+        order and with its description; disabled entries are skipped.
+        Modules missing from the manifest follow in alphabetical order.
+
+        Args:
+            path (Path): The folder containing the event modules.
+            manifest (Path): TOML file with [[event]] entries.
+        """
+        entries = []
+        if manifest.exists():
+            with open(manifest, "rb") as f:
+                entries = [EventHandlerType(**entry) for entry in tomllib.load(f).get("event", [])]
+
+        available = sorted(
+            info.name for info in pkgutil.iter_modules([str(path)]) if not info.ispkg
+        )
+        listed = {entry.filename for entry in entries}
+        for entry in entries:
+            if entry.filename not in available:
+                raise EventLoadError(f"Manifest lists missing module events/{entry.filename}.py")
+            if entry.enabled:
+                self.register(entry)
+        for filename in available:
+            if filename not in listed:
+                self.register(EventHandlerType(filename=filename))
+
     def load(self):
         """
         Load all registered event handlers.
+
+        Modules are imported and set up one by one in registration order,
+        so handler priority and hook order stay deterministic and each
+        module's import time isn't skewed by the others. Heavy dependencies
+        are imported on first use instead of at import time. Any failure
+        aborts the boot with EventLoadError.
         """
+        start = time.perf_counter()
         for event in self.events:
-            self.__event_handler(event.filename)
+            if not event.enabled:
+                continue
+            try:
+                module, import_time = self.__import(event.filename)
+            except Exception as e:
+                self.logger.error(f"Failed to load event: {e}")
+                raise EventLoadError(f"Failed to import events/{event.filename}.py") from e
+            self.__event_handler(event.filename, module, import_time)
+        self.report(time.perf_counter() - start)
+
+    def report(self, total: float):
+        """
+        Log the import and setup time of every loaded module.
+        """
+        self.logger.info("Event module    import ms   setup ms")
+        for filename, import_time, setup_time in self.profile:
+            self.logger.info(
+                "%-14s %10.1f %10.1f", filename, import_time * 1000, setup_time * 1000
+            )
+        self.logger.info("Loaded %d event modules in %.1f ms", len(self.profile), total * 1000)
@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from settings.logger import BotLogger
+
+logger = BotLogger("FSM")
+
+
+@dataclass(frozen=True, slots=True)
+class Transition:
+    """
+    A row of the step table of a StateMachine.
+
+    validator: Checks the incoming message and returns an object with a
+        `status` flag and an optional `message` to reply with on failure.
+    action: Coroutine function called with the message and the validation
+        result once the message is valid.
+    next_step: The step the session moves to before the action runs,
+        or None to stay on the current step.
+    """
+
+    validator: Callable[[Message], Any]
+    action: Callable[[Message, Any], Awaitable]
+    next_step: Optional[str] = None
+
+
+class StateMachine:
+    """
+    Declarative multi-step conversation flow.
+
+    Steps are looked up in a dictionary, so dispatching a message costs a
+    single session lookup regardless of the number of steps.
+
+    Args:
+        name (str): Name of the flow, used in logs.
+        has_session: Returns whether a telegram_id is inside this flow.
+        get_step: Returns the current step of a telegram_id.
+        set_step: Moves a telegram_id to another step.
+        reply: Coroutine function sending a text reply to a message,
+            defaults to message.reply_text.
+        fallback (str): Reply sent when the session is on an unknown step.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        has_session: Callable[[int], bool],
+        get_step: Callable[[int], str],
+        set_step: Callable[[int, str], None],
+        reply: Optional[Callable[[Message, str], Awaitable]] = None,
+        fallback: Optional[str] = None,
+    ):
+        self.name = name
+        self.has_session = has_session
+        self.get_step = get_step
+        self.set_step = set_step
+        self.reply = reply or (lambda message, text: message.reply_text(text))
+        self.fallback = fallback
+        self.steps: dict[str, Transition] = {}
+
+    def add(
+        self,
+        step: str,
+        validator: Callable[[Message], Any],
+        action: Callable[[Message, Any], Awaitable],
+        next_step: Optional[str] = None,
+    ):
+        """
+        Add a step to the table.
+
+        Args:
+            step (str): The step handled by this row.
+            validator: See Transition.validator.
+            action: See Transition.action.
+            next_step (str): See Transition.next_step.
+        """
+        self.steps[step] = Transition(validator, action, next_step)
+        return self
+
+    async def dispatch(self, message: Message):
+        """
+        Run the validator and action of the current step of the sender.
+        """
+        telegram_id = message.from_user.id
+        transition = self.steps.get(self.get_step(telegram_id))
+        if transition is None:
+            if self.fallback:
+                await self.reply(message, self.fallback)
+            return
+
+        validation = transition.validator(message)
+        if not validation.status:
+            if validation.message:
+                await self.reply(message, validation.message)
+            return
+
+        if transition.next_step is not None:
+            self.set_step(telegram_id, transition.next_step)
+        await transition.action(message, validation)
+
+
+class StateMachineRouter:
+    """
+    Routes text messages to the state machine the sender is currently in.
+
+    All flows share one message filter, so a message from a user without
+    any session is rejected after one membership check per flow.
+    """
+
+    def __init__(self):
+        self.machines: list[StateMachine] = []
+        self._installed: set[int] = set()
+
+    def add(self, machine: StateMachine):
+        """
+        Add a state machine to the router.
+        """
+        self.machines.append(machine)
+        return machine
+
+    def find(self, telegram_id: int) -> Optional[StateMachine]:
+        """
+        Return the state machine holding a session for telegram_id, if any.
+        """
+        for machine in self.machines:
+            if machine.has_session(telegram_id):
+                return machine
+        return None
+
+    def install(self, app: Client):
+        """
+        Register the shared message handler on the client, once per client.
+        """
+        if id(app) in self._installed:
+            return
+        self._installed.add(id(app))
+
+        # Session lookups are local point reads, like the ones dispatch()
+        # makes, so they run inline; a coroutine filter isn't sent to the
+        # client's thread pool. The machine found is kept on the message,
+        # the way filters.regex keeps its matches, so the handler doesn't
+        # look it up again. Commands are left to their own handlers, even
+        # during a flow.
+        async def in_session(_, __, message: Message):
+            if message.from_user is None or message.text.startswith("/"):
+                return False
+            message.state_machine = self.find(message.from_user.id)
+            return message.state_machine is not None
+
+        @app.on_message(filters.text & filters.create(in_session))
+        async def _(client: Client, message: Message):
+            await message.state_machine.dispatch(message)
+
+
+# Router shared by every event module that defines a multi-step flow
+fsm_router = StateMachineRouter()
@@ -1,58 +1,180 @@
+import json
 import logging
+import os
+import queue
+import atexit
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_FORMAT = "[%(levelname)s] %(asctime)s %(name)s: %(message)s"
+
+# LOG_ASYNC=1 menulis log lewat antrean dan thread terpisah,
+# LOG_FORMAT=json menghasilkan satu objek JSON per baris
+LOG_ASYNC = os.environ.get("LOG_ASYNC", "1") == "1"
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_LEVEL = logging.getLevelName(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as single-line JSON objects.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def _create_formatter(format: str = DEFAULT_FORMAT) -> logging.Formatter:
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(format)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    Records never leave the process, so there is no need to pre-render the
+    message in the calling thread as the stock QueueHandler does.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_queue: queue.SimpleQueue = None
+_listener: QueueListener = None
+_stopped = False
+
+# Loggers writing through the listener, switched to direct output on stop
+_queued_loggers: list[logging.Logger] = []
+
+
+def _console_handler(format: str = DEFAULT_FORMAT) -> logging.Handler:
+    handler = logging.StreamHandler()
+    handler.setFormatter(_create_formatter(format))
+    return handler
+
+
+def _queue_handler() -> QueueHandler:
+    """
+    Return a handler that enqueues records for the shared listener thread,
+    starting the listener on first use.
+    """
+    global _queue, _listener
+    if _listener is None:
+        _queue = queue.SimpleQueue()
+        _listener = QueueListener(_queue, _console_handler(), respect_handler_level=True)
+        _listener.start()
+    return _DeferredQueueHandler(_queue)
+
+
+def stop_logging():
+    """
+    Flush the queued records and stop the listener thread.
+
+    Loggers that wrote through the queue are switched to a direct console
+    handler, so records logged afterwards, e.g. by atexit callbacks, are
+    still written. Calling it again does nothing.
+    """
+    global _listener, _queue, _stopped
+    _stopped = True
+    if _listener is None:
+        return
+    _listener.stop()
+    for logger in _queued_loggers:
+        for handler in list(logger.handlers):
+            if isinstance(handler, _DeferredQueueHandler):
+                logger.removeHandler(handler)
+                direct = _console_handler()
+                direct.setLevel(handler.level)
+                logger.addHandler(direct)
+    _queued_loggers.clear()
+    _listener = None
+    _queue = None
+
+
+# Also flush when the process exits without stopping the bot client
+atexit.register(stop_logging)
+
 
 class BotLogger:
     def __init__(
         self,
         name: str = "bot_logger",
-        level: int = logging.INFO,
-        format: str = "[%(levelname)s] %(asctime)s %(name)s: %(message)s",
+        level: int = LOG_LEVEL,
+        format: str = DEFAULT_FORMAT,
     ):
         self.logger = logging.getLogger(name.upper())
         self.logger.setLevel(level)
 
         # Check if the logger already has handlers to prevent duplicate logs
         if not self.logger.hasHandlers():
-            # Create a console handler
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(level)
-
-            # Create a formatter and set it for the handler
-            formatter = logging.Formatter(format)
-            console_handler.setFormatter(formatter)
+            if LOG_ASYNC and not _stopped:
+                # Records are formatted and written by the listener thread
+                handler = _queue_handler()
+                _queued_loggers.append(self.logger)
+            else:
+                # Create a console handler with a formatter
+                handler = _console_handler(format)
+            handler.setLevel(level)
 
             # Add the handler to the logger
-            self.logger.addHandler(console_handler)
+            self.logger.addHandler(handler)
 
-    def info(self, message: str):
+    def debug(self, message: str, *args):
+        """
+        Log a debug message.
+
+        Args:
+            message (str): The message to log, optionally with %-style
+                placeholders that are only formatted when debug is enabled.
+            *args: Values for the placeholders in message.
+        """
+        self.logger.debug(message, *args)
+
+    def info(self, message: str, *args):
         """
         Log an informational message.
-        
+
         Args:
             message (str): The message to log.
+            *args: Values for %-style placeholders in message.
         """
-        self.logger.info(message)
+        self.logger.info(message, *args)
 
-    def error(self, message: str):
+    def error(self, message: str, *args):
         """
         Log an error message.
-        
+
         Args:
             message (str): The message to log.
+            *args: Values for %-style placeholders in message.
         """
-        self.logger.error(message)
+        self.logger.error(message, *args)
 
-    def warning(self, message: str):
+    def warning(self, message: str, *args):
         """
         Log a warning message.
-        
+
         Args:
             message (str): The message to log.
+            *args: Values for %-style placeholders in message.
         """
-        self.logger.warning(message)
+        self.logger.warning(message, *args)
+
 
 # Example usage
 if __name__ == "__main__":
     logger = BotLogger()
+    logger.debug("This is a debug message: %s", {"payload": "skipped unless enabled"})
     logger.info("This is an info message.")
     logger.error("This is an error message.")
     logger.warning("This is a warning message.")
@@ -0,0 +1,268 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from settings.logger import BotLogger
+
+logger = BotLogger("METRICS")
+
+# Port endpoint /metrics (0 = nonaktif) dan interval dump ke log dalam detik (0 = nonaktif)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_LOG_INTERVAL = float(os.environ.get("METRICS_LOG_INTERVAL", "0"))
+
+# Number of most recent samples used to compute percentiles
+RESERVOIR_SIZE = 2048
+
+
+class LatencyStats:
+    """
+    Counters and recent latency samples of a single operation.
+    """
+
+    __slots__ = ("count", "errors", "total", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.samples: deque[float] = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, seconds: float, error: bool = False):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        if error:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Return the q-th percentile (0-100) of the recent samples in seconds.
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": self.errors / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "avg": self.total / self.count if self.count else 0.0,
+        }
+
+
+class Metrics:
+    """
+    Registry of latency statistics keyed by operation name, e.g.
+    "handler./start" or "db.get_user", of counters of events without a
+    duration, e.g. "db.get_user.cached", and of the stats() callbacks of
+    components such as caches and queues, read when metrics are exported.
+    """
+
+    def __init__(self):
+        self.stats: dict[str, LatencyStats] = {}
+        self.counters: dict[str, int] = {}
+        self.components: dict[str, Callable[[], dict]] = {}
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def register(self, component: str, stats: Callable[[], dict]):
+        """
+        Export the numeric values returned by stats() under component.
+
+        Args:
+            component (str): Name of the component, e.g. "user_cache".
+            stats: Returns the current values, e.g. {"size": 10, "hits": 3}.
+        """
+        with self._lock:
+            self.components[component] = stats
+
+    def component_snapshot(self) -> dict[str, dict[str, float]]:
+        """
+        Return the numeric stats of every registered component.
+        """
+        with self._lock:
+            components = list(self.components.items())
+        snapshot = {}
+        for component, stats in components:
+            try:
+                values = stats()
+            except Exception as e:
+                logger.error("Failed to read stats of %s: %s", component, e)
+                continue
+            snapshot[component] = {
+                key: float(value)
+                for key, value in values.items()
+                if isinstance(value, (int, float))
+            }
+        return snapshot
+
+    def observe(self, name: str, seconds: float, error: bool = False):
+        """
+        Record one execution of an operation.
+        """
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = LatencyStats()
+            stats.observe(seconds, error)
+
+    def increment(self, name: str, value: int = 1):
+        """
+        Count an event that has no duration of its own.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Time the enclosed block; exceptions are counted as errors.
+        """
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error)
+
+    def wrap(self, callback, name: str):
+        """
+        Wrap an async Pyrogram callback so every call is timed under name.
+        """
+
+        @wraps(callback)
+        async def instrumented(*args, **kwargs):
+            with self.timer(name):
+                return await callback(*args, **kwargs)
+
+        return instrumented
+
+    def snapshot(self) -> dict[str, dict]:
+        """
+        Return the summary of every operation.
+        """
+        with self._lock:
+            items = list(self.stats.items())
+        return {name: stats.summary() for name, stats in items}
+
+    def render_prometheus(self) -> str:
+        """
+        Render the statistics in the Prometheus text exposition format.
+        """
+        uptime = time.monotonic() - self.started_at
+        lines = [
+            "# TYPE bot_operation_total counter",
+            "# TYPE bot_operation_errors_total counter",
+            "# TYPE bot_operation_latency_seconds summary",
+            "# TYPE bot_operation_rate_per_second gauge",
+        ]
+        for name, summary in sorted(self.snapshot().items()):
+            label = f'operation="{name}"'
+            lines.append(f"bot_operation_total{{{label}}} {summary['count']}")
+            lines.append(f"bot_operation_errors_total{{{label}}} {summary['errors']}")
+            for q in ("p50", "p95", "p99"):
+                quantile = int(q[1:]) / 100
+                lines.append(
+                    f'bot_operation_latency_seconds{{{label},quantile="{quantile}"}} {summary[q]:.6f}'
+                )
+            rate = summary["count"] / uptime if uptime else 0.0
+            lines.append(f"bot_operation_rate_per_second{{{label}}} {rate:.3f}")
+        lines.append("# TYPE bot_event_total counter")
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            lines.append(f'bot_event_total{{event="{name}"}} {value}')
+        lines.append("# TYPE bot_component_stat gauge")
+        for component, values in sorted(self.component_snapshot().items()):
+            for key, value in sorted(values.items()):
+                lines.append(f'bot_component_stat{{component="{component}",stat="{key}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def log_summary(self):
+        """
+        Write one log line per operation.
+        """
+        for name, summary in sorted(self.snapshot().items()):
+            logger.info(
+                "%s count=%d errors=%d p50=%.1fms p95=%.1fms p99=%.1fms",
+                name,
+                summary["count"],
+                summary["errors"],
+                summary["p50"] * 1000,
+                summary["p95"] * 1000,
+                summary["p99"] * 1000,
+            )
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            logger.info("%s count=%d", name, value)
+        for component, values in sorted(self.component_snapshot().items()):
+            logger.info(
+                "%s %s", component, " ".join(f"{key}={value:g}" for key, value in sorted(values.items()))
+            )
+
+
+# Registry shared by the event handlers and the database layer
+metrics = Metrics()
+
+
+def start_http_exporter(port: int = METRICS_PORT, registry: Metrics = metrics):
+    """
+    Serve the metrics at http://127.0.0.1:<port>/metrics from a daemon thread.
+    """
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Metrics available at http://127.0.0.1:%d/metrics", port)
+    return server
+
+
+def start_log_dump(interval: float = METRICS_LOG_INTERVAL, registry: Metrics = metrics):
+    """
+    Log the metrics summary every interval seconds from a daemon thread.
+    """
+
+    def dump():
+        while True:
+            time.sleep(interval)
+            registry.log_summary()
+
+    threading.Thread(target=dump, name="metrics-log", daemon=True).start()
+
+
+def start_exporters():
+    """
+    Start the exporters enabled by METRICS_PORT and METRICS_LOG_INTERVAL.
+    """
+    if METRICS_PORT:
+        start_http_exporter()
+    if METRICS_LOG_INTERVAL:
+        start_log_dump()
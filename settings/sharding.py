@@ -0,0 +1,257 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import time
+from pyrogram import Client, StopPropagation, filters
+from pyrogram.handlers import CallbackQueryHandler, MessageHandler
+from settings.bot import on_startup, on_shutdown
+from settings.logger import BotLogger
+from settings.metrics import metrics
+
+logger = BotLogger("SHARDING")
+
+# Nomor worker ini dan jumlah worker, diisi oleh supervisor.py
+SHARD_INDEX = int(os.environ.get("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", "1"))
+
+# Jumlah titik virtual per worker pada hash ring
+SHARD_VNODES = int(os.environ.get("SHARD_VNODES", "64"))
+
+# Folder berisi anggota hash ring dan heartbeat setiap worker
+SHARD_STATE_DIR = os.environ.get("SHARD_STATE_DIR", "data/shards")
+SHARD_HEARTBEAT_INTERVAL = float(os.environ.get("SHARD_HEARTBEAT_INTERVAL", "5"))
+
+# Seconds between checks of the ring file for membership changes
+RING_REFRESH_INTERVAL = 1.0
+
+
+def ring_path(state_dir: str = SHARD_STATE_DIR) -> str:
+    return os.path.join(state_dir, "ring.json")
+
+
+def heartbeat_path(index: int, state_dir: str = SHARD_STATE_DIR) -> str:
+    return os.path.join(state_dir, f"worker-{index}.json")
+
+
+def write_json(path: str, data: dict):
+    """
+    Replace a JSON file atomically, so readers never see a partial write.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_json(path: str) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def shard_path(path: str) -> str:
+    """
+    Return a per-worker variant of a local file or folder path, e.g.
+    data/timers.worker1.sqlite3, so workers don't share private files.
+    """
+    if SHARD_COUNT <= 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker{SHARD_INDEX}{ext}"
+
+
+def session_name(base: str) -> str:
+    """
+    Return the Pyrogram session name of this worker.
+    """
+    return base if SHARD_COUNT <= 1 else f"{base}-{SHARD_INDEX}"
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to worker indexes.
+
+    Every worker owns `vnodes` points on the ring, so removing a worker
+    only moves the keys it owned and spreads them over the others.
+
+    Args:
+        nodes: Worker indexes on the ring.
+        vnodes (int): Points per worker.
+    """
+
+    def __init__(self, nodes=(), vnodes: int = SHARD_VNODES):
+        self.vnodes = vnodes
+        self.nodes: set[int] = set()
+        self._points: list[int] = []
+        self._owners: list[int] = []
+        for node in nodes:
+            self.nodes.add(node)
+        self._rebuild()
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def _rebuild(self):
+        points = sorted(
+            (self._hash(f"worker-{node}#{vnode}"), node)
+            for node in self.nodes
+            for vnode in range(self.vnodes)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def add(self, node: int):
+        self.nodes.add(node)
+        self._rebuild()
+
+    def remove(self, node: int):
+        self.nodes.discard(node)
+        self._rebuild()
+
+    def owner(self, key: int) -> int | None:
+        """
+        Return the worker owning key, or None if the ring is empty.
+        """
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(str(key))) % len(self._points)
+        return self._owners[index]
+
+
+class ShardFilter:
+    """
+    Drops the updates of users owned by other workers before any handler
+    runs, and publishes this worker's heartbeat for the supervisor.
+
+    The ring membership is read from the ring file written by the
+    supervisor, so draining a worker hands its users to the others.
+
+    Args:
+        index (int): This worker's index.
+        count (int): Number of workers.
+        state_dir (str): Folder of the ring and heartbeat files.
+    """
+
+    def __init__(self, index: int = SHARD_INDEX, count: int = SHARD_COUNT, state_dir: str = SHARD_STATE_DIR):
+        self.index = index
+        self.count = count
+        self.state_dir = state_dir
+        self.ring = HashRing(range(count))
+        self.dropped = 0
+        self.started_at = time.time()
+        self._ring_mtime = None
+        self._checked = 0.0
+        self._task: asyncio.Task = None
+
+    def refresh(self):
+        """
+        Reload the ring if the supervisor changed its members.
+        """
+        now = time.monotonic()
+        if now - self._checked < RING_REFRESH_INTERVAL:
+            return
+        self._checked = now
+        path = ring_path(self.state_dir)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._ring_mtime:
+            return
+        data = read_json(path)
+        if data is None:
+            return
+        self._ring_mtime = mtime
+        self.ring = HashRing(data["members"], data.get("vnodes", SHARD_VNODES))
+        logger.info("Ring members: %s", sorted(self.ring.nodes))
+
+    def owns(self, key: int) -> bool:
+        self.refresh()
+        return self.ring.owner(key) == self.index
+
+    @staticmethod
+    def update_key(update) -> int | None:
+        """
+        Return the user id an update is routed by, or its chat id.
+        """
+        if update.from_user is not None:
+            return update.from_user.id
+        chat = getattr(update, "chat", None) or getattr(update.message, "chat", None)
+        return chat.id if chat is not None else None
+
+    def install(self, app: Client):
+        """
+        Register the filter in front of every other handler of app.
+        """
+
+        async def not_owned(_, __, update) -> bool:
+            key = self.update_key(update)
+            return key is not None and not self.owns(key)
+
+        async def drop(_, __):
+            self.dropped += 1
+            raise StopPropagation
+
+        for handler_type in (MessageHandler, CallbackQueryHandler):
+            app.add_handler(handler_type(drop, filters.create(not_owned)), group=-1)
+
+    def heartbeat(self, stopped: bool = False):
+        handled = errors = 0
+        for name, summary in metrics.snapshot().items():
+            if name.startswith("handler."):
+                handled += summary["count"]
+                errors += summary["errors"]
+        write_json(
+            heartbeat_path(self.index, self.state_dir),
+            {
+                "worker": self.index,
+                "pid": os.getpid(),
+                "started": self.started_at,
+                "time": time.time(),
+                "stopped": stopped,
+                "handled": handled,
+                "errors": errors,
+                "dropped": self.dropped,
+            },
+        )
+
+    async def _beat(self):
+        while True:
+            try:
+                self.heartbeat()
+            except OSError as e:
+                logger.error("Failed to write heartbeat: %s", e)
+            await asyncio.sleep(SHARD_HEARTBEAT_INTERVAL)
+
+    def start(self, client: Client = None):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._beat())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.heartbeat(stopped=True)
+
+
+# Filter of this worker, active when started by supervisor.py
+shard_filter = ShardFilter()
+
+
+def install(app: Client):
+    """
+    Route app's updates by user when running as one of several workers.
+    """
+    if SHARD_COUNT <= 1:
+        return
+    shard_filter.install(app)
+    on_startup(shard_filter.start)
+    on_shutdown(shard_filter.stop)
+    logger.info("Worker %d of %d", SHARD_INDEX, SHARD_COUNT)
@@ -0,0 +1,346 @@
+"""
+Run the bot as several worker processes, one per core.
+
+Every worker is a regular `main.py` process with its own Pyrogram session
+of the bot token, so each one receives every update. The shard filter in
+settings/sharding.py drops updates of users owned by other workers by a
+consistent hash of their telegram_id, before any handler runs, so each
+user's handlers, registration state and database calls stay in one
+process.
+
+The supervisor:
+    - publishes the ring members in SHARD_STATE_DIR/ring.json,
+    - restarts workers that exit or stop sending heartbeats,
+    - drains a worker before stopping it, by taking it out of the ring so
+      its users move to the others while it finishes in-flight updates,
+    - serves the aggregated health of all workers.
+
+Usage:
+    python supervisor.py
+
+Signals: SIGTERM/SIGINT stop every worker gracefully, SIGHUP restarts them
+one at a time. With SUPERVISOR_PORT set, GET /health returns the health of
+every worker and POST /restart or POST /restart/<worker> restarts them.
+
+In-memory registration sessions of a drained worker are lost; use
+STATE_BACKEND=sqlite or redis to hand them over to the other workers.
+
+Updates aren't partitioned by Telegram: every worker receives and decodes
+all of them and drops most, so sharding spreads the handler, database and
+send work but not the network and parsing cost. Private local files
+(broadcast checkpoints, timers, spill files) are per worker through
+shard_path(), so a broadcast can only be resumed by the worker that ran
+it, i.e. while the admin is still routed to it. The users replica is one
+SQLite file shared by every worker, which all write their users' changes
+through and only worker 0 syncs with Supabase, so a user moved to
+another worker keeps their status.
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+from settings.logger import BotLogger, stop_logging
+from settings.sharding import SHARD_STATE_DIR, SHARD_VNODES, heartbeat_path, read_json, ring_path, write_json
+
+load_dotenv()
+
+logger = BotLogger("SUPERVISOR")
+
+# Jumlah worker (default: jumlah core) dan port endpoint /health (0 = nonaktif)
+WORKERS = int(os.environ.get("WORKERS", str(os.cpu_count() or 1)))
+SUPERVISOR_PORT = int(os.environ.get("SUPERVISOR_PORT", "0"))
+
+# Batas waktu berhenti dengan rapi dan batas umur heartbeat dalam detik
+SHARD_STOP_TIMEOUT = float(os.environ.get("SHARD_STOP_TIMEOUT", "30"))
+SHARD_HEARTBEAT_TIMEOUT = float(os.environ.get("SHARD_HEARTBEAT_TIMEOUT", "30"))
+
+# Seconds a drained worker keeps running after leaving the ring, so every
+# other worker has reloaded the ring before it stops
+DRAIN_GRACE = 3.0
+
+# Longest wait before restarting a worker that keeps crashing
+MAX_BACKOFF = 60.0
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class Worker:
+    """
+    One `main.py` process and its supervision state.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: subprocess.Popen = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failures = 0
+        self.in_ring = False
+        self.busy = False
+        self.next_start = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def heartbeat(self) -> dict | None:
+        """
+        Return this process's latest heartbeat, ignoring earlier processes.
+        """
+        data = read_json(heartbeat_path(self.index))
+        if data is None or not self.alive or data.get("pid") != self.process.pid:
+            return None
+        return data
+
+
+class Supervisor:
+    """
+    Starts, watches, drains and restarts the worker processes.
+
+    Args:
+        count (int): Number of workers.
+    """
+
+    def __init__(self, count: int = WORKERS):
+        self.count = count
+        self.workers = [Worker(index) for index in range(count)]
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def write_ring(self):
+        """
+        Publish the workers currently accepting users.
+        """
+        members = [worker.index for worker in self.workers if worker.in_ring]
+        write_json(ring_path(), {"members": members, "vnodes": SHARD_VNODES})
+        logger.info("Ring members: %s", members)
+
+    def spawn(self, worker: Worker):
+        env = os.environ.copy()
+        env["SHARD_INDEX"] = str(worker.index)
+        env["SHARD_COUNT"] = str(self.count)
+        metrics_port = int(env.get("METRICS_PORT", "0"))
+        if metrics_port:
+            env["METRICS_PORT"] = str(metrics_port + worker.index)
+        worker.process = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env)
+        worker.started_at = time.time()
+        logger.info("Started worker %d (pid %d)", worker.index, worker.process.pid)
+
+    def terminate(self, worker: Worker):
+        """
+        Stop a worker with SIGTERM, which runs the bot's shutdown hooks,
+        and kill it if it doesn't exit within SHARD_STOP_TIMEOUT.
+        """
+        if not worker.alive:
+            return
+        worker.process.terminate()
+        try:
+            worker.process.wait(SHARD_STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            logger.warning("Worker %d did not stop in time, killing it", worker.index)
+            worker.process.kill()
+            worker.process.wait()
+
+    def leave_ring(self, worker: Worker):
+        with self._lock:
+            if worker.in_ring:
+                worker.in_ring = False
+                self.write_ring()
+
+    def restart(self, index: int):
+        """
+        Drain and restart one worker; it rejoins the ring after its first heartbeat.
+        """
+        worker = self.workers[index]
+        with self._lock:
+            if worker.busy or self._stopping.is_set():
+                return
+            worker.busy = True
+        try:
+            logger.info("Draining worker %d", index)
+            self.leave_ring(worker)
+            time.sleep(DRAIN_GRACE)
+            self.terminate(worker)
+            worker.restarts += 1
+            if not self._stopping.is_set():
+                self.spawn(worker)
+        finally:
+            worker.busy = False
+
+    def rolling_restart(self):
+        """
+        Restart the workers one at a time, waiting for each to rejoin.
+        """
+        for worker in self.workers:
+            if self._stopping.is_set():
+                return
+            self.restart(worker.index)
+            while not worker.in_ring and worker.alive and not self._stopping.is_set():
+                time.sleep(1)
+
+    def check(self, worker: Worker):
+        """
+        Restart a crashed or hung worker and let a started one join the ring.
+        """
+        if worker.busy:
+            return
+        now = time.time()
+        if not worker.alive:
+            if worker.process is not None:
+                self.leave_ring(worker)
+                logger.error(
+                    "Worker %d exited with code %s", worker.index, worker.process.returncode
+                )
+                worker.process = None
+                worker.failures += 1
+                worker.next_start = now + min(MAX_BACKOFF, 2 ** (worker.failures - 1))
+            if now >= worker.next_start:
+                worker.restarts += 1
+                self.spawn(worker)
+            return
+
+        heartbeat = worker.heartbeat()
+        if heartbeat is not None and not worker.in_ring and not heartbeat["stopped"]:
+            with self._lock:
+                worker.in_ring = True
+                self.write_ring()
+        last_seen = heartbeat["time"] if heartbeat is not None else worker.started_at
+        if now - last_seen > SHARD_HEARTBEAT_TIMEOUT:
+            logger.error("Worker %d stopped sending heartbeats", worker.index)
+            threading.Thread(target=self.restart, args=(worker.index,), daemon=True).start()
+        elif worker.in_ring and now - worker.started_at > MAX_BACKOFF:
+            worker.failures = 0
+
+    def health(self) -> dict:
+        """
+        Return the state of every worker and totals over all of them.
+        """
+        now = time.time()
+        workers = []
+        totals = {"handled": 0, "errors": 0, "dropped": 0}
+        for worker in self.workers:
+            heartbeat = worker.heartbeat() or {}
+            for key in totals:
+                totals[key] += heartbeat.get(key, 0)
+            workers.append(
+                {
+                    "worker": worker.index,
+                    "pid": worker.process.pid if worker.alive else None,
+                    "alive": worker.alive,
+                    "in_ring": worker.in_ring,
+                    "restarts": worker.restarts,
+                    "uptime": round(now - worker.started_at, 1) if worker.alive else 0,
+                    "heartbeat_age": round(now - heartbeat["time"], 1) if heartbeat else None,
+                    "handled": heartbeat.get("handled", 0),
+                    "errors": heartbeat.get("errors", 0),
+                    "dropped": heartbeat.get("dropped", 0),
+                }
+            )
+        return {
+            "status": "ok" if all(worker.in_ring for worker in self.workers) else "degraded",
+            "uptime": round(now - self.started_at, 1),
+            "workers": workers,
+            **totals,
+        }
+
+    def start_http(self, port: int = SUPERVISOR_PORT):
+        """
+        Serve GET /health and POST /restart[/<worker>] on 127.0.0.1:<port>.
+        """
+        supervisor = self
+
+        class SupervisorRequestHandler(BaseHTTPRequestHandler):
+            def respond(self, status: int, data: dict):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path != "/health":
+                    self.send_error(404)
+                    return
+                health = supervisor.health()
+                self.respond(200 if health["status"] == "ok" else 503, health)
+
+            def do_POST(self):
+                parts = self.path.strip("/").split("/")
+                if parts[0] != "restart" or len(parts) > 2:
+                    self.send_error(404)
+                    return
+                if len(parts) == 1:
+                    target = supervisor.rolling_restart
+                    args = ()
+                elif parts[1].isdigit() and int(parts[1]) < supervisor.count:
+                    target = supervisor.restart
+                    args = (int(parts[1]),)
+                else:
+                    self.send_error(404)
+                    return
+                threading.Thread(target=target, args=args, daemon=True).start()
+                self.respond(202, {"restarting": parts[1] if len(parts) == 2 else "all"})
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), SupervisorRequestHandler)
+        threading.Thread(target=server.serve_forever, name="supervisor-http", daemon=True).start()
+        logger.info("Health available at http://127.0.0.1:%d/health", port)
+        return server
+
+    def stop(self):
+        """
+        Stop every worker gracefully, in parallel.
+        """
+        self._stopping.set()
+        for worker in self.workers:
+            if worker.alive:
+                worker.process.terminate()
+        for worker in self.workers:
+            self.terminate(worker)
+            worker.in_ring = False
+        self.write_ring()
+
+    def run(self):
+        """
+        Start the workers and supervise them until SIGTERM or SIGINT.
+        Workers start in the ring; after a restart they rejoin it with
+        their first heartbeat.
+        """
+        for worker in self.workers:
+            worker.in_ring = True
+        self.write_ring()
+        for worker in self.workers:
+            self.spawn(worker)
+
+        signal.signal(signal.SIGTERM, lambda *_: self._stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: self._stopping.set())
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(
+                signal.SIGHUP,
+                lambda *_: threading.Thread(target=self.rolling_restart, daemon=True).start(),
+            )
+        if SUPERVISOR_PORT:
+            self.start_http()
+
+        while not self._stopping.wait(1):
+            for worker in self.workers:
+                self.check(worker)
+
+        logger.info("Stopping %d workers", self.count)
+        self.stop()
+
+
+if __name__ == "__main__":
+    os.makedirs(SHARD_STATE_DIR, exist_ok=True)
+    Supervisor().run()
+    stop_logging()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+# Point every on-disk store at a scratch folder before the bot modules are imported
+_data_dir = tempfile.mkdtemp(prefix="simulasicpns-tests-")
+for name, value in {
+    "LOG_LEVEL": "WARNING",
+    "LOG_ASYNC": "0",
+    "STATE_BACKEND": "memory",
+    "REPLICA_PATH": os.path.join(_data_dir, "users.sqlite3"),
+    "REPLICA_SYNC_INTERVAL": "0",
+    "TIMER_DB_PATH": os.path.join(_data_dir, "timers.sqlite3"),
+    "RANKING_SNAPSHOT_PATH": os.path.join(_data_dir, "ranking.snapshot"),
+    "WRITE_SPILL_DIR": os.path.join(_data_dir, "spill"),
+    "BROADCAST_DIR": os.path.join(_data_dir, "broadcasts"),
+    "SHARD_STATE_DIR": os.path.join(_data_dir, "shards"),
+}.items():
+    os.environ[name] = value
+
+import pytest
+
+from tests.fakes import FakeSupabase
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    """
+    Replace the shared Supabase client with an in-memory stand-in and
+    start every test with an empty user cache and replica.
+    """
+    import plugins.supabase
+    from plugins.replica import UserReplica
+
+    fake = FakeSupabase()
+    monkeypatch.setattr(plugins.supabase, "get_client", lambda: fake)
+    monkeypatch.setattr(plugins.supabase, "user_replica", UserReplica(":memory:"))
+    plugins.supabase.user_cache.clear()
+    yield fake
+    plugins.supabase.user_cache.clear()
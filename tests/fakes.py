@@ -0,0 +1,169 @@
+import time
+from types import SimpleNamespace
+
+
+class FakeQuery:
+    """
+    The subset of the PostgREST query builder used by plugins/supabase.py,
+    evaluated against the rows of a FakeSupabase table.
+    """
+
+    def __init__(self, database: "FakeSupabase", table: str):
+        self.database = database
+        self.table = table
+        self.filters = []
+        self.orders = []
+        self.limit_to = None
+        self.single = False
+        self.write = None
+
+    def select(self, fields: str = "*"):
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gt(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def in_(self, column: str, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column: str):
+        self.orders.append(column)
+        return self
+
+    def limit(self, count: int):
+        self.limit_to = count
+        return self
+
+    def maybe_single(self):
+        self.single = True
+        return self
+
+    def insert(self, rows):
+        self.write = ("insert", rows if isinstance(rows, list) else [rows], None)
+        return self
+
+    def upsert(self, rows, on_conflict: str = "", ignore_duplicates: bool = False):
+        self.write = ("upsert", rows if isinstance(rows, list) else [rows], (on_conflict, ignore_duplicates))
+        return self
+
+    def update(self, values: dict):
+        self.write = ("update", values, None)
+        return self
+
+    def _matches(self, row: dict) -> bool:
+        return all(check(row) for check in self.filters)
+
+    def execute(self):
+        self.database.requests.append((self.table, self.write[0] if self.write else "select"))
+        if self.database.error is not None:
+            raise self.database.error
+        rows = self.database.tables.setdefault(self.table, [])
+        if self.write is None:
+            found = [dict(row) for row in rows if self._matches(row)]
+            for column in reversed(self.orders):
+                found.sort(key=lambda row: row.get(column))
+            if self.limit_to is not None:
+                found = found[: self.limit_to]
+            if self.single:
+                return SimpleNamespace(data=found[0]) if found else None
+            return SimpleNamespace(data=found)
+
+        kind, payload, options = self.write
+        if kind == "update":
+            changed = []
+            for row in rows:
+                if self._matches(row):
+                    row.update(payload)
+                    changed.append(dict(row))
+            return SimpleNamespace(data=changed)
+
+        written = []
+        for values in payload:
+            existing = None
+            if kind == "upsert":
+                key = options[0]
+                existing = next((row for row in rows if row.get(key) == values.get(key)), None)
+            if existing is None:
+                row = {**self.database.defaults.get(self.table, {}), **values}
+                rows.append(row)
+                written.append(dict(row))
+            elif not options[1]:
+                existing.update(values)
+                written.append(dict(existing))
+        return SimpleNamespace(data=written)
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the Supabase client. Every executed query is
+    appended to `requests`, so tests can count round trips; setting `error`
+    makes every request fail with it.
+    """
+
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = {}
+        self.defaults = {"users": {"status": "NEW", "email": None, "phone_number": None}}
+        self.requests: list[tuple[str, str]] = []
+        self.error: Exception = None
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the redis.Redis commands used by RedisStateStore,
+    including expiry through SET ... EX.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.data: dict[str, tuple[bytes, float]] = {}
+        self.closed = False
+
+    def get(self, key: str) -> bytes | None:
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.clock():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ex: int = None):
+        self.data[key] = (value, self.clock() + ex if ex else None)
+
+    def delete(self, key: str) -> int:
+        return int(self.data.pop(key, None) is not None)
+
+    def exists(self, key: str) -> int:
+        return int(self.get(key) is not None)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeApp:
+    """
+    Stand-in for a Pyrogram client that records the handlers registered
+    with on_message, as (filters, callback) pairs in registration order.
+    """
+
+    def __init__(self):
+        self.handlers: list[tuple] = []
+
+    def on_message(self, filters=None, group: int = 0):
+        def decorator(callback):
+            self.handlers.append((filters, callback))
+            return callback
+
+        return decorator
+
+    @property
+    def callbacks(self) -> list:
+        return [callback for _, callback in self.handlers]
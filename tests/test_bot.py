@@ -0,0 +1,23 @@
+import asyncio
+
+import settings.bot
+from settings.bot import BotClient
+
+
+def test_before_stop_hooks_run_while_connected(monkeypatch):
+    calls = []
+
+    async def disconnect(self, block: bool = True):
+        calls.append("disconnect")
+
+    monkeypatch.setattr(settings.bot.Client, "stop", disconnect)
+    monkeypatch.setattr(settings.bot, "_before_stop_hooks", [lambda: calls.append("first"), lambda: calls.append("second")])
+    monkeypatch.setattr(settings.bot, "_shutdown_hooks", [lambda: calls.append("shutdown")])
+
+    async def stop():
+        # Not initialized, the patched Client.stop needs no connection
+        await object.__new__(BotClient).stop()
+
+    asyncio.run(stop())
+
+    assert calls == ["second", "first", "disconnect", "shutdown"]
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pyrogram.errors import UserIsBlocked
+
+import plugins.broadcast
+from plugins.broadcast import Broadcaster
+
+
+class FakeDatabase:
+    def __init__(self, telegram_ids: list[int]):
+        self.telegram_ids = telegram_ids
+
+    async def iter_user_pages(self, status=None, page_size: int = 100, after: int = None):
+        remaining = [telegram_id for telegram_id in self.telegram_ids if after is None or telegram_id > after]
+        for start in range(0, len(remaining), page_size):
+            yield [SimpleNamespace(telegram_id=telegram_id) for telegram_id in remaining[start : start + page_size]]
+
+
+class FakeSender:
+    def __init__(self, errors: dict[int, Exception] = None):
+        self.errors = errors or {}
+        self.sent: list[int] = []
+
+    async def send(self, func, *args, chat_id: int, **kwargs):
+        await asyncio.sleep(0)
+        error = self.errors.pop(chat_id, None)
+        if error is not None:
+            raise error
+        self.sent.append(chat_id)
+
+
+@pytest.fixture
+def broadcast(tmp_path, monkeypatch):
+    def create(errors: dict[int, Exception] = None) -> tuple[Broadcaster, FakeSender]:
+        fake_sender = FakeSender(errors)
+        monkeypatch.setattr(plugins.broadcast, "sender", fake_sender)
+        broadcaster = Broadcaster(FakeDatabase(list(range(1, 11))), concurrency=1, page_size=4, checkpoint_dir=str(tmp_path))
+        return broadcaster, fake_sender
+
+    return create
+
+
+def test_broadcast_reaches_every_user(broadcast):
+    broadcaster, fake_sender = broadcast({3: UserIsBlocked(), 7: RuntimeError("boom")})
+
+    async def run():
+        await broadcaster.start(SimpleNamespace(send_message=None), "Halo")
+
+    asyncio.run(run())
+
+    assert fake_sender.sent == [1, 2, 4, 5, 6, 8, 9, 10]
+    stats = broadcaster.stats()
+    assert (stats["sent"], stats["blocked"], stats["failed"], stats["finished"]) == (8, 1, 1, True)
+    assert broadcaster.unfinished() is None
+
+
+def test_connection_error_stops_before_the_unsent_recipient(broadcast):
+    broadcaster, fake_sender = broadcast({6: ConnectionError("The send scheduler has stopped")})
+    client = SimpleNamespace(send_message=None)
+
+    async def run():
+        await broadcaster.start(client, "Halo")
+        checkpoint = broadcaster.unfinished()
+        assert checkpoint.last_id == 5
+        assert checkpoint.processed == 5
+        await broadcaster.resume(client)
+
+    asyncio.run(run())
+
+    assert fake_sender.sent == list(range(1, 11))
+    assert broadcaster.stats()["finished"]
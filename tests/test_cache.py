@@ -0,0 +1,42 @@
+import plugins.cache
+from plugins.cache import TTLCache
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(plugins.cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+
+    now[0] += 9.9
+    assert cache.get("a") == 1
+    now[0] += 0.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_stats_count_hits_and_misses():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b", "default")
+    cache.invalidate("a")
+    cache.get("a")
+
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+    cache.clear()
+    assert cache.stats()["hits"] == 0
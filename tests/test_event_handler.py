@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+from settings.event_handler import KeyedLock
+
+
+def update(telegram_id: int, text: str = ""):
+    return SimpleNamespace(from_user=SimpleNamespace(id=telegram_id), text=text)
+
+
+def test_updates_of_one_user_run_in_arrival_order():
+    log = []
+
+    async def callback(client, update):
+        log.append(("start", update.text))
+        await asyncio.sleep(0.01)
+        log.append(("end", update.text))
+
+    async def run():
+        locks = KeyedLock()
+        handler = locks.serialize(callback)
+        await asyncio.gather(*(handler(None, update(42, text)) for text in "abc"))
+        return locks
+
+    locks = asyncio.run(run())
+
+    assert log == [("start", "a"), ("end", "a"), ("start", "b"), ("end", "b"), ("start", "c"), ("end", "c")]
+    assert len(locks) == 0
+
+
+def test_different_users_run_concurrently():
+    running = []
+    peak = []
+
+    async def callback(client, update):
+        running.append(update.from_user.id)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(update.from_user.id)
+
+    async def run():
+        handler = KeyedLock().serialize(callback)
+        await asyncio.gather(*(handler(None, update(telegram_id)) for telegram_id in range(5)))
+
+    asyncio.run(run())
+
+    assert max(peak) == 5
+
+
+def test_updates_beyond_the_limit_are_dropped():
+    handled = []
+
+    async def callback(client, update):
+        await asyncio.sleep(0.01)
+        handled.append(update.text)
+
+    async def run():
+        locks = KeyedLock(limit=2)
+        handler = locks.serialize(callback)
+        await asyncio.gather(*(handler(None, update(42, text)) for text in "abc"), handler(None, update(7, "d")))
+        return locks
+
+    locks = asyncio.run(run())
+
+    assert sorted(handled) == ["a", "b", "d"]
+    assert locks.rejected == 1
+
+
+def test_updates_without_a_user_are_not_serialized():
+    async def callback(client, update):
+        return "done"
+
+    async def run():
+        locks = KeyedLock(limit=0)
+        return await locks.serialize(callback)(None, SimpleNamespace(from_user=None)), locks
+
+    result, locks = asyncio.run(run())
+
+    assert result == "done"
+    assert locks.rejected == 0
+
+
+def test_cancelled_updates_release_their_place():
+    async def run():
+        holding = asyncio.Event()
+
+        async def callback(client, update):
+            holding.set()
+            await asyncio.sleep(10)
+
+        locks = KeyedLock(limit=2)
+        handler = locks.serialize(callback)
+        first = asyncio.create_task(handler(None, update(42)))
+        second = asyncio.create_task(handler(None, update(42)))
+        await holding.wait()
+        second.cancel()
+        first.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        return locks
+
+    locks = asyncio.run(run())
+
+    assert len(locks) == 0
+    assert locks.try_enter(42)
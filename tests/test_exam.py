@@ -0,0 +1,168 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import events.exam
+from models.questions import Category, Question, QuestionBank, build_question_bank
+from models.users import User, UserStatus
+from plugins.timer_wheel import exam_timers, session_table
+from tests.fakes import FakeApp
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+
+class FakeSender:
+    def __init__(self, client: FakeClient):
+        self.client = client
+
+    async def send(self, func, *args, chat_id: int, **kwargs):
+        return await func(*args, **kwargs)
+
+    async def reply(self, message, text, **kwargs):
+        self.client.sent.append(text)
+
+
+class FakeDatabase:
+    def __init__(self, status: UserStatus):
+        self.status = status
+
+    async def get_user(self, telegram_id: int):
+        return User(telegram_id=telegram_id, username="peserta", status=self.status)
+
+
+def message(text: str, telegram_id: int = 42):
+    return SimpleNamespace(
+        text=text,
+        command=text[1:].split() if text.startswith("/") else None,
+        from_user=SimpleNamespace(id=telegram_id, language_code="id"),
+        chat=SimpleNamespace(id=telegram_id),
+    )
+
+
+@pytest.fixture
+def exam(tmp_path, monkeypatch):
+    path = str(tmp_path / "questions.qbank")
+    build_question_bank(
+        [
+            Question(category=Category.TWK, text="TWK 1", options=list("vwxyz"), scores=[0, 5, 0, 0, 0]),
+            Question(category=Category.TIU, text="TIU 1", options=list("vwxy"), scores=[5, 0, 0, 0]),
+            Question(category=Category.TKP, text="TKP 1", options=list("vwxyz"), scores=[1, 2, 3, 4, 5]),
+        ],
+        path,
+    )
+    bank = QuestionBank(path)
+    client = FakeClient()
+    results = []
+    answers = []
+    progress = []
+
+    async def record_result(test_type, telegram_id, score):
+        results.append((test_type, telegram_id, score))
+
+    async def add_answer(row):
+        answers.append(row)
+
+    async def add_progress(row):
+        progress.append(row)
+
+    monkeypatch.setattr(events.exam, "get_question_bank", lambda: bank)
+    monkeypatch.setattr(events.exam, "sender", FakeSender(client))
+    monkeypatch.setattr(events.exam, "db", FakeDatabase(UserStatus.REGISTERED))
+    monkeypatch.setattr(events.exam, "record_result", record_result)
+    monkeypatch.setattr(events.exam.answer_events, "add", add_answer)
+    monkeypatch.setattr(events.exam.progress_events, "add", add_progress)
+    app = FakeApp()
+    events.exam.handler(app)
+    select_test, submit, answer = app.callbacks
+    yield SimpleNamespace(
+        client=client,
+        results=results,
+        answers=answers,
+        progress=progress,
+        select_test=select_test,
+        submit=submit,
+        answer=answer,
+    )
+    events.exam.sessions.clear()
+    session_table.delete(42)
+    exam_timers.finish_exam(42)
+    bank.close()
+
+
+def test_full_simulation_is_scored_and_recorded(exam):
+    async def scenario():
+        await exam.select_test(exam.client, message("/select_test SKD"))
+        session = events.exam.sessions[42]
+        bank = events.exam.get_question_bank()
+        for question_id in list(session.question_ids):
+            question = bank.get(question_id)
+            best = question.scores.index(max(question.scores))
+            await exam.answer(exam.client, message("ABCDE"[best]))
+
+    asyncio.run(scenario())
+
+    assert exam.results == [("SKD", 42, 15)]
+    assert len(exam.answers) == 3
+    assert [(row["status"], row["answered"], row["total"]) for row in exam.progress] == [
+        ("STARTED", 0, 3),
+        ("SUBMITTED", 3, 3),
+    ]
+    assert 42 not in events.exam.sessions
+    assert exam_timers.wheel.get("exam:42") is None
+    assert "Total: 15" in exam.client.sent[-1]
+
+
+def test_invalid_answers_are_rejected(exam):
+    async def scenario():
+        await exam.select_test(exam.client, message("/select_test TIU"))
+        await exam.answer(exam.client, message("E"))
+        await exam.answer(exam.client, message("jawaban"))
+
+    asyncio.run(scenario())
+
+    assert exam.answers == []
+    assert exam.client.sent[-1] == "Pilih salah satu jawaban: A, B, C, D."
+    assert exam_timers.wheel.get("exam:42") is not None
+
+
+def test_submit_early_scores_unanswered_questions_as_zero(exam):
+    async def scenario():
+        await exam.select_test(exam.client, message("/select_test TWK"))
+        await exam.submit(exam.client, message("/submit"))
+
+    asyncio.run(scenario())
+
+    assert exam.results == [("TWK", 42, 0)]
+
+
+def test_unregistered_users_cannot_start(exam, monkeypatch):
+    monkeypatch.setattr(events.exam, "db", FakeDatabase(UserStatus.NEW))
+
+    asyncio.run(exam.select_test(exam.client, message("/select_test SKD")))
+
+    assert 42 not in events.exam.sessions
+    assert "/register" in exam.client.sent[-1]
+
+
+def test_sessions_are_persisted_until_submitted(exam):
+    async def scenario():
+        await exam.select_test(exam.client, message("/select_test SKD"))
+        await exam.answer(exam.client, message("A"))
+        stored = dict(session_table.load())[42]
+        await exam.submit(exam.client, message("/submit"))
+        return stored
+
+    stored = asyncio.run(scenario())
+
+    restored = events.exam.ExamSession(**stored)
+    assert restored.current == 1
+    assert restored.answers[0] == 0
+    assert restored.lang == "id"
+    assert 42 not in dict(session_table.load())
@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+from pyrogram.types import Message, User
+
+from settings.fsm import StateMachine, StateMachineRouter
+from tests.fakes import FakeApp
+
+VALID = SimpleNamespace(status=True, message=None)
+
+
+def invalid(message: str):
+    return SimpleNamespace(status=False, message=message)
+
+
+def message(text: str, telegram_id: int = 42) -> Message:
+    return Message(id=1, text=text, from_user=User(id=telegram_id))
+
+
+class Flow:
+    """A two-step flow with its sessions in a dict, recording the replies and actions."""
+
+    def __init__(self, name: str = "flow"):
+        self.sessions: dict[int, str] = {}
+        self.replies: list[str] = []
+        self.actions: list[tuple[str, str]] = []
+
+        async def reply(message, text):
+            self.replies.append(text)
+
+        self.machine = StateMachine(
+            name,
+            has_session=lambda telegram_id: telegram_id in self.sessions,
+            get_step=self.sessions.get,
+            set_step=self.sessions.__setitem__,
+            reply=reply,
+            fallback="unknown step",
+        )
+        self.machine.add("ask", self.validate, self.action("ask"), next_step="confirm")
+        self.machine.add("confirm", lambda msg: VALID, self.action("confirm"))
+
+    @staticmethod
+    def validate(msg):
+        return VALID if msg.text.isdigit() else invalid("numbers only")
+
+    def action(self, step: str):
+        async def run(msg, validation):
+            self.actions.append((step, msg.text))
+
+        return run
+
+
+def test_valid_message_moves_to_the_next_step():
+    flow = Flow()
+    flow.sessions[42] = "ask"
+
+    asyncio.run(flow.machine.dispatch(message("123")))
+
+    assert flow.sessions[42] == "confirm"
+    assert flow.actions == [("ask", "123")]
+
+
+def test_invalid_message_replies_and_stays():
+    flow = Flow()
+    flow.sessions[42] = "ask"
+
+    asyncio.run(flow.machine.dispatch(message("abc")))
+
+    assert flow.sessions[42] == "ask"
+    assert flow.replies == ["numbers only"]
+    assert flow.actions == []
+
+
+def test_unknown_step_gets_the_fallback_reply():
+    flow = Flow()
+    flow.sessions[42] = "gone"
+
+    asyncio.run(flow.machine.dispatch(message("123")))
+
+    assert flow.replies == ["unknown step"]
+
+
+def test_router_sends_messages_to_the_flow_holding_the_session():
+    first, second = Flow("first"), Flow("second")
+    second.sessions[42] = "ask"
+    router = StateMachineRouter()
+    router.add(first.machine)
+    router.add(second.machine)
+    app = FakeApp()
+    router.install(app)
+    router.install(app)
+    [(flt, callback)] = app.handlers
+    client = SimpleNamespace()
+
+    async def run():
+        assert not await flt(client, message("123", telegram_id=7))
+        assert not await flt(client, message("/rank SKD"))
+        answer = message("123")
+        assert await flt(client, answer)
+        await callback(client, answer)
+
+    asyncio.run(run())
+
+    assert router.find(7) is None
+    assert first.actions == []
+    assert second.actions == [("ask", "123")]
@@ -0,0 +1,42 @@
+import logging
+
+import settings.logger
+import pytest
+
+from settings.logger import BotLogger, stop_logging
+
+
+@pytest.fixture(autouse=True)
+def own_handlers_only(monkeypatch):
+    # pytest's capture handler on the root logger would stop BotLogger from adding its own
+    monkeypatch.setattr(logging.Logger, "hasHandlers", lambda self: bool(self.handlers))
+
+
+def test_stop_logging_flushes_and_switches_to_direct_output(monkeypatch, capsys):
+    monkeypatch.setattr(settings.logger, "LOG_ASYNC", True)
+    monkeypatch.setattr(settings.logger, "_stopped", False)
+    logger = BotLogger("test_queued_logger", level=logging.INFO)
+
+    logger.info("queued %s", "record")
+    stop_logging()
+    logger.info("after %s", "stop")
+    stop_logging()
+
+    err = capsys.readouterr().err
+    assert "queued record" in err
+    assert "after stop" in err
+    assert not any(
+        isinstance(handler, logging.handlers.QueueHandler) for handler in logger.logger.handlers
+    )
+    assert settings.logger._listener is None
+
+
+def test_logger_created_after_stop_writes_directly(monkeypatch, capsys):
+    monkeypatch.setattr(settings.logger, "LOG_ASYNC", True)
+    stop_logging()
+
+    logger = BotLogger("test_late_logger", level=logging.INFO)
+    logger.info("late record")
+
+    assert settings.logger._listener is None
+    assert "late record" in capsys.readouterr().err
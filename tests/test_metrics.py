@@ -0,0 +1,51 @@
+from settings.metrics import Metrics
+
+
+def test_render_prometheus_includes_latency_and_component_stats():
+    registry = Metrics()
+    registry.observe("db.get_user", 0.002)
+    registry.observe("db.get_user", 0.004, error=True)
+    registry.register("user_cache", lambda: {"size": 3, "hit_rate": 0.5, "ready": True, "name": "ignored"})
+
+    text = registry.render_prometheus()
+
+    assert 'bot_operation_total{operation="db.get_user"} 2' in text
+    assert 'bot_operation_errors_total{operation="db.get_user"} 1' in text
+    assert 'bot_component_stat{component="user_cache",stat="size"} 3' in text
+    assert 'bot_component_stat{component="user_cache",stat="hit_rate"} 0.5' in text
+    assert 'bot_component_stat{component="user_cache",stat="ready"} 1' in text
+    assert "ignored" not in text
+
+
+def test_failing_component_is_skipped():
+    registry = Metrics()
+
+    def broken():
+        raise RuntimeError("closed")
+
+    registry.register("broken", broken)
+    registry.register("sender", lambda: {"queued": 0})
+
+    assert registry.component_snapshot() == {"sender": {"queued": 0.0}}
+
+
+def test_timer_counts_exceptions_as_errors():
+    registry = Metrics()
+    try:
+        with registry.timer("handler./start"):
+            raise ValueError
+    except ValueError:
+        pass
+
+    summary = registry.snapshot()["handler./start"]
+    assert summary["count"] == 1
+    assert summary["errors"] == 1
+
+
+def test_counters_stay_out_of_latency_stats():
+    registry = Metrics()
+    registry.increment("db.get_user.cached")
+    registry.increment("db.get_user.cached", 2)
+
+    assert registry.snapshot() == {}
+    assert 'bot_event_total{event="db.get_user.cached"} 3' in registry.render_prometheus()
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from models.questions import Category, Question, QuestionBank, build_question_bank
+
+
+def question(category=Category.TIU, difficulty=1, tags=(), options=5, **fields):
+    values = {
+        "category": category,
+        "difficulty": difficulty,
+        "tags": list(tags),
+        "text": f"Soal {category.value} {difficulty}",
+        "options": [f"Opsi {i}" for i in range(options)],
+        "scores": [5] + [0] * (options - 1),
+    }
+    values.update(fields)
+    return Question(**values)
+
+
+@pytest.fixture
+def bank(tmp_path):
+    path = str(tmp_path / "questions.qbank")
+    build_question_bank(
+        [
+            question(Category.TWK, 1, ["pancasila"]),
+            question(Category.TIU, 2, ["deret"]),
+            question(Category.TIU, 3, ["deret"], options=4),
+            question(Category.TKP, 1, scores=[1, 2, 3, 4, 5], text="Saya lebih suka..."),
+        ],
+        path,
+    )
+    bank = QuestionBank(path)
+    yield bank
+    bank.close()
+
+
+def test_questions_round_trip(bank):
+    assert len(bank) == 4
+    tkp = bank.get(3)
+    assert tkp.category is Category.TKP
+    assert tkp.text == "Saya lebih suka..."
+    assert tkp.scores == [1, 2, 3, 4, 5]
+    assert bank.get(2).options == ["Opsi 0", "Opsi 1", "Opsi 2", "Opsi 3"]
+    assert bank.get(1).answer == 0
+    with pytest.raises(IndexError):
+        bank.get(4)
+
+
+def test_indexes(bank):
+    assert list(bank.ids(category=Category.TIU)) == [1, 2]
+    assert list(bank.ids(category=Category.TIU, difficulty=3)) == [2]
+    assert list(bank.ids(tag="deret")) == [1, 2]
+    assert list(bank.ids(tag="unknown")) == []
+    assert bank.tags() == ["deret", "pancasila"]
+
+
+def test_sample_draws_distinct_questions(bank):
+    drawn = bank.sample(5, category=Category.TIU, rng=random.Random(1))
+    assert sorted(q.id for q in drawn) == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "invalid",
+    [
+        question(options=6),
+        question(scores=[5, 0]),
+        question(difficulty=256),
+        question(category=Category.TKP, scores=[1, 2, 3, 4, 300]),
+    ],
+)
+def test_build_rejects_questions_that_do_not_fit_a_record(tmp_path, invalid):
+    with pytest.raises(ValueError):
+        build_question_bank([invalid], str(tmp_path / "questions.qbank"))
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import plugins.ranking
+from plugins.ranking import FenwickTree, Leaderboard, RankingIndex, load_ranking, record_result
+from plugins.supabase import ResultDatabase, WriteBehindBuffer
+
+
+def test_fenwick_tree_prefix_counts():
+    tree = FenwickTree(10)
+    for score in (0, 3, 3, 9):
+        tree.add(score)
+
+    assert tree.prefix(0) == 1
+    assert tree.prefix(3) == 3
+    assert tree.prefix(100) == 4
+
+
+def test_leaderboard_keeps_best_score_and_ranks_ties_together():
+    board = Leaderboard(max_score=100)
+    assert board.record(1, 50)
+    assert board.record(2, 80)
+    assert board.record(3, 80)
+    assert not board.record(2, 10)
+    assert board.record(1, 500)
+
+    assert board.scores[1] == 100
+    assert board.rank(1) == 1
+    assert board.rank(2) == board.rank(3) == 2
+    assert board.percentile(2) == pytest.approx(200 / 3)
+    assert board.rank(4) is None
+
+
+def test_snapshot_round_trip(tmp_path):
+    index = RankingIndex(str(tmp_path / "ranking.json"))
+    index.record("SKD", 1, 400)
+    index.record("TWK", 2, 120)
+    index.snapshot()
+
+    loaded = RankingIndex(str(tmp_path / "ranking.json"))
+    assert loaded.load_snapshot()
+    assert loaded.rank("SKD", 1) == (1, 1, 100.0)
+    assert loaded.rank("TWK", 2) == (1, 1, 100.0)
+
+
+def test_load_ranking_rebuilds_from_results_without_snapshot(tmp_path, supabase):
+    supabase.tables["test_results"] = [
+        {"id": 1, "telegram_id": 1, "test_type": "SKD", "score": 300},
+        {"id": 2, "telegram_id": 2, "test_type": "SKD", "score": 450},
+    ]
+    index = RankingIndex(str(tmp_path / "ranking.json"))
+
+    load_ranking(index)
+    index.close()
+
+    assert index.rank("SKD", 2)[0] == 1
+    assert (tmp_path / "ranking.json").exists()
+
+
+def test_close_does_not_snapshot_a_ranking_that_never_loaded(tmp_path):
+    index = RankingIndex(str(tmp_path / "ranking.json"))
+    index.record("SKD", 1, 100)
+    index.close()
+
+    assert not (tmp_path / "ranking.json").exists()
+
+
+def test_record_result_writes_the_result_and_updates_the_leaderboard(tmp_path, monkeypatch, supabase):
+    index = RankingIndex(str(tmp_path / "ranking.json"))
+    buffer = WriteBehindBuffer("test_results", spill_dir=str(tmp_path / "spill"))
+    monkeypatch.setattr(plugins.ranking, "ranking", index)
+    monkeypatch.setattr(plugins.ranking, "result_events", buffer)
+
+    async def scenario():
+        best = await record_result("SKD", 42, 410)
+        await buffer.close()
+        return best
+
+    assert asyncio.run(scenario())
+    assert index.rank("SKD", 42) == (1, 1, 100.0)
+    assert supabase.tables["test_results"] == [{"telegram_id": 42, "test_type": "SKD", "score": 410}]
+
+
+def test_sharded_workers_rebuild_instead_of_loading_their_snapshot(tmp_path, supabase):
+    path = str(tmp_path / "ranking.json")
+    stale = RankingIndex(path)
+    stale.record("SKD", 1, 300)
+    stale.snapshot()
+    supabase.tables["test_results"] = [
+        {"id": 1, "telegram_id": 1, "test_type": "SKD", "score": 300},
+        {"id": 2, "telegram_id": 2, "test_type": "SKD", "score": 450},
+    ]
+    index = RankingIndex(path)
+
+    load_ranking(index, sharded=True)
+    index.close()
+
+    assert index.rank("SKD", 1) == (2, 2, 50.0)
+    assert index.last_result_id == 2
+
+
+def test_refresh_adds_results_stored_by_other_workers(supabase):
+    index = RankingIndex()
+    index.rebuild([(1, "SKD", 1, 300)])
+    supabase.tables["test_results"] = [
+        {"id": 1, "telegram_id": 1, "test_type": "SKD", "score": 300},
+        {"id": 2, "telegram_id": 2, "test_type": "SKD", "score": 450},
+        {"id": 3, "telegram_id": 1, "test_type": "SKD", "score": 200},
+    ]
+
+    read = index.refresh(ResultDatabase().iter_results(after_id=index.last_result_id))
+
+    assert read == 2
+    assert index.rank("SKD", 2) == (1, 2, 100.0)
+    assert index.rank("SKD", 1) == (2, 2, 50.0)
+    assert index.last_result_id == 3
@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+from models.users import User, UserStatus
+from plugins.replica import UserReplica
+
+
+class FakeUserDatabase:
+    """
+    Serves rows like UserDatabase.iter_changed_users, optionally calling
+    during() after the first row, as if the bot wrote meanwhile.
+    """
+
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self.during = None
+
+    def iter_changed_users(self, column, since=None, after_id=None):
+        rows = sorted(self.rows, key=lambda row: (row[column], row["telegram_id"]))
+        if since is not None:
+            rows = [row for row in rows if (row[column], row["telegram_id"]) > (since, after_id)]
+        for index, row in enumerate(rows):
+            yield dict(row)
+            if index == 0 and self.during is not None:
+                self.during()
+
+
+def row(telegram_id: int, created_at: str, status: str = "NEW") -> dict:
+    return {"telegram_id": telegram_id, "username": f"user{telegram_id}", "created_at": created_at, "status": status}
+
+
+@pytest.fixture
+def replica(tmp_path):
+    replica = UserReplica(str(tmp_path / "users.sqlite3"))
+    yield replica
+    replica.close()
+
+
+def test_incremental_pull_copies_only_new_rows(replica):
+    database = FakeUserDatabase([row(1, "2024-01-01"), row(2, "2024-01-02")])
+    assert replica.pull(database, full=True) == 2
+    assert replica.ready
+
+    database.rows.append(row(3, "2024-01-03"))
+
+    assert replica.pull(database) == 1
+    assert replica.get(3).username == "user3"
+
+
+def test_pull_keeps_rows_written_through_meanwhile(replica):
+    database = FakeUserDatabase([row(1, "2024-01-01"), row(2, "2024-01-02")])
+    database.during = lambda: replica.put(
+        User(telegram_id=2, username="user2", created_at="2024-01-02", status=UserStatus.REGISTERED)
+    )
+
+    replica.pull(database, full=True)
+
+    assert replica.get(2).status == UserStatus.REGISTERED
+
+
+def test_full_pull_removes_users_deleted_remotely(replica):
+    database = FakeUserDatabase([row(1, "2024-01-01"), row(2, "2024-01-02")])
+    replica.pull(database, full=True)
+
+    database.rows = [row(2, "2024-01-02", "REGISTERED")]
+    replica.pull(database, full=True)
+
+    assert replica.get(1) is None
+    assert replica.get(2).status == UserStatus.REGISTERED
+
+
+def test_reads_from_other_threads_use_their_own_connection(replica):
+    replica.put(User(telegram_id=1, username="user1"))
+    found = []
+
+    with replica._lock:
+        # A read doesn't wait for a write holding the lock
+        thread = threading.Thread(target=lambda: found.append(replica.get(1)))
+        thread.start()
+        thread.join(timeout=5)
+
+    assert found and found[0].username == "user1"
+
+
+def test_failed_batch_is_rolled_back(replica):
+    with pytest.raises(Exception):
+        replica.put_rows([row(1, "2024-01-01"), {"telegram_id": object()}])
+
+    assert replica.get(1) is None
+    assert replica.stats()["size"] == 0
+
+
+def test_workers_sharing_the_file_see_each_others_writes(replica):
+    # Another worker process, with its own connections to the same file
+    other = UserReplica(replica.path)
+    try:
+        database = FakeUserDatabase([row(1, "2024-01-01"), row(2, "2024-01-02")])
+        database.during = lambda: other.put(User(telegram_id=2, username="user2", status=UserStatus.REGISTERED))
+        replica.pull(database, full=True)
+
+        # The write made during the pull isn't reverted by the stale pulled row
+        assert replica.get(2).status == UserStatus.REGISTERED
+        assert other.get(1).username == "user1"
+    finally:
+        other.close()
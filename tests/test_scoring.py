@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from models.questions import Category, Question
+from models.scoring import UNANSWERED, AnswerKey, PassingGrade, score_batch, score_session
+
+
+def make_key() -> AnswerKey:
+    return AnswerKey.from_questions(
+        [
+            Question(category=Category.TWK, text="1", options=list("abcde"), scores=[0, 5, 0, 0, 0]),
+            Question(category=Category.TIU, text="2", options=list("abcd"), scores=[5, 0, 0, 0]),
+            Question(category=Category.TKP, text="3", options=list("abcde"), scores=[1, 2, 3, 4, 5]),
+        ]
+    )
+
+
+GRADE = PassingGrade(TWK=5, TIU=5, TKP=3)
+
+
+def test_score_session_totals_per_section():
+    score = score_session([1, 0, 2], make_key(), GRADE)
+
+    assert score.totals == {Category.TWK: 5, Category.TIU: 5, Category.TKP: 3}
+    assert score.total == 13
+    assert score.passed_all
+
+
+def test_unanswered_questions_score_nothing():
+    score = score_session([UNANSWERED, 0, UNANSWERED], make_key(), GRADE)
+
+    assert score.totals[Category.TWK] == 0
+    assert score.totals[Category.TKP] == 0
+    assert not score.passed_all
+    assert score.passed[Category.TIU]
+
+
+def test_score_batch_matches_single_sessions():
+    key = make_key()
+    answers = np.array([[1, 0, 4], [0, 1, 0], [UNANSWERED, UNANSWERED, UNANSWERED]])
+
+    batch = score_batch(answers, key.scores, key.sections, GRADE)
+
+    for index, row in enumerate(answers):
+        assert batch.session(index) == score_session(list(row), key, GRADE)
+
+
+@pytest.mark.parametrize("answers", [[1, 0, 5], [1, -2, 0], [200, 0, 0]])
+def test_out_of_range_answers_are_rejected(answers):
+    with pytest.raises(ValueError):
+        score_session(answers, make_key(), GRADE)
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from pyrogram.errors import FloodWait
+
+from plugins.sender import BULK, INTERACTIVE, SendScheduler
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_busy_chat_does_not_block_other_chats():
+    async def scenario():
+        scheduler = SendScheduler(global_rate=1000, chat_rate=2, chat_burst=1, workers=1)
+        order = []
+
+        async def send(label):
+            order.append(label)
+
+        first = asyncio.ensure_future(scheduler.send(send, "a1", chat_id=1))
+        second = asyncio.ensure_future(scheduler.send(send, "a2", chat_id=1))
+        await asyncio.sleep(0)
+        other = asyncio.ensure_future(scheduler.send(send, "b1", chat_id=2))
+        await asyncio.gather(first, second, other)
+        await scheduler.stop()
+        return order
+
+    assert run(scenario()) == ["a1", "b1", "a2"]
+
+
+def test_interactive_jobs_are_served_before_bulk():
+    async def scenario():
+        scheduler = SendScheduler(global_rate=1000, chat_rate=1000, chat_burst=100, workers=1)
+        order = []
+
+        async def send(label):
+            order.append(label)
+
+        jobs = [scheduler.send(send, f"bulk{i}", chat_id=i, priority=BULK) for i in range(3)]
+        jobs.append(scheduler.send(send, "reply", chat_id=9, priority=INTERACTIVE))
+        await asyncio.gather(*jobs)
+        await scheduler.stop()
+        return order
+
+    assert run(scenario())[0] == "reply"
+
+
+def test_flood_wait_is_retried():
+    async def scenario():
+        scheduler = SendScheduler(global_rate=1000, chat_rate=1000, chat_burst=100, workers=1)
+        calls = []
+
+        async def send():
+            calls.append(1)
+            if len(calls) == 1:
+                raise FloodWait(value=0)
+            return "ok"
+
+        result = await scheduler.send(send, chat_id=1)
+        await scheduler.stop()
+        return result, len(calls), scheduler.flood_waits
+
+    assert run(scenario()) == ("ok", 2, 1)
+
+
+def test_stop_fails_jobs_not_sent_yet():
+    async def scenario():
+        scheduler = SendScheduler(global_rate=1000, chat_rate=0.01, chat_burst=1, workers=1)
+
+        async def send():
+            return "sent"
+
+        first = await scheduler.send(send, chat_id=1)
+        deferred = asyncio.ensure_future(scheduler.send(send, chat_id=1))
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        with pytest.raises(ConnectionError):
+            await deferred
+        return first
+
+    assert run(scenario()) == "sent"
@@ -0,0 +1,51 @@
+from collections import Counter
+
+import settings.sharding
+from settings.sharding import HashRing, ShardFilter, shard_path, write_json, ring_path
+
+
+def test_keys_spread_over_every_worker():
+    ring = HashRing(range(4))
+
+    owners = Counter(ring.owner(key) for key in range(10_000))
+
+    assert set(owners) == {0, 1, 2, 3}
+    assert min(owners.values()) > 1_500
+
+
+def test_removing_a_worker_only_moves_its_keys():
+    ring = HashRing(range(4))
+    before = {key: ring.owner(key) for key in range(5_000)}
+
+    ring.remove(2)
+
+    for key, owner in before.items():
+        if owner != 2:
+            assert ring.owner(key) == owner
+        else:
+            assert ring.owner(key) in {0, 1, 3}
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing().owner(42) is None
+
+
+def test_shard_path_is_per_worker(monkeypatch):
+    assert shard_path("data/users.sqlite3") == "data/users.sqlite3"
+
+    monkeypatch.setattr(settings.sharding, "SHARD_COUNT", 3)
+    monkeypatch.setattr(settings.sharding, "SHARD_INDEX", 1)
+
+    assert shard_path("data/users.sqlite3") == "data/users.worker1.sqlite3"
+    assert shard_path("data/broadcasts") == "data/broadcasts.worker1"
+
+
+def test_filter_follows_the_ring_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings.sharding, "RING_REFRESH_INTERVAL", 0)
+    shard = ShardFilter(index=0, count=2, state_dir=str(tmp_path))
+    owned_by_other = next(key for key in range(1_000) if shard.ring.owner(key) == 1)
+    assert not shard.owns(owned_by_other)
+
+    write_json(ring_path(str(tmp_path)), {"members": [0]})
+
+    assert shard.owns(owned_by_other)
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+
+import plugins.supabase
+from plugins.supabase import AsyncUserDatabase, SingleFlight
+from tests.test_supabase import telegram_user
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key * 2
+
+    async def run():
+        flight = SingleFlight(timeout=1)
+        results = await asyncio.gather(*(flight.do("a", load, 21) for _ in range(10)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+
+    assert results == [42] * 10
+    assert calls == [21]
+    assert flight.merged == 9
+    assert len(flight) == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionError("down")
+
+    async def run():
+        flight = SingleFlight(timeout=1)
+        results = await asyncio.gather(*(flight.do("a", load) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(ConnectionError):
+            await flight.do("a", load)
+        return results
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert len(calls) == 2
+
+
+def test_timed_out_call_is_forgotten():
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def answer():
+        return "ok"
+
+    async def run():
+        flight = SingleFlight(timeout=0.01)
+        with pytest.raises(TimeoutError):
+            await flight.do("a", hang)
+        return await flight.do("a", answer)
+
+    assert asyncio.run(run()) == "ok"
+
+
+def test_get_user_returns_none_when_the_lookup_times_out(supabase, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(plugins.supabase, "user_reads", SingleFlight(timeout=0.01))
+    database = AsyncUserDatabase()
+    monkeypatch.setattr(database.database, "get_user", lambda telegram_id: release.wait(1))
+
+    try:
+        assert asyncio.run(database.get_user(42)) is None
+    finally:
+        release.set()
+
+
+def test_concurrent_upserts_of_a_user_share_one_request(supabase):
+    database = AsyncUserDatabase()
+
+    async def run():
+        return await asyncio.gather(*(database.upsert_user(telegram_user()) for _ in range(5)))
+
+    users = asyncio.run(run())
+
+    assert {user.telegram_id for user in users} == {42}
+    assert supabase.requests == [("users", "upsert")]
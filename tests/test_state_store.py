@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from plugins.state_store import MemoryStateStore, RedisStateStore, SQLiteStateStore
+from tests.fakes import FakeRedis
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path, monkeypatch):
+    clock = Clock()
+    if request.param == "memory":
+        monkeypatch.setattr(time, "monotonic", clock)
+        store = MemoryStateStore(ttl=10, capacity=3)
+    elif request.param == "sqlite":
+        monkeypatch.setattr(time, "time", clock)
+        store = SQLiteStateStore(str(tmp_path / "state.sqlite3"), ttl=10)
+    else:
+        store = RedisStateStore(FakeRedis(clock), ttl=10)
+    store.clock = clock
+    yield store
+    store.close()
+
+
+def test_set_get_delete(store):
+    store.set(1, b"step1")
+    assert store.get(1) == b"step1"
+    assert 1 in store
+
+    store.set(1, b"step2")
+    assert store.get(1) == b"step2"
+
+    store.delete(1)
+    assert store.get(1) is None
+    assert 1 not in store
+
+
+def test_entries_expire_after_ttl_without_activity(store):
+    store.set(1, b"a")
+    store.clock.now += 6
+    store.set(1, b"b")
+    store.clock.now += 6
+    assert store.get(1) == b"b"
+
+    store.clock.now += 10
+    assert store.get(1) is None
+
+
+def test_memory_store_evicts_least_recently_active():
+    store = MemoryStateStore(ttl=60, capacity=2)
+    store.set(1, b"a")
+    store.set(2, b"b")
+    store.set(1, b"a2")
+    store.set(3, b"c")
+
+    assert store.get(2) is None
+    assert store.get(1) == b"a2"
+    assert store.stats()["evicted_capacity"] == 1
+
+
+def test_purge_expired_removes_only_idle_entries(store):
+    store.set(1, b"old")
+    store.clock.now += 11
+    store.set(2, b"new")
+
+    if isinstance(store, RedisStateStore):
+        # The server expires keys itself
+        assert store.purge_expired() == 0
+    else:
+        assert store.purge_expired() == 1
+        assert store.stats()["size"] == 1
+    assert store.get(1) is None
+    assert store.get(2) == b"new"
+
+
+def test_sqlite_sweeper_purges_in_the_background(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "state.sqlite3"), ttl=0.01)
+    store.set(1, b"abandoned")
+    store.start_sweeper(interval=0.02)
+    try:
+        deadline = time.time() + 2
+        while store.stats()["size"] and time.time() < deadline:
+            time.sleep(0.01)
+        assert store.stats()["size"] == 0
+    finally:
+        store.close()
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from models.users import UserStatus
+from events.start import response_message
+from plugins.supabase import UserDatabase, user_cache
+from plugins.templates import templates
+
+
+def telegram_user(telegram_id: int = 42, username: str = "peserta"):
+    return SimpleNamespace(id=telegram_id, username=username, first_name="Peserta", last_name="CPNS")
+
+
+def test_upsert_user_inserts_new_user_in_one_request(supabase):
+    user = UserDatabase().upsert_user(telegram_user())
+
+    assert user.telegram_id == 42
+    assert user.status is UserStatus.NEW
+    assert supabase.requests == [("users", "upsert")]
+
+
+def test_upsert_user_returns_existing_row_in_one_request(supabase):
+    supabase.tables["users"] = [
+        {"telegram_id": 42, "username": "lama", "status": "REGISTERED", "email": "a@example.com"}
+    ]
+
+    user = UserDatabase().upsert_user(telegram_user(username="baru"))
+
+    assert user.status is UserStatus.REGISTERED
+    assert user.email == "a@example.com"
+    assert user.username == "baru"
+    assert supabase.requests == [("users", "upsert")]
+    assert user_cache.get(42) is user
+
+
+def test_upsert_user_reads_a_null_status_as_new(supabase):
+    # No column defaults, as in a users table created without them
+    supabase.defaults = {}
+
+    user = UserDatabase().upsert_user(telegram_user())
+
+    assert supabase.tables["users"][0].get("status") is None
+    assert user.status is UserStatus.NEW
+    assert response_message(user.status) == templates.text("start.NEW")
+
+
+def test_upsert_user_returns_none_when_database_fails(supabase):
+    supabase.error = ConnectionError("down")
+
+    assert UserDatabase().upsert_user(telegram_user()) is None
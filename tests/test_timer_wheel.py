@@ -0,0 +1,175 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import plugins.timer_wheel
+from plugins.timer_wheel import DeadlineTable, ExamTimers, TimerWheel
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1_000_000.0)
+    monkeypatch.setattr(plugins.timer_wheel.time, "time", clock)
+    return clock
+
+
+def advance(wheel: TimerWheel, clock: Clock, seconds: int):
+    for _ in range(seconds):
+        clock.now += 1
+        wheel._advance()
+
+
+def test_timers_fire_at_their_deadline_across_levels(clock):
+    async def scenario():
+        wheel = TimerWheel()
+        fired = []
+
+        async def callback(client, key, payload):
+            fired.append((key, int(clock.now - 1_000_000)))
+
+        wheel.on("test", callback)
+        for seconds in (5, 90, 3700):
+            wheel.schedule(f"t{seconds}", "test", clock.now + seconds, seconds)
+        for _ in range(3700):
+            advance(wheel, clock, 1)
+            # Let the callback of a due timer run before the next tick
+            await asyncio.sleep(0)
+        return fired, len(wheel)
+
+    fired, pending = asyncio.run(scenario())
+    assert fired == [("t5", 5), ("t90", 90), ("t3700", 3700)]
+    assert pending == 0
+
+
+def test_cancelled_and_replaced_timers_do_not_fire(clock):
+    async def scenario():
+        wheel = TimerWheel()
+        fired = []
+
+        async def callback(client, key, payload):
+            fired.append(payload)
+
+        wheel.on("test", callback)
+        wheel.schedule("a", "test", clock.now + 3, "first")
+        wheel.schedule("a", "test", clock.now + 5, "second")
+        wheel.schedule("b", "test", clock.now + 3, "cancelled")
+        assert wheel.cancel("b")
+        advance(wheel, clock, 10)
+        await asyncio.sleep(0)
+        return fired
+
+    assert asyncio.run(scenario()) == ["second"]
+
+
+def test_schedule_before_start_uses_the_current_time(clock):
+    wheel = TimerWheel()
+    clock.now += 600
+    timer = wheel.schedule("a", "test", clock.now + 5)
+
+    # Five seconds ahead of the refreshed clock, so in the seconds wheel
+    assert timer in wheel._wheels[0][timer.tick % 60]
+
+
+def test_finish_exam_cancels_custom_reminders(clock, tmp_path):
+    wheel = TimerWheel(DeadlineTable(str(tmp_path / "timers.sqlite3")))
+    exams = ExamTimers(wheel)
+
+    exams.start_exam(42, duration=600, reminders=(300, 120, 30))
+    exams.remind_question(42, 3, 60)
+    assert len(wheel) == 5
+
+    exams.finish_exam(42)
+    assert len(wheel) == 0
+    assert list(wheel.table.load()) == []
+
+
+def test_finish_exam_after_restart_uses_persisted_reminders(clock, tmp_path):
+    path = str(tmp_path / "timers.sqlite3")
+    ExamTimers(TimerWheel(DeadlineTable(path))).start_exam(42, duration=600, reminders=(300, 45))
+
+    async def restart():
+        wheel = TimerWheel(DeadlineTable(path))
+        exams = ExamTimers(wheel)
+        wheel.start()
+        restored = len(wheel)
+        exams.finish_exam(42)
+        remaining = len(wheel)
+        await wheel.stop()
+        return restored, remaining
+
+    assert asyncio.run(restart()) == (3, 0)
+
+
+def test_expired_exam_is_submitted(clock):
+    async def scenario():
+        wheel = TimerWheel()
+        exams = ExamTimers(wheel)
+        submitted = []
+
+        @exams.on_expire
+        async def submit(client, telegram_id):
+            submitted.append(telegram_id)
+
+        exams.start_exam(42, duration=120, reminders=())
+        advance(wheel, clock, 120)
+        await asyncio.sleep(0)
+        return submitted, len(wheel)
+
+    assert asyncio.run(scenario()) == ([42], 0)
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    import plugins.sender
+
+    sent = []
+
+    async def send(func, *args, chat_id: int, **kwargs):
+        sent.append((chat_id, args[1]))
+
+    monkeypatch.setattr(plugins.sender.sender, "send", send)
+    return sent
+
+
+def test_reminders_use_the_language_of_the_session(clock, sent):
+    async def scenario():
+        wheel = TimerWheel()
+        wheel.client = SimpleNamespace(send_message=None)
+        exams = ExamTimers(wheel)
+        exams.is_active(lambda telegram_id: True)
+        exams.start_exam(42, duration=600, reminders=(300,), lang="en")
+        exams.remind_question(42, 3, 60, lang="en")
+        for _ in range(300):
+            advance(wheel, clock, 1)
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+    assert sent == [
+        (42, "Question 3 hasn't been answered yet. Don't forget to answer it."),
+        (42, "5 minutes of the test are left."),
+    ]
+
+
+def test_reminders_without_a_session_drop_the_exam_timers(clock, sent):
+    async def scenario():
+        wheel = TimerWheel()
+        exams = ExamTimers(wheel)
+        exams.is_active(lambda telegram_id: False)
+        exams.start_exam(42, duration=600, reminders=(300,))
+        exams.remind_question(42, 1, 60)
+        advance(wheel, clock, 60)
+        await asyncio.sleep(0)
+        return len(wheel)
+
+    assert asyncio.run(scenario()) == 0
+    assert sent == []
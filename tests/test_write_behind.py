@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+
+from postgrest.exceptions import APIError
+
+from plugins.supabase import WriteBehindBuffer
+
+
+def make_buffer(tmp_path, **kwargs) -> WriteBehindBuffer:
+    options = {"batch_size": 2, "flush_interval": 60, "spill_dir": str(tmp_path)}
+    options.update(kwargs)
+    return WriteBehindBuffer("answers", **options)
+
+
+def test_rows_are_inserted_in_batches(tmp_path, supabase):
+    async def scenario():
+        buffer = make_buffer(tmp_path)
+        for i in range(5):
+            await buffer.add({"question": i})
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+
+    assert [row["question"] for row in supabase.tables["answers"]] == [0, 1, 2, 3, 4]
+    assert supabase.requests.count(("answers", "insert")) == 3
+    assert buffer.stats() == {"pending": 0, "written": 5, "failed_flushes": 0, "dead_letters": 0}
+    assert (tmp_path / "answers.jsonl").read_text() == ""
+
+
+def test_failed_flush_keeps_rows_in_the_spill_file(tmp_path, supabase):
+    supabase.error = ConnectionError("down")
+
+    async def scenario():
+        buffer = make_buffer(tmp_path)
+        await buffer.add({"question": 1})
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+
+    assert buffer.stats()["pending"] == 1
+    assert buffer.failed_flushes == 1
+    lines = (tmp_path / "answers.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [{"question": 1}]
+
+
+def test_start_replays_the_spill_file(tmp_path, supabase):
+    (tmp_path / "answers.jsonl").write_text('{"question":1}\n{"question":2}\n')
+
+    async def scenario():
+        buffer = make_buffer(tmp_path, flush_interval=0.01)
+        buffer.start()
+        for _ in range(100):
+            if buffer.written:
+                break
+            await asyncio.sleep(0.01)
+        await buffer.close()
+
+    asyncio.run(scenario())
+
+    assert supabase.tables["answers"] == [{"question": 1}, {"question": 2}]
+
+
+def test_close_drains_the_spill_file_of_a_buffer_never_started(tmp_path, supabase):
+    (tmp_path / "answers.jsonl").write_text('{"question":1}\n')
+
+    asyncio.run(make_buffer(tmp_path).close())
+
+    assert supabase.tables["answers"] == [{"question": 1}]
+
+
+def test_close_without_rows_does_nothing(tmp_path, supabase):
+    asyncio.run(make_buffer(tmp_path).close())
+
+    assert supabase.requests == []
+    assert not (tmp_path / "answers.jsonl").exists()
+
+
+def test_rejected_batch_moves_to_the_dead_letter_file(tmp_path, supabase):
+    supabase.error = APIError({"code": "42P01", "message": 'relation "answers" does not exist'})
+
+    async def scenario():
+        buffer = make_buffer(tmp_path, queue_limit=4, flush_interval=0.01)
+        # Would wait forever for space if rejected rows stayed pending
+        for i in range(10):
+            await asyncio.wait_for(buffer.add({"question": i}), 1)
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+
+    assert buffer.stats()["pending"] == 0
+    assert buffer.dead_letters == 10
+    lines = (tmp_path / "answers.dead.jsonl").read_text().splitlines()
+    assert [json.loads(line)["question"] for line in lines] == list(range(10))
+    assert (tmp_path / "answers.jsonl").read_text() == ""
+
+
+def test_transient_failures_are_retried_up_to_the_limit(tmp_path, supabase):
+    supabase.error = ConnectionError("down")
+
+    async def scenario():
+        buffer = make_buffer(tmp_path, max_retries=3)
+        await buffer.add({"question": 1})
+        await buffer.flush()
+        await buffer.flush()
+        assert buffer.stats()["pending"] == 1
+        await buffer.flush()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+
+    assert buffer.stats() == {"pending": 0, "written": 0, "failed_flushes": 3, "dead_letters": 1}
+
+
+def test_close_waits_for_the_insert_in_flight(tmp_path, supabase):
+    inserted = []
+
+    def slow_insert(rows):
+        time.sleep(0.3)
+        inserted.extend(rows)
+
+    async def scenario():
+        buffer = make_buffer(tmp_path)
+        buffer._insert = slow_insert
+        await buffer.add({"i": 1})
+        await buffer.add({"i": 2})
+        await asyncio.sleep(0.05)
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+
+    assert inserted == [{"i": 1}, {"i": 2}]
+    assert buffer.written == 2